@@ -32,13 +32,18 @@ from PyQt6.QtCore import (
     QTextStream,
     QIODevice,
     QResource,
+    QTimer,
 )
 from PyQt6.QtGui import QIcon, QFontDatabase
 
-from prayertimes.core.common.logapi import log
+from prayertimes.core.common import events
+from prayertimes.core.common.logapi import log, set_level
 from prayertimes.core.common.registry import Registry
+from prayertimes.core.common.registryprofiler import RegistryProfiler
 from prayertimes.core.common.resourceslocation import ResourcesLocation
 from prayertimes.core.common.settings import Settings
+from prayertimes.core.common.settingsbus import SettingsBus
+from prayertimes.core.common.settingswatcher import SettingsWatcher
 
 from prayertimes.core.lib.translator.translatormanager import LanguageManager
 
@@ -73,6 +78,16 @@ class QuantumPT(QtWidgets.QApplication):
 
         Registry.create()
 
+        set_level(Settings().general.log_level)
+        SettingsBus().subscribe("general_settings/log_level", self.log_level_changed)
+
+        # Opt-in profiling of the events and signals of the registry
+        RegistryProfiler().enable(Settings().general.registry_profile == 1)
+        SettingsBus().subscribe(
+            "general_settings/registry_profile", self.profile_changed
+        )
+        events.log_registry_profile.connect(RegistryProfiler().log_summary)
+
         # self.style = 0
         self.modify_style.connect(self.change_style)
 
@@ -118,11 +133,44 @@ class QuantumPT(QtWidgets.QApplication):
         #     self.setStyleSheet(open("resources/styles/default.css").read())
         #     self.style = 0
 
+    @staticmethod
+    def log_level_changed(changes):
+        """
+        Change the level of the logs.
+
+        :param changes: {key: value} of the settings changed.
+        :return:
+        """
+        set_level(changes["general_settings/log_level"])
+
+    @staticmethod
+    def profile_changed(changes):
+        """
+        Start or stop the profiling of the registry.
+
+        :param changes: {key: value} of the settings changed.
+        :return:
+        """
+        RegistryProfiler().enable(changes["general_settings/registry_profile"] == 1)
+
+    @staticmethod
+    def first_paint():
+        """
+        Record the services needed to paint the main window, then build the prayer manager
+        that computes the first timetable.
+
+        :return:
+        """
+        Registry().mark_first_paint()
+        Registry().get("prayer_manager")
+
     def exec(self):
         """
         Override exec method to allow the shared memory to be released on exit
         """
         result = QtWidgets.QApplication.exec()
+        if RegistryProfiler().enabled:
+            RegistryProfiler().log_summary()
         # This function seems to cause problem in Ubuntu Linux because shared memory is not released.
         self.shared_memory.detach()
         return result
@@ -134,7 +182,7 @@ class QuantumPT(QtWidgets.QApplication):
         activate_first_notification = False
 
         # First time checks in settings
-        has_run_wizard = Settings().value("general_settings/wizard_runned")
+        has_run_wizard = Settings().general.wizard_runned
         if not has_run_wizard:
             first_wizard = QuantumPTWizard(parent=None)
             if first_wizard.exec() == QtWidgets.QDialog.DialogCode.Accepted:
@@ -146,7 +194,7 @@ class QuantumPT(QtWidgets.QApplication):
                 sys.exit()
 
         # Show the SplashScreen
-        show_splash = Settings().value("general_settings/splashscreen")
+        show_splash = Settings().general.splashscreen
         if show_splash:
             splash = SplashScreen()
             splash.start_splashscreen.emit()
@@ -159,13 +207,19 @@ class QuantumPT(QtWidgets.QApplication):
         self.global_frame.repaint()
         self.processEvents()
 
-        Registry().execute("__application_init__")
-        Registry().execute("__application_post_init__")
+        events.application_init.emit()
+        events.application_post_init.emit()
+
+        # Follow the changes of the settings file made by other programs
+        SettingsWatcher().watch(Settings().fileName())
 
         self.processEvents()
 
         self.global_frame.show()
 
+        # Services built until the main window is painted
+        QTimer.singleShot(0, self.first_paint)
+
         # Center global frame
         self.global_frame.setGeometry(
             QtWidgets.QStyle.alignedRect(
@@ -283,7 +337,7 @@ def hook_exception(exc_type, exc_value, tracebackobj):
     error_box = CriticalExceptionDialog()
     error_box.text_edit.setText(str(notice) + str(msg))
     if not error_box.exec():
-        Registry().execute("close_application")
+        events.close_application.emit()
         QtWidgets.QApplication.instance().quit()
 
 
@@ -305,7 +359,7 @@ def main():
 
     Registry().register("application", quantum_app)
     quantum_app.setApplicationVersion("v0.0.1")
-    # Registry().execute("restore_default_settings")
+    # events.restore_default_settings.emit()
 
     sys.excepthook = hook_exception
 
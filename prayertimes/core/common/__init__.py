@@ -20,6 +20,7 @@
 # --------------------------------------------------------------------------- #
 
 import hashlib
+import math
 import os
 import re
 import sys
@@ -57,7 +58,7 @@ def check_directory_exists(directory, do_not_log=False):
     :return:
     """
     if not do_not_log:
-        log.debug("check_directory_exists {}".format(directory))
+        log.debug("check_directory_exists %s", directory)
     try:
         if not os.path.exists(directory):
             os.makedirs(directory)
@@ -97,6 +98,18 @@ def de_hump(name):
     return second_camel_case.sub(r"\1_\2", sub_name).lower()
 
 
+def percentile(sorted_values, percent):
+    """
+    Nearest-rank percentile of an already sorted list.
+
+    :param sorted_values: sorted list of values.
+    :param percent: percentile wanted (0 - 100).
+    :return:
+    """
+    rank = math.ceil(percent / 100 * len(sorted_values))
+    return sorted_values[max(rank - 1, 0)]
+
+
 def is_win():
     """
     Returns true if running on a system with a nt kernel e.g. Windows, Wine
@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# --------------------------------------------------------------------------- #
+# QuantumPT - Open Source Portable Islamic prayer times reminder              #
+# --------------------------------------------------------------------------- #
+# Copyright (c) 2016 QuantumPT Developer                                      #
+# --------------------------------------------------------------------------- #
+# This program is free software; you can redistribute it and/or modify it     #
+# under the terms of the GNU General Public License as published by the Free  #
+# Software Foundation; version 3 of the License.                              #
+#                                                                             #
+# This program is distributed in the hope that it will be useful, but WITHOUT #
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or       #
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for    #
+# more details.                                                               #
+# --------------------------------------------------------------------------- #
+
+import datetime
+import threading
+import time
+
+_clock = None
+
+
+class SystemClock(object):
+    """
+    Clock used by the program to know the current date and time, the real system time.
+    """
+
+    def now(self, tz=None):
+        """
+        Current date and time.
+
+        :param tz: timezone of the result, naive local date and time if None.
+        :return: datetime.datetime object.
+        """
+        return datetime.datetime.now(tz)
+
+    def today(self):
+        """
+        Current local date and time (naive).
+
+        :return: datetime.datetime object.
+        """
+        return self.now()
+
+    def time(self):
+        """
+        Current time in seconds since the epoch.
+
+        :return: float
+        """
+        return time.time()
+
+
+class SimulatedClock(SystemClock):
+    """
+    Clock whose time only moves when it is told to, used to travel in time
+    (e.g. running a full year of athans in a few seconds).
+    """
+
+    def __init__(self, start=None):
+        """
+        :param start: datetime the clock starts at, naive datetimes are local times.
+        Current system time if None.
+        """
+        self._lock = threading.Lock()
+        self._now = None
+        self.set(start or datetime.datetime.now())
+
+    def set(self, moment):
+        """
+        Move the clock to a moment.
+
+        :param moment: datetime, naive datetimes are local times.
+        :return:
+        """
+        if moment.tzinfo is None:
+            moment = moment.astimezone()
+        with self._lock:
+            self._now = moment.astimezone(datetime.timezone.utc)
+
+    def advance(self, delta):
+        """
+        Move the clock forward.
+
+        :param delta: datetime.timedelta or seconds.
+        :return:
+        """
+        if not isinstance(delta, datetime.timedelta):
+            delta = datetime.timedelta(seconds=delta)
+        with self._lock:
+            self._now += delta
+
+    def now(self, tz=None):
+        """Override"""
+        with self._lock:
+            moment = self._now
+        if tz is None:
+            # Local time, daylight saving time included
+            return moment.astimezone().replace(tzinfo=None)
+        return moment.astimezone(tz)
+
+    def time(self):
+        """Override"""
+        with self._lock:
+            return self._now.timestamp()
+
+
+def get_clock():
+    """
+    Get the clock used by the program.
+
+    :return: SystemClock object.
+    """
+    global _clock
+    if _clock is None:
+        _clock = SystemClock()
+    return _clock
+
+
+def set_clock(clock):
+    """
+    Replace the clock used by the program, e.g. with a SimulatedClock for tests.
+
+    :param clock: SystemClock object, None to restore the system clock.
+    :return:
+    """
+    global _clock
+    _clock = clock
@@ -0,0 +1,313 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# --------------------------------------------------------------------------- #
+# QuantumPT - Open Source Portable Islamic prayer times reminder              #
+# --------------------------------------------------------------------------- #
+# Copyright (c) 2016 QuantumPT Developer                                      #
+# --------------------------------------------------------------------------- #
+# This program is free software; you can redistribute it and/or modify it     #
+# under the terms of the GNU General Public License as published by the Free  #
+# Software Foundation; version 3 of the License.                              #
+#                                                                             #
+# This program is distributed in the hope that it will be useful, but WITHOUT #
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or       #
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for    #
+# more details.                                                               #
+# --------------------------------------------------------------------------- #
+
+
+import inspect
+import time
+import weakref
+
+from functools import partial
+
+from PyQt6.QtCore import QObject, Qt, pyqtSignal
+
+from prayertimes.core.common.logapi import log
+
+
+class EventQueue(QObject):
+    """
+    Call the handlers connected with queued=True from the event loop of the GUI thread.
+    """
+
+    __instance__ = None
+    __initialised__ = False
+
+    posted = pyqtSignal(str, object, tuple, dict)
+
+    def __new__(cls):
+        """
+        Re-implement method __new__ to have a singleton.
+        The queue must be created in the GUI thread.
+        """
+        if not cls.__instance__:
+            cls.__instance__ = super(EventQueue, cls).__new__(cls)
+        return cls.__instance__
+
+    def __init__(self):
+        if self.__initialised__:
+            return
+        super(EventQueue, self).__init__()
+        self.__initialised__ = True
+        self.posted.connect(self._call, Qt.ConnectionType.QueuedConnection)
+
+    @staticmethod
+    def _call(name, function, args, kwargs):
+        try:
+            if Event.profiler is None:
+                function(*args, **kwargs)
+            else:
+                Event.profiler.call(
+                    name, _handler(args[0], function), function, args, kwargs
+                )
+        except TypeError:
+            log.exception("Exception for queued handler %s", function)
+
+
+def _identity(value):
+    return value
+
+
+def _call_function(function, *args, **kwargs):
+    return function(*args, **kwargs)
+
+
+def _handler(owner, function):
+    """
+    :return: the handler given to connect, named by the profiler.
+    """
+    return owner if function is _call_function else function
+
+
+class Event(object):
+    """
+    Event of the program, declared once in prayertimes.core.common.events and used as an
+    object: events.set_main_stack.connect(handler) and events.set_main_stack.emit(idx).
+
+    The handlers are checked against the arguments of the event when they are connected. The
+    list of handlers is compiled when it changes, emit() only walks it. Methods are referenced
+    weakly: the handlers of deleted objects (and of deleted Qt widgets) are dropped instead of
+    being kept alive. Handlers connected with queued=True are called later from the event
+    loop of the GUI thread, whatever the thread emitting the event.
+    """
+
+    # {name: Event} of the declared events
+    declared = {}
+    # RegistryProfiler measuring the handlers, None when the Registry is not profiled
+    profiler = None
+
+    __slots__ = ("name", "args", "_calls", "_queued", "__weakref__")
+
+    def __init__(self, name, args=()):
+        """
+        :param name: name of the event, used by Registry().execute(name) too.
+        :param args: names of the arguments given to the handlers.
+        """
+        if name in Event.declared:
+            raise KeyError("Event {} declared twice".format(name))
+        self.name = name
+        self.args = tuple(args)
+        # Compiled handlers, called as function(reference(), *args):
+        # ((reference to the object of the method, function of the method), ...)
+        self._calls = ()
+        self._queued = ()
+        Event.declared[name] = self
+
+    def __repr__(self):
+        return "<Event {}({})>".format(self.name, ", ".join(self.args))
+
+    def connect(self, handler, queued=False):
+        """
+        Call handler when the event is emitted.
+
+        :param handler: callable accepting the arguments of the event.
+        :param queued: call the handler from the event loop of the GUI thread.
+        :return:
+        :raise TypeError: if the handler cannot be called with the arguments of the event.
+        """
+        self._check(handler)
+        owner, function = self._split(handler)
+        if self._find(owner, function):
+            return
+        if function is _call_function:
+            reference = partial(_identity, owner)
+        else:
+            reference = weakref.ref(owner)
+            if isinstance(owner, QObject):
+                # The Python object of a deleted widget can survive the C++ object
+                owner.destroyed.connect(partial(self._drop, reference))
+        if queued:
+            EventQueue()
+            self._queued += ((reference, function),)
+        else:
+            self._calls += ((reference, function),)
+
+    def disconnect(self, handler):
+        """
+        :param handler: callable given to connect.
+        :return:
+        """
+        owner, function = self._split(handler)
+        self._calls, self._queued = (
+            tuple(
+                call
+                for call in calls
+                if not (call[1] == function and call[0]() is owner)
+            )
+            for calls in (self._calls, self._queued)
+        )
+
+    def clear(self):
+        """
+        Disconnect all the handlers.
+
+        :return:
+        """
+        self._calls = ()
+        self._queued = ()
+
+    def handlers(self):
+        """
+        :return: list of the handlers of the objects alive.
+        """
+        return [
+            partial(function, reference())
+            for reference, function in self._calls + self._queued
+            if reference() is not None
+        ]
+
+    def emit(self, *args, **kwargs):
+        """
+        Call the handlers of the event. A handler that does not accept the arguments is
+        logged and skipped, the other exceptions of the handlers are raised.
+
+        :param args: arguments of the event.
+        :param kwargs: arguments of the event.
+        :return: list of the results of the direct handlers that are not empty.
+        """
+        if Event.profiler is not None:
+            return self._emit_profiled(args, kwargs)
+        results = []
+        for reference, function in self._calls:
+            owner = reference()
+            if owner is None:
+                self._drop(reference)
+                continue
+            try:
+                result = function(owner, *args, **kwargs)
+            except TypeError:
+                log.exception(
+                    "Exception for handler %s of event %s", function, self.name
+                )
+                continue
+            if result:
+                results.append(result)
+        if self._queued:
+            self._post(args, kwargs)
+        return results
+
+    def _emit_profiled(self, args, kwargs):
+        """
+        emit() recording the duration of the handlers and of the dispatch in the profiler.
+        """
+        profiler = Event.profiler
+        start = time.perf_counter()
+        results = []
+        for reference, function in self._calls:
+            owner = reference()
+            if owner is None:
+                self._drop(reference)
+                continue
+            try:
+                result = profiler.call(
+                    self.name,
+                    _handler(owner, function),
+                    function,
+                    (owner,) + args,
+                    kwargs,
+                )
+            except TypeError:
+                log.exception(
+                    "Exception for handler %s of event %s", function, self.name
+                )
+                continue
+            if result:
+                results.append(result)
+        if self._queued:
+            self._post(args, kwargs)
+        profiler.record(self.name, None, time.perf_counter() - start)
+        return results
+
+    def _post(self, args, kwargs):
+        """
+        Post the calls of the queued handlers to the event loop of the GUI thread.
+        """
+        for reference, function in self._queued:
+            owner = reference()
+            if owner is None:
+                self._drop(reference)
+                continue
+            EventQueue.__instance__.posted.emit(
+                self.name, function, (owner,) + args, kwargs
+            )
+
+    def _drop(self, reference, *args):
+        """
+        Drop the handlers of a deleted object.
+
+        :param reference: weak reference to the object.
+        :return:
+        """
+        self._calls = tuple(call for call in self._calls if call[0] is not reference)
+        self._queued = tuple(call for call in self._queued if call[0] is not reference)
+
+    def _find(self, owner, function):
+        """
+        :return: True if the handler is connected.
+        """
+        return any(
+            current == function and reference() is owner
+            for reference, current in self._calls + self._queued
+        )
+
+    def _check(self, handler):
+        """
+        Verify that handler accepts the arguments of the event.
+
+        :param handler: callable.
+        :return:
+        :raise TypeError: if the handler cannot be called with the arguments of the event.
+        """
+        if not callable(handler):
+            raise TypeError("{} is not callable".format(handler))
+        try:
+            signature = inspect.signature(handler)
+        except (TypeError, ValueError):
+            # Methods of Qt classes have no signature
+            return
+        try:
+            signature.bind(*self.args)
+        except TypeError:
+            raise TypeError(
+                "{} cannot handle {!r}: {}".format(handler, self, signature)
+            ) from None
+
+    @staticmethod
+    def _split(handler):
+        """
+        Split a method in its object, kept weakly, and its function.
+
+        :param handler: callable.
+        :return: (object, function).
+        """
+        owner = getattr(handler, "__self__", None)
+        if owner is None or inspect.ismodule(owner) or inspect.isclass(owner):
+            # Functions are kept, called through _call_function
+            return handler, _call_function
+        if inspect.ismethod(handler):
+            return owner, handler.__func__
+        # Method of a Qt class (QWidget.show...)
+        return owner, getattr(type(owner), handler.__name__)
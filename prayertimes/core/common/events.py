@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# --------------------------------------------------------------------------- #
+# QuantumPT - Open Source Portable Islamic prayer times reminder              #
+# --------------------------------------------------------------------------- #
+# Copyright (c) 2016 QuantumPT Developer                                      #
+# --------------------------------------------------------------------------- #
+# This program is free software; you can redistribute it and/or modify it     #
+# under the terms of the GNU General Public License as published by the Free  #
+# Software Foundation; version 3 of the License.                              #
+#                                                                             #
+# This program is distributed in the hope that it will be useful, but WITHOUT #
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or       #
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for    #
+# more details.                                                               #
+# --------------------------------------------------------------------------- #
+
+
+"""
+Events of the program.
+
+Components connect their handlers to the events they handle and emit the events by object,
+a misspelled event is an AttributeError where it is used instead of an event silently
+handled by nobody:
+
+    events.set_main_stack.connect(self.set_stack)
+    events.set_main_stack.emit(idx)
+
+Registry().register_function(name) and Registry().execute(name) use the same events.
+"""
+
+from prayertimes.core.common.eventbus import Event
+
+# Life cycle of the components (RegistryMixin)
+application_init = Event("__application_init__")
+application_post_init = Event("__application_post_init__")
+application_clean = Event("__application_clean__")
+
+# Main window
+close_application = Event("close_application")
+hide_app_in_systray = Event("hide_app_in_systray")
+activate_global_blur = Event("activate_global_blur")
+desactivate_global_blur = Event("desactivate_global_blur")
+activate_dialog_blur = Event("activate_dialog_blur")
+desactivate_dialog_blur = Event("desactivate_dialog_blur")
+activate_overlay = Event("activate_overlay")
+desactivate_overlay = Event("desactivate_overlay")
+expand_main_frame_selector = Event("expand_main_frame_selector")
+hide_main_frame_selector = Event("hide_main_frame_selector")
+set_main_stack = Event("set_main_stack", ("index",))
+show_floating_notification = Event("show_floating_notification", ("text", "duration"))
+update_display_information = Event(
+    "update_display_information",
+    ("calc", "asr_method", "dua_after_athan", "city_object"),
+)
+update_city_information = Event("update_city_information", ("city_object",))
+
+# Settings and profiles
+restore_default_settings = Event("restore_default_settings")
+save_profile = Event("save_profile", ("name",))
+switch_profile = Event("switch_profile", ("profile_id",))
+delete_profile = Event("delete_profile", ("profile_id",))
+
+# Prayer times
+update_prayer_scheduler = Event("update_prayer_scheduler")
+update_calculation_method = Event("update_calculation_method", ("calc",))
+update_asr_settings = Event("update_asr_settings", ("asr_method",))
+update_time_format = Event("update_time_format")
+validate_prayertimes = Event("validate_prayertimes")
+load_city_configuration = Event("load_city_configuration")
+shutdown_scheduler = Event("shutdown_scheduler")
+
+# Athans and duas
+stop_current_athan = Event("stop_current_athan")
+pause_all_athans = Event("pause_all_athans")
+resume_all_athans = Event("resume_all_athans")
+stop_preview_athan = Event("stop_preview_athan")
+control_preview_athan = Event("control_preview_athan", ("index",))
+change_current_athan = Event("change_current_athan", ("index",))
+log_athan_trace = Event("log_athan_trace")
+
+# Diagnostics
+log_registry_profile = Event("log_registry_profile")
@@ -1,26 +1,101 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
+import atexit
 import logging
+import os
+import queue
+import threading
 
 from PyQt6.QtCore import QDir
 
-from logging.handlers import RotatingFileHandler
+from collections import Counter
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 
 logs_root_dir = QDir().currentPath() + "/logs"
 log_file = logs_root_dir + "/program_logs.log"
 log = None
+listener = None
+
+# Environment variable giving the log level, it has priority over the settings
+LOG_LEVEL_VARIABLE = "QUANTUMPT_LOG_LEVEL"
+
+# Records waiting to be written, the records logged when the queue is full are dropped
+QUEUE_SIZE = 10000
+
+
+class DroppingQueueHandler(QueueHandler):
+    """
+    Put the records in a bounded queue written by a background thread (QueueListener).
+
+    The message is merged with its arguments in the calling thread, the arguments can
+    change once logged. The records logged when the queue is full are counted and dropped,
+    a warning gives their number once the queue accepts records again.
+    """
+
+    def __init__(self, record_queue):
+        super(DroppingQueueHandler, self).__init__(record_queue)
+        # {level name: number of records dropped}
+        self.dropped = Counter()
+        self.unreported = 0
+        self._lock = threading.Lock()
+
+    def prepare(self, record):
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record):
+        if self.unreported:
+            self._report_dropped(record)
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._lock:
+                self.dropped[record.levelname] += 1
+                self.unreported += 1
+
+    def _report_dropped(self, record):
+        """
+        Queue a warning giving the number of records dropped since the last warning.
+
+        :param record: record logged, gives the location of the warning.
+        :return:
+        """
+        with self._lock:
+            count, self.unreported = self.unreported, 0
+        warning = logging.makeLogRecord(
+            dict(
+                record.__dict__,
+                levelno=logging.WARNING,
+                levelname="WARNING",
+                msg="%d log records dropped, the log queue was full",
+                args=(count,),
+                exc_info=None,
+                exc_text=None,
+                stack_info=None,
+            )
+        )
+        try:
+            self.queue.put_nowait(self.prepare(warning))
+        except queue.Full:
+            with self._lock:
+                self.unreported += count
 
 
 def set_logger():
     """
     Define a log file for logging program output.
 
+    The records are written by a background thread, the program only queues them.
+
     :return:
     """
-    global log
+    global log, listener
 
-    log = logging.Logger(level=logging.DEBUG, name="QuantumPT")
+    log = logging.getLogger("QuantumPT")
+    log.setLevel(logging.DEBUG)
+    log.propagate = False
 
     # Configure formatter
     formatter = logging.Formatter(
@@ -36,14 +111,58 @@ def set_logger():
     fh.setLevel(logging.DEBUG)
 
     fh.setFormatter(formatter)
-    log.addHandler(fh)
 
     # Stream logging
     ch = logging.StreamHandler()
     ch.setLevel(logging.DEBUG)
 
     ch.setFormatter(formatter)
-    log.addHandler(ch)
+
+    # The handlers are called by the listener thread
+    log.addHandler(DroppingQueueHandler(queue.Queue(QUEUE_SIZE)))
+    listener = QueueListener(log.handlers[0].queue, fh, ch, respect_handler_level=True)
+    listener.start()
+    atexit.register(stop_logger)
+
+    set_level(logging.DEBUG)
+
+
+def set_level(level):
+    """
+    Change the level of the logger, the environment variable QUANTUMPT_LOG_LEVEL is used
+    instead when it is set.
+
+    :param level: level name (DEBUG, INFO, WARNING, ERROR, CRITICAL) or number.
+    :return:
+    """
+    name = os.environ.get(LOG_LEVEL_VARIABLE) or level
+    level = logging.getLevelName(name.upper()) if isinstance(name, str) else name
+    if not isinstance(level, int):
+        log.error("Unknown log level %s", name)
+        return
+    if level != log.level:
+        log.setLevel(level)
+        log.info("Log level %s", logging.getLevelName(level))
+
+
+def stop_logger():
+    """
+    Write the records queued and stop the writer thread.
+
+    :return:
+    """
+    global listener
+
+    if listener is None:
+        return
+    dropped = log.handlers[0].dropped
+    if dropped:
+        log.warning(
+            "Log records dropped: %s",
+            ", ".join("{} {}".format(n, level) for level, n in dropped.items()),
+        )
+    listener.stop()
+    listener = None
 
 
 set_logger()
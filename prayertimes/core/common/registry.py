@@ -20,19 +20,32 @@
 # --------------------------------------------------------------------------- #
 
 import sys
+import time
 
 from prayertimes.core.common import trace_error_handler
+from prayertimes.core.common.eventbus import Event
 from prayertimes.core.common.logapi import log
 
+# Declare the events before the components register their functions
+from prayertimes.core.common import events
+
 
 class Registry(object):
     """
     This is the Component Registry. It is a singleton object and is used to
     provide a look up service for common objects.
+
+    The functions of the events declared in prayertimes.core.common.events are handled by
+    these events, the other names are looked up at each call.
+
+    Services can be declared with a factory and their dependencies (register_lazy), they are
+    built on the first get(), after their dependencies.
     """
 
     log.info("Registry loaded")
     __instance__ = None
+    # RegistryProfiler measuring the handlers, None when the Registry is not profiled
+    profiler = None
 
     def __new__(cls):
         """
@@ -52,6 +65,21 @@ class Registry(object):
         cls.service_list = {}
         cls.functions_list = {}
         cls.signals_list = {}
+        # {key: (factory, dependencies)} of the services built on demand
+        cls.factories = {}
+        # {key: seconds} spent in the factory of the services built
+        cls.build_times = {}
+        # Keys of the services being built, the last one is built by the current factory
+        cls.building = []
+        # Components created by a factory after the initialisation of the application
+        cls.late_components = []
+        # Keys of the services built when the main window was first painted
+        cls.first_paint = None
+        cls.started = False
+        RegistryProperty.restore()
+        for event in Event.declared.values():
+            event.clear()
+        events.application_init.connect(cls._start)
         # Allow the tests to remove Registry entries but not the live system
         cls.running_under_test = "nose" in sys.argv[0]
         cls.initialising = True
@@ -65,6 +93,8 @@ class Registry(object):
         """
         if key in self.service_list:
             return self.service_list[key]
+        elif key in self.factories:
+            return self._build(key)
         else:
             if not self.initialising:
                 trace_error_handler(log)
@@ -85,6 +115,117 @@ class Registry(object):
         else:
             self.service_list[key] = reference
 
+    def register_lazy(self, key, factory, depends=()):
+        """
+        Declare a service built on its first get().
+
+        :param key: The service to be created.
+        :param factory: function returning the service, called without arguments.
+        :param depends: keys of the services built before the service.
+        """
+        if key in self.service_list or key in self.factories:
+            trace_error_handler(log)
+            log.error("Duplicate service exception %s", key)
+            raise KeyError("Duplicate service exception %s" % key)
+        self.factories[key] = (factory, tuple(depends))
+
+    def _build(self, key):
+        """
+        Build a service declared with register_lazy, its dependencies first.
+
+        :param key: The service to be built.
+        :return: the service.
+        """
+        if key in self.building:
+            cycle = " -> ".join(self.building[self.building.index(key) :] + [key])
+            trace_error_handler(log)
+            log.error("Circular dependency of service %s: %s", key, cycle)
+            raise KeyError("Circular dependency of service %s: %s" % (key, cycle))
+        factory, depends = self.factories[key]
+        self.building.append(key)
+        late = len(self.late_components)
+        try:
+            for dependency in depends:
+                self.get(dependency)
+            late = len(self.late_components)
+            start = time.perf_counter()
+            service = factory()
+            # Unique components register themselves
+            if key not in self.service_list:
+                self.register(key, service)
+            self.build_times[key] = time.perf_counter() - start
+        finally:
+            self.building.pop()
+            components = self.late_components[late:]
+            del self.late_components[late:]
+        log.debug("Service %s built in %.1f ms", key, self.build_times[key] * 1000)
+
+        # The application was initialised before the components of the service existed
+        for component in components:
+            component.__application_init__()
+        for component in components:
+            component.__application_post_init__()
+        return self.service_list[key]
+
+    @classmethod
+    def _start(cls):
+        """
+        The components created from now on are initialised when their service is built.
+        """
+        cls.started = True
+
+    def mark_first_paint(self):
+        """
+        Remember the services built to display the main window the first time.
+
+        :return:
+        """
+        self.first_paint = set(self.service_list)
+        log.debug(
+            "First paint with %s services, %s services not built yet",
+            len(self.first_paint),
+            len(set(self.factories) - self.first_paint),
+        )
+        self.log_dependency_graph()
+
+    def dependency_graph(self):
+        """
+        Dependencies of the services, and for each service how and when it was built.
+
+        :return: {key: (dependencies, state)} with state one of 'first paint', 'on demand',
+            'not built'.
+        """
+        graph = {}
+        for key in sorted(set(self.service_list) | set(self.factories)):
+            depends = self.factories[key][1] if key in self.factories else ()
+            if key not in self.service_list:
+                state = "not built"
+            elif self.first_paint is None or key in self.first_paint:
+                state = "first paint"
+            else:
+                state = "on demand"
+            graph[key] = (depends, state)
+        return graph
+
+    def log_dependency_graph(self):
+        """
+        Log the dependencies of the services.
+
+        :return:
+        """
+        for key, (depends, state) in self.dependency_graph().items():
+            log.debug(
+                "service %-25s <- %-60s | %s%s",
+                key,
+                ", ".join(depends) or "-",
+                state,
+                (
+                    " ({:.1f} ms)".format(self.build_times[key] * 1000)
+                    if key in self.build_times
+                    else ""
+                ),
+            )
+
     def remove(self, key):
         """
         Removes the registry value from the list based on the key passed in
@@ -94,6 +235,7 @@ class Registry(object):
         """
         if key in self.service_list:
             del self.service_list[key]
+            RegistryProperty.restore()
 
     def register_function(self, event, _function):
         """
@@ -102,7 +244,9 @@ class Registry(object):
         :param event: The function description.
         :param _function: The function to be called when the event happens.
         """
-        if event in self.functions_list:
+        if event in Event.declared:
+            Event.declared[event].connect(_function)
+        elif event in self.functions_list:
             self.functions_list[event].append(_function)
         else:
             self.functions_list[event] = [_function]
@@ -114,7 +258,9 @@ class Registry(object):
         :param event: The function description.
         :param _function: The function to be called when the event happens.
         """
-        if event in self.functions_list:
+        if event in Event.declared:
+            Event.declared[event].disconnect(_function)
+        elif event in self.functions_list:
             self.functions_list[event].remove(_function)
 
     def execute(self, event, *args, **kwargs):
@@ -125,19 +271,29 @@ class Registry(object):
         :param args: Parameters to be passed to the function.
         :param kwargs: Parameters to be passed to the function.
         """
+        if event in Event.declared:
+            return Event.declared[event].emit(*args, **kwargs)
         results = []
+        profiler = self.profiler
+        start = time.perf_counter() if profiler is not None else 0
         if event in self.functions_list:
             for _function in self.functions_list[event]:
                 try:
-                    result = _function(*args, **kwargs)
+                    if profiler is None:
+                        result = _function(*args, **kwargs)
+                    else:
+                        result = profiler.call(
+                            event, _function, _function, args, kwargs
+                        )
                     if result:
                         results.append(result)
                 except TypeError:
                     trace_error_handler(log)
                     log.exception("Exception for function %s", _function)
         else:
-            trace_error_handler(log)
             log.error("Event %s called but not registered" % event)
+        if profiler is not None:
+            profiler.record(event, None, time.perf_counter() - start)
         return results
 
     def register_signal(self, event, signal):
@@ -161,10 +317,16 @@ class Registry(object):
         :param kwargs: Parameters to be passed to the signal.
         """
         results = []
+        profiler = self.profiler
+        start = time.perf_counter() if profiler is not None else 0
         if event in self.signals_list:
             for signal in self.signals_list[event]:
                 try:
-                    result = signal.emit(*args, **kwargs)
+                    if profiler is None:
+                        result = signal.emit(*args, **kwargs)
+                    else:
+                        # Measures the slots connected directly to the signal
+                        result = profiler.call(event, signal, signal.emit, args, kwargs)
                     if result:
                         results.append(result)
                 except TypeError:
@@ -173,4 +335,55 @@ class Registry(object):
         else:
             trace_error_handler(log)
             log.error("Signal %s called but not registered" % event)
+        if profiler is not None:
+            profiler.record(event, None, time.perf_counter() - start)
         return results
+
+
+class RegistryProperty(object):
+    """
+    Service of the Registry as an attribute of a class (see RegistryProperties).
+
+    The first access resolves the service with Registry().get and replaces the descriptor by
+    the service in its class: the next accesses are plain class attribute reads, shared by
+    all the instances. The descriptors are put back when a service is removed from the
+    Registry, the services are resolved again on their next access.
+    """
+
+    # Descriptors replaced by their service
+    resolved = []
+
+    def __init__(self, key, doc=None):
+        """
+        :param key: key of the service in the Registry.
+        :param doc: docstring of the attribute.
+        """
+        self.key = key
+        self.__doc__ = doc
+        self.owner = None
+        self.name = None
+
+    def __set_name__(self, owner, name):
+        self.owner = owner
+        self.name = name
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        service = Registry().get(self.key)
+        # A service not registered yet is looked up again on the next access
+        if service is not None:
+            setattr(self.owner, self.name, service)
+            RegistryProperty.resolved.append(self)
+        return service
+
+    @classmethod
+    def restore(cls):
+        """
+        Put back the descriptors replaced by their service.
+
+        :return:
+        """
+        for descriptor in cls.resolved:
+            setattr(descriptor.owner, descriptor.name, descriptor)
+        del cls.resolved[:]
@@ -19,7 +19,7 @@
 # project : https://openlp.org                                                #
 # --------------------------------------------------------------------------- #
 
-from prayertimes.core.common import de_hump
+from prayertimes.core.common import de_hump, events
 from prayertimes.core.common.registry import Registry
 
 
@@ -36,13 +36,15 @@ class RegistryMixin(object):
             super(RegistryMixin, self).__init__(parent)
         except TypeError:
             super(RegistryMixin, self).__init__()
-        Registry().register_function("__application_init__", self.__application_init__)
-        Registry().register_function(
-            "__application_post_init__", self.__application_post_init__
-        )
-        Registry().register_function(
-            "__application_clean__", self.__application_clean__
-        )
+        registry = Registry()
+        if registry.started and registry.building:
+            # Built on demand after the initialisation, the registry calls the hooks once
+            # the service is built
+            registry.late_components.append(self)
+        else:
+            events.application_init.connect(self.__application_init__)
+            events.application_post_init.connect(self.__application_post_init__)
+        events.application_clean.connect(self.__application_clean__)
 
     def __application_init__(self):
         """Override"""
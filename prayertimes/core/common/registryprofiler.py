@@ -0,0 +1,240 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# --------------------------------------------------------------------------- #
+# QuantumPT - Open Source Portable Islamic prayer times reminder              #
+# --------------------------------------------------------------------------- #
+# Copyright (c) 2016 QuantumPT Developer                                      #
+# --------------------------------------------------------------------------- #
+# This program is free software; you can redistribute it and/or modify it     #
+# under the terms of the GNU General Public License as published by the Free  #
+# Software Foundation; version 3 of the License.                              #
+#                                                                             #
+# This program is distributed in the hope that it will be useful, but WITHOUT #
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or       #
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for    #
+# more details.                                                               #
+# --------------------------------------------------------------------------- #
+
+import threading
+import time
+
+from collections import OrderedDict, deque
+
+from prayertimes.core.common import percentile
+from prayertimes.core.common.eventbus import Event
+from prayertimes.core.common.logapi import log
+from prayertimes.core.common.registry import Registry
+
+
+class DispatchStats(object):
+    """
+    Durations (seconds) of the dispatches of an event or of the calls of a handler.
+    """
+
+    __slots__ = ("count", "total", "max", "durations")
+
+    def __init__(self, size):
+        """
+        :param size: number of durations kept for the percentiles.
+        """
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.durations = deque(maxlen=size)
+
+    def add(self, duration):
+        self.count += 1
+        self.total += duration
+        if duration > self.max:
+            self.max = duration
+        self.durations.append(duration)
+
+    def to_dict(self, percentiles):
+        """
+        :param percentiles: percentiles wanted (0 - 100).
+        :return: {count, total, p50, p90, p99, max} with durations in milliseconds.
+        """
+        durations = sorted(self.durations)
+        stats = OrderedDict(count=self.count, total=self.total * 1000)
+        for p in percentiles:
+            stats["p{}".format(p)] = percentile(durations, p) * 1000
+        stats["max"] = self.max * 1000
+        return stats
+
+
+class RegistryProfiler(object):
+    """
+    Opt-in profiling of the dispatches of the Registry: declared events (emit and
+    Registry().execute), functions of the events not declared and signals
+    (Registry().emit_signal).
+
+    For each event the number of dispatches and their cumulative duration and percentiles
+    are recorded, and the same for each handler of the event. Handlers taking more than
+    slow_threshold milliseconds on the GUI thread are logged when they return.
+
+    When the profiling is disabled the dispatch only checks that no profiler is set.
+    """
+
+    percentiles = (50, 90, 99)
+
+    # Milliseconds of a handler on the GUI thread logged as slow (a frame at 60 Hz)
+    slow_threshold = 16.0
+
+    # Durations kept per event and per handler for the percentiles
+    samples = 1000
+
+    __instance__ = None
+
+    def __new__(cls):
+        """
+        Re-implement method __new__ to have a singleton.
+        """
+        if not cls.__instance__:
+            cls.__instance__ = object.__new__(cls)
+            # {event: DispatchStats}
+            cls.__instance__.events = OrderedDict()
+            # {(event, handler name): DispatchStats}
+            cls.__instance__.handlers = OrderedDict()
+            cls.__instance__._lock = threading.Lock()
+        return cls.__instance__
+
+    @property
+    def enabled(self):
+        return Event.profiler is self
+
+    def enable(self, enabled=True):
+        """
+        Start or stop the profiling, the recorded durations are kept.
+
+        :param enabled: profile the dispatches or not.
+        :return:
+        """
+        if enabled == self.enabled:
+            return
+        Event.profiler = Registry.profiler = self if enabled else None
+        log.info("Registry profiling %s", "enabled" if enabled else "disabled")
+
+    def reset(self):
+        """
+        Forget the recorded durations.
+
+        :return:
+        """
+        with self._lock:
+            self.events.clear()
+            self.handlers.clear()
+
+    def call(self, event, handler, function, args, kwargs):
+        """
+        Call a handler of an event and record its duration.
+
+        :param event: name of the event.
+        :param handler: handler connected to the event, gives the name of the handler.
+        :param function: function called.
+        :param args: arguments of the call.
+        :param kwargs: arguments of the call.
+        :return: result of the call.
+        """
+        start = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            self.record(event, handler, time.perf_counter() - start)
+
+    def record(self, event, handler, duration):
+        """
+        Record the duration of a handler, or of a whole dispatch.
+
+        :param event: name of the event.
+        :param handler: handler of the event, None for the dispatch of the event.
+        :param duration: duration in seconds.
+        :return:
+        """
+        if handler is None:
+            with self._lock:
+                stats = self.events.get(event)
+                if stats is None:
+                    stats = self.events[event] = DispatchStats(self.samples)
+                stats.add(duration)
+            return
+
+        name = self.handler_name(handler)
+        with self._lock:
+            stats = self.handlers.get((event, name))
+            if stats is None:
+                stats = self.handlers[(event, name)] = DispatchStats(self.samples)
+            stats.add(duration)
+        if (
+            duration * 1000 > self.slow_threshold
+            and threading.current_thread() is threading.main_thread()
+        ):
+            log.warning(
+                "Slow handler %s of %s on the GUI thread: %.1f ms",
+                name,
+                event,
+                duration * 1000,
+            )
+
+    @staticmethod
+    def handler_name(handler):
+        """
+        :param handler: function, method or pyqt signal.
+        :return: readable name of the handler, e.g. 'MainFrame.set_stack'.
+        """
+        name = getattr(handler, "__qualname__", None)
+        if name is not None:
+            return name
+        signal = getattr(handler, "signal", None)
+        if isinstance(signal, str):
+            # Signature of a bound pyqt signal, '2modify_style()'
+            return "signal {}".format(signal[1:])
+        return repr(handler)
+
+    def summary(self):
+        """
+        Statistics of the events and of their handlers, the most expensive events first.
+
+        :return: {event : {'dispatch': stats, handler name: stats}} with stats as
+            {count, total, p50, p90, p99, max} and durations in milliseconds.
+        """
+        with self._lock:
+            events = [
+                (event, stats.to_dict(self.percentiles))
+                for event, stats in self.events.items()
+            ]
+            handlers = [
+                (key, stats.to_dict(self.percentiles))
+                for key, stats in self.handlers.items()
+            ]
+
+        summary = OrderedDict()
+        for event, stats in sorted(events, key=lambda item: -item[1]["total"]):
+            summary[event] = OrderedDict(dispatch=stats)
+        for (event, name), stats in sorted(
+            handlers, key=lambda item: -item[1]["total"]
+        ):
+            summary.setdefault(event, OrderedDict())[name] = stats
+        return summary
+
+    def log_summary(self):
+        """
+        Log the report of the profiling.
+
+        :return:
+        """
+        summary = self.summary()
+        if not summary:
+            return
+        log.info("Registry profile (durations in ms):")
+        for event, calls in summary.items():
+            for name, stats in calls.items():
+                log.info(
+                    "registry %-30s | %-45s | %s",
+                    event,
+                    name,
+                    " ".join(
+                        ("{}={:.3f}".format(k, v) if k != "count" else "n={}".format(v))
+                        for k, v in stats.items()
+                    ),
+                )
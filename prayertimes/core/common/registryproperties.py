@@ -19,8 +19,7 @@
 # project : https://openlp.org                                                #
 # --------------------------------------------------------------------------- #
 
-from prayertimes.core.common.registry import Registry
-from prayertimes.core.common import is_win
+from prayertimes.core.common.registry import RegistryProperty
 
 
 class RegistryProperties(object):
@@ -28,63 +27,12 @@ class RegistryProperties(object):
     This adds registry components to classes to use at run time.
     """
 
-    @property
-    def application(self):
-        """
-        Adds the praypertimes to the class dynamically.
-        Windows needs to access the application in a dynamic manner.
-        """
-        if is_win():
-            return Registry().get("application")
-        else:
-            if not hasattr(self, "_application") or not self._application:
-                self._application = Registry().get("application")
-            return self._application
-
-    @property
-    def global_frame(self):
-        """
-        Adds the global_frame to the class dynamically.
-        """
-        if not hasattr(self, "_global_frame") or not self._global_frame:
-            self._global_frame = Registry().get("global_frame")
-        return self._global_frame
-
-    @property
-    def prayer_frame(self):
-        """
-        Adds the prayers container frame to the class dynamically.
-        """
-        if (
-            not hasattr(self, "_prayers_container_frame")
-            or not self._prayers_container_frame
-        ):
-            self._prayers_container_frame = Registry().get("prayers_container_frame")
-        return self._prayers_container_frame
-
-    @property
-    def media_manager(self):
-        """
-        Adds the media manager to the class dynamically.
-        """
-        if not hasattr(self, "_media_manager") or not self._media_manager:
-            self._media_manager = Registry().get("media_manager")
-        return self._media_manager
-
-    @property
-    def prayer_manager(self):
-        """
-        Adds the prayer manager to the class dynamically.
-        """
-        if not hasattr(self, "_prayer_manager") or not self._prayer_manager:
-            self._prayer_manager = Registry().get("prayer_manager")
-        return self._prayer_manager
-
-    @property
-    def scheduler_manager(self):
-        """
-        Adds the scheduler manager to the class dynamically.
-        """
-        if not hasattr(self, "_scheduler_manager") or not self._scheduler_manager:
-            self._scheduler_manager = Registry().get("scheduler_manager")
-        return self._scheduler_manager
+    # Removed from the Registry on exit, needed on Windows to avoid crashes
+    application = RegistryProperty("application", "The QuantumPT application.")
+    global_frame = RegistryProperty("global_frame", "The main window.")
+    prayer_frame = RegistryProperty(
+        "prayers_container_frame", "The prayers container frame."
+    )
+    media_manager = RegistryProperty("media_manager", "The media manager.")
+    prayer_manager = RegistryProperty("prayer_manager", "The prayer manager.")
+    scheduler_manager = RegistryProperty("scheduler_manager", "The scheduler manager.")
@@ -19,57 +19,120 @@
 # project : https://openlp.org                                                #
 # --------------------------------------------------------------------------- #
 
-from PyQt6.QtCore import QSettings
-
+from prayertimes.core.common import events
 from prayertimes.core.common.logapi import log
-from prayertimes.core.common.registry import Registry
+from prayertimes.core.common.settingsschema import (
+    SCHEMA,
+    SECTIONS,
+    SettingsSection,
+    compile_schema,
+)
+from prayertimes.core.common.settingsstore import SettingsStore
 
 from prayertimes.utils.date_timezone import get_utc_offset
 
 
-class Settings(QSettings):
+class Settings(object):
     """
-    Class to wrap QSettings.
+    Access to the settings of the program.
+
+    Settings() is cheap to call anywhere: it is a singleton over the SettingsStore, which reads
+    the ini file once, serves typed values from memory and writes the changes in the
+    background.
+
+    The settings are declared in settingsschema.SCHEMA. Besides value(key), each section of
+    the file is available as typed attributes: Settings().prayer.calculation,
+    Settings().general.volume, Settings().city.latitude, Settings().offsets.fajr.
     """
 
-    default_config = {
-        "city/continent": "Europe",
-        "city/country": "France",
-        "city/cc": "FR",
-        "city/city": "Paris",
-        "city/state": "Ile-de-France",
-        "city/latitude": 49.25,
-        "city/longitude": 4.03,
-        "city/timezone": "Europe/Paris",
-        "city/utc": 2,
-        "prayer_offsets/fajr": 0,
-        "prayer_offsets/shourouq": 0,
-        "prayer_offsets/dhuhr": 0,
-        "prayer_offsets/asr": 0,
-        "prayer_offsets/maghrib": 0,
-        "prayer_offsets/isha": 0,
-        "prayer_settings/asr_method": "standard",
-        "prayer_settings/calculation": "ISNA",
-        "prayer_settings/dua_after_athan": 1,
-        "general_settings/arabic_names": 0,
-        "general_settings/wizard_runned": 0,
-        "general_settings/close": 0,
-        "general_settings/splashscreen": 1,
-        "general_settings/language": "en_US",
-        "general_settings/volume": 100,
-    }
+    __instance__ = None
+
+    # {key: Setting} and {section: {name: Setting}}, compiled once
+    schema, sections = compile_schema(SCHEMA)
+
+    default_config = {key: setting.default for key, setting in schema.items()}
 
     current_config = {}
 
     file_path = "settings.ini"
 
-    def __init__(self):
-        super(Settings, self).__init__(self.file_path, QSettings.Format.IniFormat)
-        QSettings().setFallbacksEnabled(False)  # File only, no fallback to registry.
+    def __new__(cls):
+        """
+        Re-implement method __new__ to have a singleton.
+        """
+        if not cls.__instance__:
+            cls.__instance__ = object.__new__(cls)
+            for section, fields in cls.sections.items():
+                setattr(
+                    cls.__instance__,
+                    SECTIONS[section],
+                    SettingsSection(cls.__instance__, fields),
+                )
+            SettingsStore().listeners.append(cls.__instance__._store_changed)
+            # Load the file now, the sections are read without going through the store
+            store = cls.__instance__.store
+            cls.__instance__._store_changed(
+                {key: store.get(key) for key in store.keys()}
+            )
+            events.restore_default_settings.connect(
+                cls.__instance__.set_up_default_values
+            )
+        return cls.__instance__
 
-        Registry().register_function(
-            "restore_default_settings", self.set_up_default_values
-        )
+    @property
+    def store(self):
+        store = SettingsStore()
+        store.open(self.file_path, self._convert_key, self.default_config.get)
+        return store
+
+    def _store_changed(self, changes):
+        """
+        Update the attributes of the sections with the values of the store.
+
+        :param changes: {key: value} changed.
+        :return:
+        """
+        for key, value in changes.items():
+            setting = self.schema.get(key)
+            if setting is not None:
+                object.__setattr__(
+                    getattr(self, SECTIONS[setting.section]), setting.name, value
+                )
+
+    def fileName(self):
+        return self.file_path
+
+    def allKeys(self):
+        return self.store.keys()
+
+    def contains(self, key):
+        return self.store.contains(key)
+
+    def setValue(self, key, value):
+        """
+        Change the value of key, the settings file is written in the background.
+
+        :param key: key of the setting (group/name).
+        :param value: new value.
+        :return:
+        """
+        self.store.set(key, value)
+
+    def sync(self):
+        """
+        Write the pending changes to the settings file now.
+
+        :return:
+        """
+        self.store.flush()
+
+    def clear(self):
+        """
+        Remove all the settings and the settings file.
+
+        :return:
+        """
+        self.store.clear(remove_file=True)
 
     def save_city_config(self, city_dict):
         """
@@ -78,7 +141,7 @@ class Settings(QSettings):
         :param city_dict:
         :return:
         """
-        log.debug("saving city config: \n{}".format(city_dict))
+        log.debug("saving city config: \n%s", city_dict)
         self.setValue("city/continent", city_dict["continent"])
         self.setValue("city/country", city_dict["country"])
         self.setValue("city/cc", city_dict["cc"].lower())
@@ -107,7 +170,7 @@ class Settings(QSettings):
             utc=self.value("city/utc", type=float),
         )
 
-        log.debug("loading city config: \n{}".format(city_dict))
+        log.debug("loading city config: \n%s", city_dict)
         return city_dict
 
     def save_prayer_offsets_config(self, prayer_offsets):
@@ -117,7 +180,7 @@ class Settings(QSettings):
         :param prayer_offsets:
         :return:
         """
-        log.debug("saving prayer offsets: \n{}".format(prayer_offsets))
+        log.debug("saving prayer offsets: \n%s", prayer_offsets)
         for p_name, offset in prayer_offsets.items():
             self.setValue("prayer_offsets/{}".format(p_name.lower()), offset)
 
@@ -125,12 +188,13 @@ class Settings(QSettings):
     def set_filename(ini_file):
         """
         Sets the complete path to an Ini file to be used by Settings objects.
-        Does not affect existing Settings objects.
 
         :param ini_file: the name of .ini file
         :return:
         """
         Settings.file_path = ini_file
+        if Settings.__instance__ is not None:
+            Settings.__instance__.store.keys()
 
     def set_up_default_values(self):
         """
@@ -197,54 +261,34 @@ class Settings(QSettings):
         :param key: the key we want its default value.
         :return: the default value of the key given in parameter.
         """
-        if self.group():
-            key = self.group() + "/" + key
         return Settings.default_config[key]
 
     def value(self, key, **kwargs):
         """
         Returns the value for the given ``key``. The returned ``value`` is of the same
-        type as the default value in the *Settings.default_config* dict.
+        type as the default value in the *Settings.default_config* dict, values are
+        converted once when they are loaded or set.
 
         :param key: The key to return the value from.
+        :param type: optional type to convert the value to.
         :return:
         """
-        # if group() is not empty the group has not been specified together with the key.
-        if self.group():
-            default_value = Settings.default_config[self.group() + "/" + key]
-        else:
-            default_value = Settings.default_config[key]
-        setting = super(Settings, self).value(key, default_value, **kwargs)
-        return self._convert_value(setting, default_value)
+        setting = self.store.get(key, Settings.default_config[key])
+        if "type" in kwargs:
+            return kwargs["type"](setting)
+        return setting
 
     @staticmethod
-    def _convert_value(setting, default_value):
-        """
-        This converts the given ``setting`` to the type of the given ``default_value``.
-
-        :param setting: The setting to convert. This could be ``true`` for example.Settings()
-        :param default_value: Indication the type the setting should be converted to. For example ``True``
-        (type is boolean), meaning that we convert the string ``true`` to a python boolean.
-
-        **Note**, this method only converts a few types and might need to be extended if a certain type is missing!
-        """
-        # Handle 'None' type (empty value) properly.
-        if setting is None:
-            # An empty string saved to the settings results in a None type being returned.
-            # Convert it to empty unicode string.
-            if isinstance(default_value, str):
-                return ""
-            # An empty list saved to the settings results in a None type being returned.
-            else:
-                return []
-        # Convert the setting to the correct type.
-        if isinstance(default_value, bool):
-            if isinstance(setting, bool):
-                return setting
-            # Sometimes setting is string instead of a boolean.
-            return setting == "true"
-        if isinstance(default_value, int):
-            return int(setting)
-        if isinstance(default_value, float):
-            return float(setting)
-        return setting
+    def _convert_key(key, setting):
+        """
+        Convert the value of key to the type declared in the schema, invalid values are
+        replaced by the default value.
+
+        :param key: key of the setting.
+        :param setting: value read from the file or set.
+        :return:
+        """
+        declaration = Settings.schema.get(key)
+        if declaration is None:
+            return setting
+        return declaration.migrate(setting)
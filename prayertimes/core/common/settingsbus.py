@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# --------------------------------------------------------------------------- #
+# QuantumPT - Open Source Portable Islamic prayer times reminder              #
+# --------------------------------------------------------------------------- #
+# Copyright (c) 2016 QuantumPT Developer                                      #
+# --------------------------------------------------------------------------- #
+# This program is free software; you can redistribute it and/or modify it     #
+# under the terms of the GNU General Public License as published by the Free  #
+# Software Foundation; version 3 of the License.                              #
+#                                                                             #
+# This program is distributed in the hope that it will be useful, but WITHOUT #
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or       #
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for    #
+# more details.                                                               #
+# --------------------------------------------------------------------------- #
+
+import threading
+
+from PyQt6.QtCore import QObject, Qt, pyqtSignal
+
+from prayertimes.core.common.logapi import log
+from prayertimes.core.common.settings import Settings
+from prayertimes.core.common.settingsstore import SettingsStore
+
+
+class SettingsBus(QObject):
+    """
+    Publish the changes of the settings.
+
+    Consumers subscribe to a key (prayer_settings/calculation) or to a group of the schema
+    (calculation, location, offsets, audio...). The changes are collected and dispatched
+    once per turn of the event loop of the bus (the GUI thread): saving a city (nine keys)
+    calls a subscriber of the location group once, with the nine values.
+
+    Callbacks receive {key: new value} of the keys they subscribed to.
+    """
+
+    __instance__ = None
+    __initialised__ = False
+
+    dispatch_requested = pyqtSignal()
+
+    def __new__(cls):
+        """
+        Re-implement method __new__ to have a singleton.
+        """
+        if not cls.__instance__:
+            cls.__instance__ = super(SettingsBus, cls).__new__(cls)
+        return cls.__instance__
+
+    def __init__(self):
+        if self.__initialised__:
+            return
+        super(SettingsBus, self).__init__()
+        self.__initialised__ = True
+
+        # {key or group: [callback]}
+        self.subscriptions = {}
+        # {key: value} changed since the last dispatch
+        self.pending = {}
+        self._lock = threading.Lock()
+
+        self.dispatch_requested.connect(
+            self._dispatch, Qt.ConnectionType.QueuedConnection
+        )
+        SettingsStore().listeners.append(self._store_changed)
+
+    def subscribe(self, topic, callback):
+        """
+        Call callback when a setting of topic changes.
+
+        :param topic: key of a setting or group of settings.
+        :param callback: function called with {key: value}.
+        :return:
+        """
+        if topic not in Settings.schema and not any(
+            setting.group == topic for setting in Settings.schema.values()
+        ):
+            raise KeyError("unknown setting or group {}".format(topic))
+        callbacks = self.subscriptions.setdefault(topic, [])
+        if callback not in callbacks:
+            callbacks.append(callback)
+
+    def unsubscribe(self, topic, callback):
+        """
+        :param topic: key of a setting or group of settings.
+        :param callback: function given to subscribe.
+        :return:
+        """
+        callbacks = self.subscriptions.get(topic, [])
+        if callback in callbacks:
+            callbacks.remove(callback)
+
+    def _store_changed(self, changes):
+        """
+        Collect the changes of the store, can be called from any thread.
+
+        :param changes: {key: value} changed.
+        :return:
+        """
+        with self._lock:
+            scheduled = bool(self.pending)
+            self.pending.update(changes)
+        if not scheduled:
+            self.dispatch_requested.emit()
+
+    def _dispatch(self):
+        """
+        Call the subscribers of the changes collected, each subscriber once.
+
+        :return:
+        """
+        with self._lock:
+            changes, self.pending = self.pending, {}
+
+        calls = {}
+        for key, value in changes.items():
+            setting = Settings.schema.get(key)
+            topics = (key, setting.group) if setting is not None else (key,)
+            for topic in topics:
+                for callback in self.subscriptions.get(topic, ()):
+                    calls.setdefault(callback, {})[key] = value
+
+        if calls:
+            log.debug("settings bus: %s changed", ", ".join(changes))
+        for callback, values in calls.items():
+            try:
+                callback(values)
+            except Exception:
+                log.exception("settings bus: error in %s", callback)
@@ -0,0 +1,266 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# --------------------------------------------------------------------------- #
+# QuantumPT - Open Source Portable Islamic prayer times reminder              #
+# --------------------------------------------------------------------------- #
+# Copyright (c) 2016 QuantumPT Developer                                      #
+# --------------------------------------------------------------------------- #
+# This program is free software; you can redistribute it and/or modify it     #
+# under the terms of the GNU General Public License as published by the Free  #
+# Software Foundation; version 3 of the License.                              #
+#                                                                             #
+# This program is distributed in the hope that it will be useful, but WITHOUT #
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or       #
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for    #
+# more details.                                                               #
+# --------------------------------------------------------------------------- #
+
+"""
+Declaration of the settings of the program.
+
+Every setting has a key in the ini file (section/name), a type and a default value given by
+the default value, an optional validator and the group of its change notifications. Values
+are parsed and validated once, when the file is loaded or a value is set: invalid or legacy
+values are migrated there and readers always get a typed, valid value.
+
+Settings().prayer.calculation reads prayer_settings/calculation, the attributes of each
+section are plain attributes kept up to date by Settings.
+"""
+
+from prayertimes.core.common.logapi import log
+
+
+def choice(*values):
+    """
+    Validator accepting one of values, compared without case.
+
+    :param values: accepted values.
+    :return: the validator, returning the value as declared.
+    """
+    by_lower = {value.lower(): value for value in values}
+
+    def validate(value):
+        if value.lower() not in by_lower:
+            raise ValueError("expected one of {}".format(", ".join(values)))
+        return by_lower[value.lower()]
+
+    return validate
+
+
+def within(low, high):
+    """
+    Validator accepting a number between low and high (included).
+
+    :param low: minimum value.
+    :param high: maximum value.
+    :return: the validator.
+    """
+
+    def validate(value):
+        if not low <= value <= high:
+            raise ValueError("expected a value between {} and {}".format(low, high))
+        return value
+
+    return validate
+
+
+def id_list(value):
+    """
+    Validator of the lists of ids separated by commas (1,4,7).
+    """
+    ids = [part.strip() for part in value.split(",") if part.strip()]
+    if not all(part.isdigit() for part in ids):
+        raise ValueError("expected ids separated by commas")
+    return ",".join(ids)
+
+
+def flag(value):
+    """
+    Validator of the 0/1 settings.
+    """
+    if value not in (0, 1):
+        raise ValueError("expected 0 or 1")
+    return value
+
+
+class Setting(object):
+    """
+    Declaration of a setting.
+
+    :param key: key in the ini file (section/name).
+    :param default: default value, gives the type of the setting.
+    :param validator: function returning the valid (normalized) value or raising ValueError.
+    :param group: group of the change notifications, the section by default.
+    """
+
+    __slots__ = ("key", "default", "type", "validator", "group", "section", "name")
+
+    def __init__(self, key, default, validator=None, group=None):
+        self.key = key
+        self.default = default
+        self.type = type(default)
+        self.validator = validator
+        self.section, self.name = key.split("/", 1)
+        self.group = group or self.section
+
+    def parse(self, value):
+        """
+        Convert a value read from the ini file (or set) to the type of the setting.
+
+        :param value: value to convert.
+        :return: typed and validated value.
+        :raise ValueError: if the value is not valid.
+        """
+        if value is None:
+            # An empty value is read as None
+            if self.type is not str:
+                raise ValueError("empty value")
+            value = ""
+        if self.type is int and not isinstance(value, int):
+            # "2.0" was written by older versions for integers
+            value = float(value)
+            if not value.is_integer():
+                raise ValueError("expected an integer")
+        value = self.type(value)
+        if self.validator is not None:
+            value = self.validator(value)
+        return value
+
+    def migrate(self, value):
+        """
+        Convert a value, invalid values are replaced by the default value.
+
+        :param value: value to convert.
+        :return: typed and valid value.
+        """
+        try:
+            return self.parse(value)
+        except (TypeError, ValueError) as error:
+            log.error(
+                "settings: invalid value %r for %s (%s), using %r",
+                value,
+                self.key,
+                error,
+                self.default,
+            )
+            return self.default
+
+
+# Attribute of Settings giving access to each section of the ini file
+SECTIONS = {
+    "city": "city",
+    "prayer_offsets": "offsets",
+    "prayer_settings": "prayer",
+    "general_settings": "general",
+}
+
+SCHEMA = [
+    Setting("city/continent", "Europe", group="location"),
+    Setting("city/country", "France", group="location"),
+    Setting("city/cc", "FR", group="location"),
+    Setting("city/city", "Paris", group="location"),
+    Setting("city/state", "Ile-de-France", group="location"),
+    Setting("city/latitude", 49.25, within(-90.0, 90.0), group="location"),
+    Setting("city/longitude", 4.03, within(-180.0, 180.0), group="location"),
+    Setting("city/timezone", "Europe/Paris", group="location"),
+    Setting("city/utc", 2.0, within(-12.0, 14.0), group="location"),
+    Setting("prayer_offsets/fajr", 0, within(-500, 500), group="offsets"),
+    Setting("prayer_offsets/shourouq", 0, within(-500, 500), group="offsets"),
+    Setting("prayer_offsets/dhuhr", 0, within(-500, 500), group="offsets"),
+    Setting("prayer_offsets/asr", 0, within(-500, 500), group="offsets"),
+    Setting("prayer_offsets/maghrib", 0, within(-500, 500), group="offsets"),
+    Setting("prayer_offsets/isha", 0, within(-500, 500), group="offsets"),
+    Setting(
+        "prayer_settings/asr_method",
+        "Standard",
+        choice("Standard", "Hanafi"),
+        group="calculation",
+    ),
+    Setting(
+        "prayer_settings/calculation",
+        "ISNA",
+        choice("Egypt", "ISNA", "Jafari", "Karachi", "Makkah", "MWL", "Tehran", "UOIF"),
+        group="calculation",
+    ),
+    Setting("prayer_settings/athan", "", group="athan"),
+    Setting("prayer_settings/dua_after_athan", 1, flag, group="athan"),
+    Setting("prayer_settings/athan_prewarm", 30, within(0, 600), group="athan"),
+    Setting("prayer_settings/dua_blackout_before", 5, within(0, 120), group="dua"),
+    Setting("prayer_settings/dua_blackout_after", 15, within(0, 120), group="dua"),
+    Setting(
+        "prayer_settings/dua_blackout_policy",
+        "shift",
+        choice("shift", "skip"),
+        group="dua",
+    ),
+    Setting("general_settings/arabic_names", 0, flag, group="display"),
+    Setting("general_settings/wizard_runned", 0, flag),
+    Setting("general_settings/profile", 0, within(0, 2**31 - 1)),
+    Setting("general_settings/locations", "", id_list, group="locations"),
+    Setting("general_settings/close", 0, flag, group="display"),
+    Setting("general_settings/splashscreen", 1, flag, group="display"),
+    Setting("general_settings/language", "en_US", group="display"),
+    Setting("general_settings/volume", 100, within(0, 100), group="audio"),
+    Setting("general_settings/athan_trace", 0, flag),
+    Setting("general_settings/registry_profile", 0, flag),
+    Setting(
+        "general_settings/log_level",
+        "DEBUG",
+        choice("DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"),
+    ),
+    Setting("general_settings/loudness_normalization", 1, flag, group="audio"),
+    Setting("general_settings/loudness_target", -20, within(-60, 0), group="audio"),
+    Setting("general_settings/resident_media", 1, flag, group="audio"),
+    Setting(
+        "general_settings/audio_sink", "qt", choice("qt", "pipe", "null"), group="audio"
+    ),
+    Setting(
+        "general_settings/audio_sink_command",
+        "ffplay -nodisp -autoexit -loglevel quiet -ss {start} -volume {volume} -i pipe:0",
+        group="audio",
+    ),
+]
+
+
+class SettingsSection(object):
+    """
+    Typed attributes of the settings of a section, updated by Settings when the values change.
+    Assigning an attribute sets the value through Settings.
+    """
+
+    def __init__(self, settings, fields):
+        """
+        :param settings: Settings instance.
+        :param fields: {attribute name: Setting}.
+        """
+        object.__setattr__(self, "_settings", settings)
+        object.__setattr__(self, "_fields", fields)
+        for name, setting in fields.items():
+            object.__setattr__(self, name, setting.default)
+
+    def __setattr__(self, name, value):
+        setting = self._fields.get(name)
+        if setting is None:
+            raise AttributeError("unknown setting {}".format(name))
+        self._settings.setValue(setting.key, value)
+
+
+def compile_schema(schema):
+    """
+    Index the declarations of the settings.
+
+    :param schema: list of Setting.
+    :return: ({key: Setting}, {section: {name: Setting}}).
+    """
+    by_key = {}
+    sections = {}
+    for setting in schema:
+        if setting.key in by_key:
+            raise ValueError("setting {} declared twice".format(setting.key))
+        if setting.section not in SECTIONS:
+            raise ValueError("unknown section for setting {}".format(setting.key))
+        setting.parse(setting.default)
+        by_key[setting.key] = setting
+        sections.setdefault(setting.section, {})[setting.name] = setting
+    return by_key, sections
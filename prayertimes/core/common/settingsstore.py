@@ -0,0 +1,361 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# --------------------------------------------------------------------------- #
+# QuantumPT - Open Source Portable Islamic prayer times reminder              #
+# --------------------------------------------------------------------------- #
+# Copyright (c) 2016 QuantumPT Developer                                      #
+# --------------------------------------------------------------------------- #
+# This program is free software; you can redistribute it and/or modify it     #
+# under the terms of the GNU General Public License as published by the Free  #
+# Software Foundation; version 3 of the License.                              #
+#                                                                             #
+# This program is distributed in the hope that it will be useful, but WITHOUT #
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or       #
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for    #
+# more details.                                                               #
+# --------------------------------------------------------------------------- #
+
+import atexit
+import os
+import threading
+import time
+
+from PyQt6.QtCore import QSettings
+
+from prayertimes.core.common.logapi import log
+
+
+class SettingsStore(object):
+    """
+    Process-wide copy of the settings file.
+
+    The file is read once, the values are kept typed in memory and every read is served from
+    there. Changes are written back by a background writer once no change happened for
+    write_delay seconds (and on flush() or at exit), the file is replaced atomically.
+
+    Listeners are called with the values that changed ({key: value}): only the keys whose
+    value differs are given when the file is loaded, reloaded or cleared, a removed key gets
+    its default value. They are called without holding the lock of the store, from the
+    thread that changed the values.
+
+    The file can also be changed by another program (configuration management): reload()
+    applies the values changed in the file, the files written by the store itself are
+    recognised by their signature and ignored.
+    """
+
+    __instance__ = None
+
+    # Seconds without change before the file is written
+    write_delay = 1.0
+
+    def __new__(cls):
+        """
+        Re-implement method __new__ to have a singleton.
+        """
+        if not cls.__instance__:
+            cls.__instance__ = object.__new__(cls)
+            cls.__instance__.file_path = None
+            cls.__instance__.convert = None
+            cls.__instance__.default = None
+            # {key: typed value} of the file, None until the file is read
+            cls.__instance__.values = None
+            # Values of the previous file, compared with the file opened when it is read
+            cls.__instance__.previous = {}
+            cls.__instance__.dirty = False
+            cls.__instance__.deadline = 0
+            # (mtime, size, inode) of the file when it was last read or written by the store
+            cls.__instance__.signature = None
+            cls.__instance__._lock = threading.RLock()
+            cls.__instance__._changed = threading.Condition(cls.__instance__._lock)
+            cls.__instance__._write_lock = threading.Lock()
+            cls.__instance__._writer = None
+            cls.__instance__.listeners = []
+            atexit.register(cls.__instance__.flush)
+        return cls.__instance__
+
+    def open(self, file_path, convert=None, default=None):
+        """
+        Use the settings file file_path, the pending changes of the previous file are
+        written first. The file is read on the first access.
+
+        :param file_path: path of the ini file.
+        :param convert: function (key, value) returning the typed value of a key.
+        :param default: function (key) returning the value of a key that is not set.
+        :return:
+        """
+        if file_path == self.file_path:
+            return
+        self.flush()
+        with self._lock:
+            self.file_path = file_path
+            self.convert = convert
+            self.default = default
+            if self.values is not None:
+                self.previous = self.values
+            self.values = None
+
+    def get(self, key, default=None):
+        """
+        :param key: key of the setting (group/name).
+        :param default: value returned when the key is not set.
+        :return: typed value of the key.
+        """
+        values = self.values
+        if values is None:
+            values = self._load()
+        return values.get(key, default)
+
+    def contains(self, key):
+        values = self.values
+        if values is None:
+            values = self._load()
+        return key in values
+
+    def keys(self):
+        """
+        Return the keys that are set.
+
+        :return:
+        """
+        values = self.values
+        if values is None:
+            values = self._load()
+        return list(values)
+
+    def set(self, key, value):
+        """
+        Change a value, the file is written later by the background writer.
+
+        :param key: key of the setting (group/name).
+        :param value: new value.
+        :return: True if the value changed.
+        """
+        if self.convert is not None:
+            value = self.convert(key, value)
+        with self._lock:
+            loaded = self._read_once()
+            changed = key not in self.values or self.values[key] != value
+            if changed:
+                # Setting the default value of a key that is not set changes the file only
+                changes = self._diff(
+                    {key: self.values[key]} if key in self.values else {},
+                    {key: value},
+                )
+                self.values[key] = value
+                self._schedule()
+        if loaded:
+            self._notify(loaded)
+        if changed:
+            self._notify(changes)
+        return changed
+
+    def clear(self, remove_file=False):
+        """
+        Remove all the values.
+
+        :param remove_file: remove the settings file now instead of writing an empty file.
+        :return:
+        """
+        with self._lock:
+            changes = self._diff(self.values or {}, {})
+            self.values = {}
+            if remove_file:
+                self.dirty = False
+                self._changed.notify_all()
+            else:
+                self._schedule()
+        self._notify(changes)
+        if remove_file:
+            with self._write_lock:
+                if os.path.exists(self.file_path):
+                    os.remove(self.file_path)
+
+    def flush(self):
+        """
+        Write the pending changes now.
+
+        :return:
+        """
+        with self._write_lock:
+            with self._lock:
+                if not self.dirty:
+                    return
+                snapshot = dict(self.values)
+                file_path = self.file_path
+                self.dirty = False
+                self._changed.notify_all()
+
+            temp_path = file_path + ".tmp"
+            settings = QSettings(temp_path, QSettings.Format.IniFormat)
+            settings.clear()
+            for key in sorted(snapshot):
+                settings.setValue(key, snapshot[key])
+            settings.sync()
+            status = settings.status()
+            del settings
+            if status == QSettings.Status.NoError:
+                try:
+                    os.replace(temp_path, file_path)
+                except OSError as err:
+                    status = err
+            if status != QSettings.Status.NoError:
+                log.error("settings: cannot write %s (%s)", file_path, status)
+                with self._lock:
+                    self.dirty = True
+                    self.deadline = time.monotonic() + self.write_delay
+                return
+            self.signature = self._file_signature(file_path)
+            log.debug("settings: %s written", file_path)
+
+    def reload(self):
+        """
+        Read again the settings file changed by another program and apply the values that
+        differ from the values in memory. The values changed in the program and not written
+        yet are kept for the other keys, keys removed from the file are kept too.
+        Can be called from any thread, the file is read in the calling thread.
+
+        :return: {key: value} changed.
+        """
+        with self._write_lock:
+            file_path = self.file_path
+            signature = self._file_signature(file_path)
+            if self.values is None or signature is None or signature == self.signature:
+                return {}
+            values = self._read(file_path)
+            self.signature = signature
+
+        with self._lock:
+            if self.values is None or file_path != self.file_path:
+                return {}
+            changes = self._diff(self.values, dict(self.values, **values))
+            self.values.update(values)
+
+        if changes:
+            log.info(
+                "settings: %s changed in %s", ", ".join(sorted(changes)), file_path
+            )
+            self._notify(changes)
+        return changes
+
+    def _load(self):
+        """
+        Read the settings file the first time.
+
+        :return: {key: typed value}.
+        """
+        with self._lock:
+            loaded = self._read_once()
+            values = self.values
+        if loaded:
+            self._notify(loaded)
+        return values
+
+    def _read_once(self):
+        """
+        Read the settings file if it has not been read yet, the lock must be held. The caller
+        calls the listeners once the lock is released.
+
+        :return: {key: value} that differ from the previous file, empty if the file has
+                 already been read.
+        """
+        if self.values is not None:
+            return {}
+        self.signature = self._file_signature(self.file_path)
+        self.values = self._read(self.file_path)
+        changes = self._diff(self.previous, self.values)
+        self.previous = {}
+        return changes
+
+    def _diff(self, old, new):
+        """
+        Compare two sets of values, a key that is not set has its default value.
+
+        :param old: {key: value} before the change.
+        :param new: {key: value} after the change.
+        :return: {key: value in new} of the keys whose value differs.
+        """
+        default = self.default or (lambda key: None)
+        changes = {}
+        for key in set(old) | set(new):
+            value = new[key] if key in new else default(key)
+            if value != (old[key] if key in old else default(key)):
+                changes[key] = value
+        return changes
+
+    def _read(self, file_path):
+        """
+        Read a settings file.
+
+        :param file_path: path of the ini file.
+        :return: {key: typed value}.
+        """
+        settings = QSettings(file_path, QSettings.Format.IniFormat)
+        values = {}
+        for key in settings.allKeys():
+            value = settings.value(key)
+            values[key] = (
+                self.convert(key, value) if self.convert is not None else value
+            )
+        return values
+
+    @staticmethod
+    def _file_signature(file_path):
+        """
+        :param file_path: path of the file.
+        :return: (modification time, size, inode) of the file or None if it does not exist.
+        """
+        try:
+            stat = os.stat(file_path)
+        except (OSError, TypeError):
+            return None
+        return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+    def _notify(self, changes):
+        """
+        Call the listeners, never with the lock held.
+
+        :param changes: {key: value} changed.
+        :return:
+        """
+        if not changes:
+            return
+        for listener in self.listeners:
+            listener(changes)
+
+    def _schedule(self):
+        """
+        Ask the background writer to write the file write_delay seconds after the last change.
+
+        :return:
+        """
+        self.dirty = True
+        self.deadline = time.monotonic() + self.write_delay
+        if self._writer is None:
+            self._writer = threading.Thread(
+                target=self._write_behind, name="SettingsWriter", daemon=True
+            )
+            self._writer.start()
+        else:
+            self._changed.notify_all()
+
+    def _write_behind(self):
+        """
+        Background writer: wait until no change happened for write_delay seconds.
+
+        :return:
+        """
+        try:
+            while True:
+                with self._lock:
+                    while self.dirty and self.deadline > time.monotonic():
+                        self._changed.wait(self.deadline - time.monotonic())
+                    if not self.dirty:
+                        self._writer = None
+                        return
+                self.flush()
+        finally:
+            with self._lock:
+                # a writer stopped by an error is replaced on the next change
+                if self._writer is threading.current_thread():
+                    self._writer = None
@@ -0,0 +1,150 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# --------------------------------------------------------------------------- #
+# QuantumPT - Open Source Portable Islamic prayer times reminder              #
+# --------------------------------------------------------------------------- #
+# Copyright (c) 2016 QuantumPT Developer                                      #
+# --------------------------------------------------------------------------- #
+# This program is free software; you can redistribute it and/or modify it     #
+# under the terms of the GNU General Public License as published by the Free  #
+# Software Foundation; version 3 of the License.                              #
+#                                                                             #
+# This program is distributed in the hope that it will be useful, but WITHOUT #
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or       #
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for    #
+# more details.                                                               #
+# --------------------------------------------------------------------------- #
+
+
+import os
+import threading
+
+from PyQt6.QtCore import QFileSystemWatcher, QObject, QTimer
+
+from prayertimes.core.common.logapi import log
+from prayertimes.core.common.settingsstore import SettingsStore
+
+
+class SettingsWatcher(QObject):
+    """
+    Reload the settings file when it is changed by another program (configuration
+    management pushing settings.ini to the displays).
+
+    The file is read in a background thread once it has not changed for settle_delay
+    milliseconds, only the values that changed are applied, the SettingsBus then runs the
+    usual update paths (city, calculation method, offsets...). The files written by the
+    program itself are ignored by the SettingsStore.
+    """
+
+    __instance__ = None
+    __initialised__ = False
+
+    # Milliseconds without change of the file before it is read
+    settle_delay = 300
+
+    def __new__(cls):
+        """
+        Re-implement method __new__ to have a singleton.
+        """
+        if not cls.__instance__:
+            cls.__instance__ = super(SettingsWatcher, cls).__new__(cls)
+        return cls.__instance__
+
+    def __init__(self):
+        if self.__initialised__:
+            return
+        super(SettingsWatcher, self).__init__()
+        self.__initialised__ = True
+
+        self.file_path = None
+        # (mtime, size, inode) of the file when it was last seen, None if it does not exist
+        self.signature = None
+        self._reloader = None
+
+        # The directory is watched too: a file replaced (renamed over) is not watched anymore
+        self.watcher = QFileSystemWatcher(self)
+        self.watcher.fileChanged.connect(self._file_changed)
+        self.watcher.directoryChanged.connect(self._directory_changed)
+
+        self.settle_timer = QTimer(self)
+        self.settle_timer.setSingleShot(True)
+        self.settle_timer.setInterval(self.settle_delay)
+        self.settle_timer.timeout.connect(self._reload)
+
+    def watch(self, file_path):
+        """
+        Watch the settings file file_path.
+
+        :param file_path: path of the ini file.
+        :return:
+        """
+        self.stop()
+        self.file_path = os.path.abspath(file_path)
+        self.signature = self._file_signature()
+        self.watcher.addPath(os.path.dirname(self.file_path))
+        if os.path.exists(self.file_path):
+            self.watcher.addPath(self.file_path)
+        log.debug("settings watcher: watching %s", self.file_path)
+
+    def stop(self):
+        """
+        Stop watching the settings file.
+
+        :return:
+        """
+        self.settle_timer.stop()
+        paths = self.watcher.files() + self.watcher.directories()
+        if paths:
+            self.watcher.removePaths(paths)
+
+    def _directory_changed(self, path):
+        """
+        Called when a file of the directory changed. Other files are written next to the
+        settings (profiles, dua playlist, media index...), only the settings file is followed.
+
+        :param path: directory changed.
+        :return:
+        """
+        if self._file_signature() != self.signature:
+            self._file_changed(self.file_path)
+
+    def _file_changed(self, path):
+        """
+        Called when the file changed, appeared or has been replaced, wait for the file to
+        settle.
+
+        :param path: path changed.
+        :return:
+        """
+        self.signature = self._file_signature()
+        if self.file_path not in self.watcher.files() and os.path.exists(
+            self.file_path
+        ):
+            self.watcher.addPath(self.file_path)
+        self.settle_timer.start()
+
+    def _file_signature(self):
+        """
+        :return: (modification time, size, inode) of the file or None if it does not exist.
+        """
+        try:
+            stat = os.stat(self.file_path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+    def _reload(self):
+        """
+        Read the settings file in a background thread.
+
+        :return:
+        """
+        if self._reloader is not None and self._reloader.is_alive():
+            # Read the file again once the current reading is done
+            self.settle_timer.start()
+            return
+        self._reloader = threading.Thread(
+            target=SettingsStore().reload, name="SettingsReloader", daemon=True
+        )
+        self._reloader.start()
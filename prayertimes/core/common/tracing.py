@@ -0,0 +1,255 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# --------------------------------------------------------------------------- #
+# QuantumPT - Open Source Portable Islamic prayer times reminder              #
+# --------------------------------------------------------------------------- #
+# Copyright (c) 2016 QuantumPT Developer                                      #
+# --------------------------------------------------------------------------- #
+# This program is free software; you can redistribute it and/or modify it     #
+# under the terms of the GNU General Public License as published by the Free  #
+# Software Foundation; version 3 of the License.                              #
+#                                                                             #
+# This program is distributed in the hope that it will be useful, but WITHOUT #
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or       #
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for    #
+# more details.                                                               #
+# --------------------------------------------------------------------------- #
+
+import datetime
+import json
+import threading
+
+from collections import OrderedDict, deque
+
+from prayertimes.core.common import de_hump, percentile
+from prayertimes.core.common.clock import get_clock
+from prayertimes.core.common.logapi import log
+from prayertimes.core.common.resourceslocation import ResourcesLocation
+
+
+class AthanTrace(object):
+    """
+    Timestamps (epoch seconds) of the stages of one athan, from its scheduled time to its audible start.
+    """
+
+    def __init__(self, prayer, scheduled):
+        """
+        :param prayer: prayer name.
+        :param scheduled: scheduled time of the athan (epoch seconds).
+        """
+        self.prayer = prayer
+        self.scheduled = scheduled
+        self.spans = OrderedDict()
+        self.labels = OrderedDict()
+
+    @property
+    def name(self):
+        """
+        Name of the trace used to group summaries, e.g. 'Fajr [prewarmed=True]'.
+
+        :return:
+        """
+        if not self.labels:
+            return self.prayer
+        return "{} [{}]".format(
+            self.prayer, ", ".join("{}={}".format(k, v) for k, v in self.labels.items())
+        )
+
+    def drift(self, stage):
+        """
+        Get the drift of a stage from the scheduled time.
+
+        :param stage: name of the stage.
+        :return: drift in milliseconds or None if the stage has not been reached.
+        """
+        if stage not in self.spans or self.scheduled is None:
+            return None
+        return (self.spans[stage] - self.scheduled) * 1000
+
+    def to_dict(self):
+        """
+        Dictionary used to persist the trace.
+
+        :return:
+        """
+        return dict(
+            prayer=self.prayer,
+            scheduled=self.scheduled,
+            labels=self.labels,
+            spans=self.spans,
+            drifts={stage: self.drift(stage) for stage in self.spans},
+        )
+
+
+class AthanTracer(object):
+    """
+    Records the timing of each athan across the scheduler and the athan player:
+
+        trigger     | job submitted by the scheduler
+        play        | AthanMediaPlayer.play called
+        prioritize  | PlaybackArbiter gave the audio output to the athan (or 'dropped')
+        playing     | QMediaPlayer state changed to PlayingState
+        <status>    | each QMediaPlayer media status reached (loaded_media, buffered_media, ...)
+
+    Traces are kept in a bounded ring buffer and optionally appended to a json lines file.
+    """
+
+    TRIGGER = "trigger"
+    PLAY = "play"
+    PRIORITIZE = "prioritize"
+    DROPPED = "dropped"
+    PLAYING = "playing"
+
+    percentiles = (50, 90, 99)
+
+    __instance__ = None
+
+    def __new__(cls):
+        """
+        Re-implement method __new__ to have a singleton.
+        """
+        if not cls.__instance__:
+            cls.__instance__ = object.__new__(cls)
+            cls.__instance__.traces = deque(maxlen=500)
+            cls.__instance__.current = None
+            cls.__instance__.persist_file = None
+            cls.__instance__._lock = threading.Lock()
+        return cls.__instance__
+
+    def set_persistence(self, enabled, file_path=None):
+        """
+        Enable or disable the persistence of finished traces.
+
+        :param enabled: persist traces or not.
+        :param file_path: json lines file, default is athan_trace.jsonl in logs directory.
+        :return:
+        """
+        if enabled:
+            self.persist_file = (
+                file_path or ResourcesLocation().logs_dir + "/athan_trace.jsonl"
+            )
+        else:
+            self.persist_file = None
+
+    def begin(self, prayer, scheduled=None):
+        """
+        Start a new trace, called when the scheduler triggers the athan.
+
+        :param prayer: prayer name.
+        :param scheduled: scheduled datetime of the athan, now if not provided.
+        :return:
+        """
+        now = get_clock().time()
+        if isinstance(scheduled, datetime.datetime):
+            scheduled = scheduled.timestamp()
+        with self._lock:
+            self.current = AthanTrace(prayer, scheduled if scheduled else now)
+            self.current.spans[self.TRIGGER] = now
+            self.traces.append(self.current)
+
+    def mark(self, stage, prayer=None):
+        """
+        Record the first time a stage is reached for the current trace.
+
+        :param stage: name of the stage.
+        :param prayer: prayer name, the stage is ignored if it does not belong to the current trace.
+        :return:
+        """
+        now = get_clock().time()
+        with self._lock:
+            if not self.current or (prayer and prayer != self.current.prayer):
+                return
+            self.current.spans.setdefault(stage, now)
+
+    def annotate(self, prayer=None, **labels):
+        """
+        Add labels to the current trace (e.g. prewarmed=True), summaries are grouped by labels.
+
+        :param prayer: prayer name, ignored if it does not belong to the current trace.
+        :param labels: labels of the trace.
+        :return:
+        """
+        with self._lock:
+            if not self.current or (prayer and prayer != self.current.prayer):
+                return
+            self.current.labels.update(labels)
+
+    def mark_status(self, status):
+        """
+        Record a QMediaPlayer media status for the current trace.
+
+        :param status: QMediaPlayer.MediaStatus
+        :return:
+        """
+        self.mark(de_hump(status.name))
+
+    def close(self):
+        """
+        Finish the current trace and persist it if needed.
+
+        :return:
+        """
+        with self._lock:
+            trace, self.current = self.current, None
+        if not trace:
+            return
+        log.debug(
+            "athan trace %s: %s",
+            trace.name,
+            ", ".join(
+                "{} {:+.0f} ms".format(stage, trace.drift(stage))
+                for stage in trace.spans
+            ),
+        )
+        if self.persist_file:
+            try:
+                with open(self.persist_file, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(trace.to_dict()) + "\n")
+            except OSError:
+                log.exception("Could not persist athan trace")
+
+    def summary(self):
+        """
+        Percentiles of the drift from the scheduled time, per prayer (and labels) and per stage.
+
+        :return: {trace name : {stage : {count, p50, p90, p99, max}}} with drifts in milliseconds.
+        """
+        drifts = OrderedDict()
+        with self._lock:
+            traces = list(self.traces)
+        for trace in traces:
+            for stage in trace.spans:
+                drifts.setdefault(trace.name, OrderedDict()).setdefault(
+                    stage, []
+                ).append(trace.drift(stage))
+
+        summary = OrderedDict()
+        for name, stages in drifts.items():
+            summary[name] = OrderedDict()
+            for stage, values in stages.items():
+                values.sort()
+                stats = OrderedDict(count=len(values))
+                for p in self.percentiles:
+                    stats["p{}".format(p)] = percentile(values, p)
+                stats["max"] = values[-1]
+                summary[name][stage] = stats
+        return summary
+
+    def log_summary(self):
+        """
+        Log the drift summary of all recorded athans.
+
+        :return:
+        """
+        for name, stages in self.summary().items():
+            for stage, stats in stages.items():
+                log.info(
+                    "athan drift %-8s | %-15s | %s",
+                    name,
+                    stage,
+                    " ".join(
+                        ("{}={:.0f}".format(k, v) if k != "count" else "n={}".format(v))
+                        for k, v in stats.items()
+                    ),
+                )
@@ -0,0 +1,510 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# --------------------------------------------------------------------------- #
+# QuantumPT - Open Source Portable Islamic prayer times reminder              #
+# --------------------------------------------------------------------------- #
+# Copyright (c) 2016 QuantumPT Developer                                      #
+# --------------------------------------------------------------------------- #
+# This program is free software; you can redistribute it and/or modify it     #
+# under the terms of the GNU General Public License as published by the Free  #
+# Software Foundation; version 3 of the License.                              #
+#                                                                             #
+# This program is distributed in the hope that it will be useful, but WITHOUT #
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or       #
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for    #
+# more details.                                                               #
+# --------------------------------------------------------------------------- #
+
+import os
+import shlex
+
+from PyQt6.QtCore import (
+    QDir,
+    QObject,
+    QProcess,
+    QTemporaryFile,
+    QTimer,
+    QUrl,
+    pyqtSignal,
+)
+from PyQt6.QtMultimedia import QAudioOutput, QMediaDevices, QMediaPlayer
+
+from prayertimes.core.common.clock import get_clock
+from prayertimes.core.common.logapi import log
+
+
+class AudioSink(object):
+    """
+    Where the media players of the MediaEngine send their audio.
+
+    A sink creates the players of the pool. Every player has the QMediaPlayer interface used
+    by the media players (setSource, setSourceDevice, play, pause, stop, position, setPosition,
+    playbackState, mediaStatus, mediaStatusChanged and playbackStateChanged signals), so the
+    athan, dua and preview players behave the same with every sink.
+    """
+
+    name = ""
+
+    def create_player(self):
+        """Override"""
+        pass
+
+    def attach(self, player):
+        """
+        Give the output to player.
+
+        :param player: player created by the sink.
+        :return:
+        """
+        pass
+
+    def detach(self, player):
+        """
+        Take the output back from player.
+
+        :param player: player created by the sink.
+        :return:
+        """
+        pass
+
+    def set_volume(self, volume):
+        """
+        :param volume: linear volume between 0.0 and 1.0.
+        :return:
+        """
+        pass
+
+    def set_muted(self, muted):
+        """
+        :param muted: mute or not.
+        :return:
+        """
+        pass
+
+    def refresh_device(self):
+        """
+        Follow the default output device of the system.
+        Called through MediaEngine.refresh_device, which checks that the output is free.
+
+        :return:
+        """
+        pass
+
+
+class QtAudioSink(AudioSink):
+    """
+    QMediaPlayer players sharing one QAudioOutput.
+    """
+
+    name = "qt"
+
+    def __init__(self):
+        self.audio_output = QAudioOutput()
+
+    def create_player(self):
+        return QMediaPlayer()
+
+    def attach(self, player):
+        player.setAudioOutput(self.audio_output)
+
+    def detach(self, player):
+        player.setAudioOutput(None)
+
+    def set_volume(self, volume):
+        self.audio_output.setVolume(volume)
+
+    def set_muted(self, muted):
+        self.audio_output.setMuted(muted)
+
+    def refresh_device(self):
+        self.audio_output.setDevice(QMediaDevices.defaultAudioOutput())
+
+
+class SinkPlayer(QObject):
+    """
+    Base class of the players that are not QMediaPlayer: handles the media status and the
+    playback state the same way QMediaPlayer does. Subclasses implement _begin and _halt,
+    and call _finished at the end of the media.
+    """
+
+    mediaStatusChanged = pyqtSignal(object)
+    playbackStateChanged = pyqtSignal(object)
+
+    def __init__(self, sink):
+        super(SinkPlayer, self).__init__()
+        self.sink = sink
+        self._source = QUrl()
+        self._device = None
+        self._state = QMediaPlayer.PlaybackState.StoppedState
+        self._status = QMediaPlayer.MediaStatus.NoMedia
+        # Position (ms) when the playback started and time it started (epoch seconds)
+        self._offset = 0
+        self._started = None
+
+    def setSource(self, source):
+        self._load(source, None)
+
+    def setSourceDevice(self, device, source=QUrl()):
+        self._load(source, device)
+
+    def source(self):
+        return self._source
+
+    def sourceDevice(self):
+        return self._device
+
+    def play(self):
+        if self._status == QMediaPlayer.MediaStatus.NoMedia:
+            return
+        if self._state == QMediaPlayer.PlaybackState.PlayingState:
+            return
+        self._started = get_clock().time()
+        self._begin(self._offset)
+        self._set_state(QMediaPlayer.PlaybackState.PlayingState)
+        self._set_status(QMediaPlayer.MediaStatus.BufferedMedia)
+
+    def pause(self):
+        if self._state != QMediaPlayer.PlaybackState.PlayingState:
+            return
+        self._offset = self.position()
+        self._started = None
+        self._halt()
+        self._set_state(QMediaPlayer.PlaybackState.PausedState)
+
+    def stop(self):
+        if self._state == QMediaPlayer.PlaybackState.StoppedState:
+            return
+        if self._started is not None:
+            self._halt()
+        self._offset = 0
+        self._started = None
+        self._set_state(QMediaPlayer.PlaybackState.StoppedState)
+        self._set_status(QMediaPlayer.MediaStatus.LoadedMedia)
+
+    def position(self):
+        if self._started is None:
+            return self._offset
+        return self._offset + int((get_clock().time() - self._started) * 1000)
+
+    def setPosition(self, position):
+        playing = self._started is not None
+        if playing:
+            self._halt()
+        self._offset = position
+        if playing:
+            self._started = get_clock().time()
+            self._begin(position)
+
+    def playbackState(self):
+        return self._state
+
+    def mediaStatus(self):
+        return self._status
+
+    def media_data(self):
+        """
+        Return the content of the media.
+
+        :return: bytes.
+        """
+        if self._device is not None:
+            return bytes(self._device.data())
+        with open(self.media_file(), "rb") as media:
+            return media.read()
+
+    def media_file(self):
+        """
+        Return the path of the media source.
+
+        :return: path, empty if the source is not a file.
+        """
+        if self._source.isLocalFile():
+            return self._source.toLocalFile()
+        if self._source.isRelative():
+            return self._source.path()
+        return ""
+
+    def _load(self, source, device):
+        self.stop()
+        self._source = source
+        self._device = device
+        self._offset = 0
+        if source.isEmpty() and device is None:
+            self._set_status(QMediaPlayer.MediaStatus.NoMedia)
+        else:
+            self._set_status(QMediaPlayer.MediaStatus.LoadedMedia)
+
+    def _finished(self):
+        """
+        To be called by the subclasses at the end of the media.
+
+        :return:
+        """
+        self._offset = 0
+        self._started = None
+        self._set_state(QMediaPlayer.PlaybackState.StoppedState)
+        self._set_status(QMediaPlayer.MediaStatus.EndOfMedia)
+
+    def _set_state(self, state):
+        if state != self._state:
+            self._state = state
+            self.playbackStateChanged.emit(state)
+
+    def _set_status(self, status):
+        if status != self._status:
+            self._status = status
+            self.mediaStatusChanged.emit(status)
+
+    def _begin(self, position):
+        """Override"""
+        pass
+
+    def _halt(self):
+        """Override"""
+        pass
+
+
+class PipePlayer(SinkPlayer):
+    """
+    Player streaming the media to an external program (system player, ALSA device...).
+    """
+
+    # Time (ms) left to the program to exit after being asked to
+    stop_timeout = 1000
+
+    def __init__(self, sink):
+        super(PipePlayer, self).__init__(sink)
+        self.process = None
+        # Copy of a media given as a device, for the commands reading a file
+        self.temporary = None
+
+    def _begin(self, position):
+        arguments = [
+            argument.format(
+                start=position / 1000,
+                volume=int(self.sink.level() * 100),
+                gain=self.sink.level(),
+                file=self._command_file() if "{file}" in argument else "",
+                location=self.sink.location,
+            )
+            for argument in shlex.split(self.sink.command)
+        ]
+        self.process = QProcess(self)
+        self.process.finished.connect(self._process_finished)
+        self.process.start(arguments[0], arguments[1:])
+        if "{file}" not in self.sink.command:
+            self.process.write(self.media_data())
+            self.process.closeWriteChannel()
+
+    def _command_file(self):
+        """
+        Path of the media given to the command, a media given as a device (media pack) is
+        copied to a temporary file.
+
+        :return: path.
+        """
+        path = self.media_file()
+        if self._device is None and path:
+            return path
+        if self.temporary is None:
+            suffix = os.path.splitext(path)[1] or ".mp3"
+            self.temporary = QTemporaryFile(
+                os.path.join(QDir.tempPath(), "quantumpt-XXXXXX" + suffix), self
+            )
+            self.temporary.open()
+            self.temporary.write(self.media_data())
+            self.temporary.close()
+        return self.temporary.fileName()
+
+    def _halt(self):
+        if self.process is not None:
+            process, self.process = self.process, None
+            process.finished.disconnect(self._process_finished)
+            if process.state() == QProcess.ProcessState.NotRunning:
+                process.deleteLater()
+                return
+            # Do not wait for the program, it is killed if it does not exit in time
+            process.finished.connect(process.deleteLater)
+            timer = QTimer(process)
+            timer.setSingleShot(True)
+            timer.timeout.connect(process.kill)
+            timer.start(self.stop_timeout)
+            process.terminate()
+
+    def _load(self, source, device):
+        super(PipePlayer, self)._load(source, device)
+        if self.temporary is not None:
+            self.temporary.deleteLater()
+            self.temporary = None
+
+    def _process_finished(self, exit_code, exit_status):
+        self.process.deleteLater()
+        self.process = None
+        if exit_status != QProcess.ExitStatus.NormalExit or exit_code != 0:
+            log.error("pipe audio sink: player exited with code %s", exit_code)
+        self._finished()
+
+    def restart(self):
+        """
+        Restart the stream at the current position (new volume).
+
+        :return:
+        """
+        if self.process is not None:
+            self.setPosition(self.position())
+
+
+class PipeAudioSink(AudioSink):
+    """
+    Stream the medias to an external program. The command accepts the placeholders
+    {start} (seconds), {volume} (0-100), {gain} (0.0-1.0), {location} (name of the location
+    in multi-location mode, empty for the main sink) and {file}; without {file} the
+    media is written to the standard input of the program. The medias of the media pack are
+    copied to a temporary file for {file}.
+
+    Volume changes restart the stream at the current position when the command uses {start}.
+    """
+
+    name = "pipe"
+
+    def __init__(self, command, location=""):
+        self.command = command
+        self.location = location
+        self.volume = 1.0
+        self.muted = False
+        self.owner = None
+
+    def level(self):
+        return 0.0 if self.muted else self.volume
+
+    def create_player(self):
+        return PipePlayer(self)
+
+    def attach(self, player):
+        self.owner = player
+
+    def detach(self, player):
+        if self.owner is player:
+            self.owner = None
+
+    def set_volume(self, volume):
+        changed = volume != self.volume
+        self.volume = volume
+        if changed:
+            self._apply()
+
+    def set_muted(self, muted):
+        changed = muted != self.muted
+        self.muted = muted
+        if changed:
+            self._apply()
+
+    def _apply(self):
+        if self.owner is not None and "{start}" in self.command:
+            self.owner.restart()
+
+
+class NullPlayer(SinkPlayer):
+    """
+    Player without output: the media "plays" for its duration (from the media catalog)
+    divided by the speed of the sink.
+    """
+
+    def __init__(self, sink):
+        super(NullPlayer, self).__init__(sink)
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self._finished)
+
+    def _begin(self, position):
+        duration = self.sink.duration(self._source)
+        self.sink.record(self, "play", position)
+        remaining = max(duration * 1000 - position, 0)
+        self.timer.start(int(remaining / self.sink.speed) if self.sink.speed else 0)
+
+    def _halt(self):
+        self.sink.record(self, "halt", self.position())
+        self.timer.stop()
+
+    def _finished(self):
+        self.sink.record(self, "end", self.position())
+        super(NullPlayer, self)._finished()
+
+
+class NullAudioSink(AudioSink):
+    """
+    Sink without audio device, for tests and benchmarks: records what would have been heard.
+
+    :param speed: playback speed (2.0 plays twice faster), 0 ends the medias immediately.
+    :param default_duration: duration (seconds) of the medias not in the catalog.
+    """
+
+    name = "null"
+
+    def __init__(self, speed=1.0, default_duration=1.0):
+        self.speed = speed
+        self.default_duration = default_duration
+        self.volume = 1.0
+        self.muted = False
+        self.owner = None
+        # [(time, event, source, position ms, volume)]
+        self.events = []
+
+    def create_player(self):
+        return NullPlayer(self)
+
+    def duration(self, source):
+        """
+        :param source: url of the media.
+        :return: duration of the media (seconds).
+        """
+        # Imported here, the catalog is not needed by the other sinks
+        from prayertimes.core.lib.multimedia.mediacatalog import MediaCatalog
+
+        entry = MediaCatalog().entry(source.toLocalFile())
+        if entry is None or entry.duration is None:
+            return self.default_duration
+        return entry.duration
+
+    def record(self, player, event, position):
+        self.events.append(
+            (
+                get_clock().time(),
+                event,
+                player.source().toString(),
+                position,
+                0.0 if self.muted or player is not self.owner else self.volume,
+            )
+        )
+
+    def attach(self, player):
+        self.owner = player
+
+    def detach(self, player):
+        if self.owner is player:
+            self.owner = None
+
+    def set_volume(self, volume):
+        self.volume = volume
+
+    def set_muted(self, muted):
+        self.muted = muted
+
+
+def create_sink(name, command="", location=""):
+    """
+    Create the audio sink from its name.
+
+    :param name: "qt", "pipe" or "null".
+    :param command: command of the pipe sink.
+    :param location: name of the location of the pipe sink (multi-location mode).
+    :return:
+    """
+    if name == PipeAudioSink.name:
+        return PipeAudioSink(command, location)
+    if name == NullAudioSink.name:
+        return NullAudioSink()
+    if name != QtAudioSink.name:
+        log.error("unknown audio sink %s, using qt", name)
+    return QtAudioSink()
@@ -0,0 +1,171 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# --------------------------------------------------------------------------- #
+# QuantumPT - Open Source Portable Islamic prayer times reminder              #
+# --------------------------------------------------------------------------- #
+# Copyright (c) 2016 QuantumPT Developer                                      #
+# --------------------------------------------------------------------------- #
+# This program is free software; you can redistribute it and/or modify it     #
+# under the terms of the GNU General Public License as published by the Free  #
+# Software Foundation; version 3 of the License.                              #
+#                                                                             #
+# This program is distributed in the hope that it will be useful, but WITHOUT #
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or       #
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for    #
+# more details.                                                               #
+# --------------------------------------------------------------------------- #
+
+import json
+import os
+import random
+import threading
+
+from PyQt6.QtCore import QObject, pyqtSignal
+
+from prayertimes.core.common.logapi import log
+from prayertimes.core.common.resourceslocation import ResourcesLocation
+from prayertimes.core.lib.multimedia.mediacatalog import MediaCatalog
+
+
+class DuaPlaylist(QObject):
+    """
+    Shuffle bag of the duas: every dua is played once, in a random order, before a new
+    order is drawn. The order and the position in it are persisted, so that a restart
+    continues the same bag.
+
+    When the duas of the catalog change, removed duas are dropped from the order and new
+    duas are inserted at random in the part of the bag not played yet.
+    """
+
+    __instance__ = None
+    __initialised__ = False
+
+    # Emitted with the absolute path of the next dua ("" when there is no dua)
+    next_changed = pyqtSignal(str)
+
+    def __new__(cls):
+        """
+        Re-implement method __new__ to have a singleton.
+        """
+        if not cls.__instance__:
+            cls.__instance__ = super(DuaPlaylist, cls).__new__(cls)
+        return cls.__instance__
+
+    def __init__(self):
+        if self.__initialised__:
+            return
+        super(DuaPlaylist, self).__init__()
+        self.__initialised__ = True
+
+        self.catalog = MediaCatalog()
+        self.playlist_file = ResourcesLocation().root_dir + "/dua_playlist.json"
+        # Paths relative to the multimedia directory, loaded on demand
+        self.order = None
+        self.position = 0
+        self._lock = threading.Lock()
+
+    def next_up(self):
+        """
+        Return the dua that will be played next.
+
+        :return: absolute path or None if there is no dua.
+        """
+        with self._lock:
+            self._sync()
+            return self._absolute(self.position)
+
+    def advance(self):
+        """
+        Take the next dua of the bag, a new order is drawn when the bag is empty.
+
+        :return: absolute path of the dua to play or None if there is no dua.
+        """
+        with self._lock:
+            self._sync()
+            path = self._absolute(self.position)
+            if path is None:
+                return None
+            self.position += 1
+            if self.position >= len(self.order):
+                self._shuffle(last=self.order[-1])
+            self._save()
+            next_path = self._absolute(self.position)
+
+        log.debug("dua playlist: %s then %s", path, next_path)
+        self.next_changed.emit(next_path or "")
+        return path
+
+    def _absolute(self, position):
+        if position >= len(self.order):
+            return None
+        return os.path.join(self.catalog.multimedia_dir, self.order[position]).replace(
+            "\\", "/"
+        )
+
+    def _shuffle(self, last=None):
+        """
+        Draw a new order, the dua played last is not played first again.
+
+        :param last: dua played last.
+        :return:
+        """
+        random.shuffle(self.order)
+        if len(self.order) > 1 and self.order[0] == last:
+            swap = random.randrange(1, len(self.order))
+            self.order[0], self.order[swap] = self.order[swap], self.order[0]
+        self.position = 0
+
+    def _sync(self):
+        """
+        Load the persisted bag the first time and follow the duas of the catalog.
+
+        :return:
+        """
+        duas = [entry.path for entry in self.catalog.entries(MediaCatalog.DUAS)]
+        if self.order is None:
+            self._load()
+        if sorted(self.order) == sorted(duas):
+            return
+
+        available = set(duas)
+        played = [path for path in self.order[: self.position] if path in available]
+        pending = [path for path in self.order[self.position :] if path in available]
+        for path in set(duas).difference(self.order):
+            pending.insert(random.randint(0, len(pending)), path)
+
+        self.order = played + pending
+        self.position = len(played)
+        if not pending:
+            self._shuffle(last=played[-1] if played else None)
+        self._save()
+
+    def _load(self):
+        """
+        Load the persisted bag.
+
+        :return:
+        """
+        self.order, self.position = [], 0
+        try:
+            with open(self.playlist_file, "r") as playlist:
+                data = json.load(playlist)
+            self.order = [str(path) for path in data["order"]]
+            self.position = min(max(int(data["position"]), 0), len(self.order))
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, TypeError, KeyError):
+            log.exception("dua playlist: cannot read %s", self.playlist_file)
+
+    def _save(self):
+        """
+        Persist the bag (replaced atomically).
+
+        :return:
+        """
+        try:
+            with open(self.playlist_file + ".tmp", "w") as playlist:
+                json.dump({"order": self.order, "position": self.position}, playlist)
+            os.replace(self.playlist_file + ".tmp", self.playlist_file)
+        except OSError:
+            log.exception("dua playlist: cannot save %s", self.playlist_file)
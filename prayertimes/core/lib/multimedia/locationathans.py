@@ -0,0 +1,151 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# --------------------------------------------------------------------------- #
+# QuantumPT - Open Source Portable Islamic prayer times reminder              #
+# --------------------------------------------------------------------------- #
+# Copyright (c) 2016 QuantumPT Developer                                      #
+# --------------------------------------------------------------------------- #
+# This program is free software; you can redistribute it and/or modify it     #
+# under the terms of the GNU General Public License as published by the Free  #
+# Software Foundation; version 3 of the License.                              #
+#                                                                             #
+# This program is distributed in the hope that it will be useful, but WITHOUT #
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or       #
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for    #
+# more details.                                                               #
+# --------------------------------------------------------------------------- #
+
+from PyQt6.QtCore import QObject, QUrl, pyqtSignal
+
+from prayertimes.core.common.logapi import log
+from prayertimes.core.common.registryproperties import RegistryProperties
+from prayertimes.core.common.settings import Settings
+
+from prayertimes.core.lib.multimedia.audiosink import create_sink
+from prayertimes.core.lib.multimedia.mediacatalog import MediaCatalog
+from prayertimes.core.lib.multimedia.mediapack import MediaPack
+from prayertimes.core.lib.multimedia.volumecontrol import VolumeControl
+from prayertimes.core.lib.prayer.profilestore import ProfileStore, timetable_inputs
+from prayertimes.core.lib.scheduler.locationscheduler import Location
+
+
+class LocationAthans(RegistryProperties, QObject):
+    """
+    Athans of the additional locations (multi-location mode).
+
+    Each profile listed in 'general_settings/locations' is a location driven by the
+    LocationScheduler with the city, calculation, offsets and athan of the profile. Every
+    location plays its athans on its own audio sink, created from the audio sink settings
+    with the name of the profile as {location} of the pipe sink command (aplay -D {location}).
+    """
+
+    # Emitted from the scheduler thread, handled in the thread of the players
+    athan_due = pyqtSignal(object, str)
+
+    def __init__(self):
+        super(LocationAthans, self).__init__()
+        # {location_id: (player, device)}
+        self.players = {}
+        self.athan_due.connect(self.play)
+
+    def load(self, changes=None):
+        """
+        Drive the athans of the profiles set as locations, replacing the previous locations.
+
+        :param changes: {key: value} of the settings changed.
+        :return:
+        """
+        self.stop()
+        locations = []
+        ids = Settings().general.locations
+        for location_id in (int(part) for part in ids.split(",") if part):
+            profile = ProfileStore().profile(location_id)
+            if profile is None:
+                log.error("location %s: unknown profile", location_id)
+                continue
+            locations.append(self.location(location_id, *profile))
+        self.scheduler_manager.run_location_scheduler(self.athan_due.emit, locations)
+
+    @staticmethod
+    def location(location_id, name, config):
+        """
+        Create the location of a profile.
+
+        :param location_id: id of the profile.
+        :param name: name of the profile.
+        :param config: {key: value} of the profile.
+        :return: Location object.
+        """
+        catalog = MediaCatalog()
+        names = catalog.names(MediaCatalog.ATHANS)
+        paths = catalog.paths(MediaCatalog.ATHANS)
+        if config.get("prayer_settings/athan") in names:
+            athan = paths[names.index(config["prayer_settings/athan"])]
+        else:
+            athan = paths[0] if paths else None
+
+        inputs = timetable_inputs(config)
+        return Location(
+            location_id,
+            dict(
+                continent=config["city/continent"],
+                country=config["city/country"],
+                cc=config["city/cc"],
+                state=config["city/state"],
+                city=config["city/city"],
+                lat=inputs["lat"],
+                lng=inputs["lng"],
+                tz=inputs["tz"],
+            ),
+            create_sink(
+                Settings().general.audio_sink,
+                Settings().general.audio_sink_command,
+                name,
+            ),
+            athan=athan,
+            method=inputs["method"],
+            asr_method=inputs["asr"],
+            offsets=inputs["offsets"],
+        )
+
+    def play(self, location, prayer):
+        """
+        Play the athan of a location on the audio sink of the location.
+
+        :param location: Location object.
+        :param prayer: prayer name.
+        :return:
+        """
+        if location.athan is None:
+            log.error("location %s: no athan for %s", location.location_id, prayer)
+            return
+        log.debug("location %s: begin athan of prayer %s", location.location_id, prayer)
+
+        player, _ = self.players.pop(location.location_id, (None, None))
+        if player is None:
+            player = location.sink.create_player()
+            location.sink.attach(player)
+        else:
+            player.stop()
+
+        path = MediaCatalog().relative_path(location.athan)
+        device, url = MediaPack().device(path) if path else (None, None)
+        if device is not None:
+            player.setSourceDevice(device, url)
+        else:
+            player.setSource(QUrl.fromLocalFile(location.athan))
+        location.sink.set_volume(VolumeControl().level())
+        player.play()
+        # The device is kept while the player reads it
+        self.players[location.location_id] = (player, device)
+
+    def stop(self):
+        """
+        Stop the athans of the locations playing.
+
+        :return:
+        """
+        for player, _ in self.players.values():
+            player.stop()
+        self.players = {}
@@ -0,0 +1,237 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# --------------------------------------------------------------------------- #
+# QuantumPT - Open Source Portable Islamic prayer times reminder              #
+# --------------------------------------------------------------------------- #
+# Copyright (c) 2016 QuantumPT Developer                                      #
+# --------------------------------------------------------------------------- #
+# This program is free software; you can redistribute it and/or modify it     #
+# under the terms of the GNU General Public License as published by the Free  #
+# Software Foundation; version 3 of the License.                              #
+#                                                                             #
+# This program is distributed in the hope that it will be useful, but WITHOUT #
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or       #
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for    #
+# more details.                                                               #
+# --------------------------------------------------------------------------- #
+
+import math
+
+from array import array
+from operator import mul
+
+from PyQt6.QtCore import QObject, QThread, QUrl, pyqtSlot
+from PyQt6.QtMultimedia import QAudioDecoder, QAudioFormat
+
+from prayertimes.core.common.logapi import log
+from prayertimes.core.lib.multimedia.mediacatalog import MediaCatalog
+from prayertimes.core.lib.multimedia.mediapack import MediaPack
+
+
+class LevelMeter(object):
+    """
+    Accumulate the energy of decoded samples by blocks of 10 ms.
+    """
+
+    # Blocks louder than this level (dBFS) are not silence
+    silence_threshold = -50.0
+    # Windows quieter than this level (dBFS) are not part of the loudness
+    absolute_gate = -70.0
+
+    def __init__(self, sample_rate):
+        self.sample_rate = sample_rate
+        self.block_size = sample_rate // 100
+        self.blocks = array("d")
+        self.pending = array("d")
+
+    def feed(self, samples, full_scale=1.0):
+        """
+        :param samples: array("d") of mono samples.
+        :param full_scale: value of a full scale sample (32768 for 16 bits samples).
+        :return:
+        """
+        self.pending.extend(samples)
+        size = self.block_size
+        norm = size * full_scale * full_scale
+        full = len(self.pending) - len(self.pending) % size
+        pending = self.pending
+        for start in range(0, full, size):
+            block = pending[start : start + size]
+            self.blocks.append(sum(map(mul, block, block)) / norm)
+        del self.pending[:full]
+
+    def results(self):
+        """
+        Compute the analysis of the samples fed.
+
+        Loudness is the BS.1770 gated mean over 400 ms windows (absolute gate -70 dB,
+        relative gate -10 dB) without the K-weighting filter. A media with no window above
+        the absolute gate (silence, nothing decoded) gets the absolute gate as loudness, so that
+        it is not decoded again.
+
+        :return: dict with duration, loudness, lead and tail (seconds, dBFS).
+        """
+        blocks = self.blocks
+        threshold = 10 ** (self.silence_threshold / 10)
+        loud = [i for i, power in enumerate(blocks) if power > threshold]
+
+        windows = [
+            sum(blocks[i : i + 40]) / len(blocks[i : i + 40])
+            for i in range(0, len(blocks), 40)
+        ]
+        gated = [power for power in windows if power > 10 ** (self.absolute_gate / 10)]
+        loudness = self.absolute_gate
+        if gated:
+            relative = sum(gated) / len(gated) / 10
+            gated = [power for power in gated if power > relative]
+            loudness = round(10 * math.log10(sum(gated) / len(gated)), 2)
+
+        return {
+            "duration": round(
+                (len(blocks) * self.block_size + len(self.pending)) / self.sample_rate,
+                3,
+            ),
+            "loudness": loudness,
+            "lead": loud[0] / 100 if loud else 0.0,
+            "tail": (len(blocks) - 1 - loud[-1]) / 100 if loud else 0.0,
+        }
+
+
+class MediaAnalyzer(QObject):
+    """
+    Decode each media of the catalog once, in a background thread, to measure its duration,
+    loudness and leading/trailing silence. Results are stored in the media catalog, so that
+    players apply gain and start offsets without any analysis at playback.
+
+    The media are decoded to mono 16 bits samples at 8 kHz, which is enough for levels.
+    """
+
+    sample_rate = 8000
+
+    def __init__(self):
+        super(MediaAnalyzer, self).__init__()
+        self.catalog = MediaCatalog()
+        self.decoder = None
+        self.entry = None
+        self.meter = None
+        self.device = None
+        self.failed = set()
+
+        self.thread = QThread()
+        self.thread.setObjectName("MediaAnalyzer")
+        self.moveToThread(self.thread)
+        self.thread.start(QThread.Priority.LowestPriority)
+
+        self.catalog.refreshed.connect(self.analyse)
+
+    def stop(self):
+        """
+        Stop the analysis thread.
+
+        :return:
+        """
+        self.thread.quit()
+        self.thread.wait(2000)
+
+    @pyqtSlot()
+    def analyse(self):
+        """
+        Decode the next media that has not been analysed yet.
+
+        :return:
+        """
+        if self.entry is not None:
+            return
+        pending = [
+            entry
+            for category in (MediaCatalog.ATHANS, MediaCatalog.DUAS)
+            for entry in self.catalog.entries(category)
+            if entry.loudness is None and entry.path not in self.failed
+        ]
+        if not pending:
+            return
+
+        self.entry = pending[0]
+        self.meter = LevelMeter(self.sample_rate)
+
+        if self.decoder is None:
+            audio_format = QAudioFormat()
+            audio_format.setSampleRate(self.sample_rate)
+            audio_format.setChannelCount(1)
+            audio_format.setSampleFormat(QAudioFormat.SampleFormat.Int16)
+
+            self.decoder = QAudioDecoder(self)
+            self.decoder.setAudioFormat(audio_format)
+            self.decoder.bufferReady.connect(self.buffer_ready)
+            self.decoder.finished.connect(self.decoding_finished)
+            self.decoder.error.connect(self.decoding_error)
+
+        log.debug("media analyzer: decoding %s", self.entry.path)
+        self.device, _ = MediaPack().device(self.entry.path)
+        if self.device is not None:
+            self.decoder.setSourceDevice(self.device)
+        else:
+            self.decoder.setSource(
+                QUrl.fromLocalFile(self.catalog.absolute_path(self.entry))
+            )
+        self.decoder.start()
+
+    def buffer_ready(self):
+        """
+        Feed the decoded samples to the level meter.
+
+        :return:
+        """
+        buffer = self.decoder.read()
+        audio_format = buffer.format()
+        data = buffer.constData().asstring(buffer.byteCount())
+        channels = max(audio_format.channelCount(), 1)
+
+        if audio_format.sampleFormat() == QAudioFormat.SampleFormat.Float:
+            samples, full_scale = array("d", array("f", data)[::channels]), 1.0
+        elif audio_format.sampleFormat() == QAudioFormat.SampleFormat.Int16:
+            samples, full_scale = array("d", array("h", data)[::channels]), 32768.0
+        else:
+            log.debug(
+                "media analyzer: unsupported sample format %s",
+                audio_format.sampleFormat(),
+            )
+            self.decoder.stop()
+            return self.decoding_error(QAudioDecoder.Error.FormatError)
+
+        if (
+            self.meter.sample_rate != audio_format.sampleRate()
+            and not self.meter.blocks
+        ):
+            self.meter = LevelMeter(audio_format.sampleRate())
+        self.meter.feed(samples, full_scale)
+
+    def decoding_finished(self):
+        """
+        Store the results of the media decoded and decode the next one.
+
+        :return:
+        """
+        results = self.meter.results()
+        log.debug("media analyzer: %s %s", self.entry.path, results)
+        self.catalog.update(self.entry.path, results)
+
+        self.entry = None
+        self.analyse()
+
+    def decoding_error(self, error):
+        """
+        Skip the media that cannot be decoded until the next start.
+
+        :param error: QAudioDecoder.Error.
+        :return:
+        """
+        log.error(
+            "media analyzer: cannot decode %s: %s",
+            self.entry.path,
+            self.decoder.errorString() or error,
+        )
+        self.failed.add(self.entry.path)
+        self.entry = None
+        self.analyse()
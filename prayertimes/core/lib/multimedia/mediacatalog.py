@@ -0,0 +1,471 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# --------------------------------------------------------------------------- #
+# QuantumPT - Open Source Portable Islamic prayer times reminder              #
+# --------------------------------------------------------------------------- #
+# Copyright (c) 2016 QuantumPT Developer                                      #
+# --------------------------------------------------------------------------- #
+# This program is free software; you can redistribute it and/or modify it     #
+# under the terms of the GNU General Public License as published by the Free  #
+# Software Foundation; version 3 of the License.                              #
+#                                                                             #
+# This program is distributed in the hope that it will be useful, but WITHOUT #
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or       #
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for    #
+# more details.                                                               #
+# --------------------------------------------------------------------------- #
+
+import hashlib
+import json
+import os
+import threading
+
+from PyQt6.QtCore import QObject, pyqtSignal
+
+from prayertimes.core.common.logapi import log
+from prayertimes.core.common.resourceslocation import ResourcesLocation
+from prayertimes.core.lib.multimedia.mediapack import MediaPack
+
+
+class MediaEntry(object):
+    """
+    Indexed media file, the path is relative to the multimedia directory.
+    """
+
+    __slots__ = (
+        "path",
+        "size",
+        "mtime",
+        "duration",
+        "digest",
+        "loudness",
+        "lead",
+        "tail",
+    )
+
+    def __init__(
+        self,
+        path,
+        size,
+        mtime,
+        duration=None,
+        digest=None,
+        loudness=None,
+        lead=None,
+        tail=None,
+    ):
+        """
+        :param path: path relative to the multimedia directory (athans/athan_1.mp3).
+        :param size: size of the file (bytes).
+        :param mtime: modification time of the file (epoch seconds).
+        :param duration: duration of the media (seconds), None until analysed.
+        :param digest: sha1 of the content, None until analysed.
+        :param loudness: integrated loudness (dBFS), None until decoded by the MediaAnalyzer.
+        :param lead: leading silence (seconds), None until decoded by the MediaAnalyzer.
+        :param tail: trailing silence (seconds), None until decoded by the MediaAnalyzer.
+        """
+        self.path = path
+        self.size = size
+        self.mtime = mtime
+        self.duration = duration
+        self.digest = digest
+        self.loudness = loudness
+        self.lead = lead
+        self.tail = tail
+
+    @property
+    def name(self):
+        """
+        Name displayed to the user: athans/athan_1.mp3 -> Athan 1
+
+        :return:
+        """
+        return (
+            os.path.splitext(os.path.basename(self.path))[0]
+            .replace("_", " ")
+            .capitalize()
+        )
+
+    def to_dict(self):
+        return {slot: getattr(self, slot) for slot in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**{slot: data.get(slot) for slot in cls.__slots__})
+
+
+class MediaCatalog(QObject):
+    """
+    Index of the athans and duas shipped in the multimedia directory.
+
+    The index is persisted in a json file, the media folders are not read at startup: the
+    players and the UI are served from the persisted index. The folders are listed only
+    when there is no index yet, and checked by refresh() (in a background thread), which
+    only reads the files added or modified since the last refresh.
+    """
+
+    __instance__ = None
+    __initialised__ = False
+
+    ATHANS = "athans"
+    DUAS = "duas"
+
+    # Emitted (from the refresh thread) when the index changed
+    changed = pyqtSignal()
+    # Emitted (from the refresh thread) when a refresh is finished
+    refreshed = pyqtSignal()
+
+    def __new__(cls):
+        """
+        Re-implement method __new__ to have a singleton.
+        """
+        if not cls.__instance__:
+            cls.__instance__ = super(MediaCatalog, cls).__new__(cls)
+        return cls.__instance__
+
+    def __init__(self):
+        if self.__initialised__:
+            return
+        super(MediaCatalog, self).__init__()
+        self.__initialised__ = True
+
+        self.index_file = ResourcesLocation().root_dir + "/media_index.json"
+        self.categories = None
+        # {absolute path: MediaEntry}, built on demand
+        self.by_path = None
+        self._lock = threading.Lock()
+        self._refresh_thread = None
+
+    @property
+    def multimedia_dir(self):
+        return os.path.dirname(ResourcesLocation().athan_dir)
+
+    def entries(self, category):
+        """
+        Return the indexed entries of a category, sorted by path.
+
+        :param category: MediaCatalog.ATHANS or MediaCatalog.DUAS.
+        :return:
+        """
+        with self._lock:
+            if self.categories is None:
+                self.categories = self._load()
+                if any(
+                    category not in self.categories
+                    for category in (self.ATHANS, self.DUAS)
+                ):
+                    # No usable index (first run), list the folders without reading the files
+                    self.categories = self._scan(self.categories, analyse=False)
+                    self._save(self.categories)
+            return self.categories[category]
+
+    def paths(self, category):
+        """
+        Return the absolute paths of the entries of a category.
+
+        :param category: MediaCatalog.ATHANS or MediaCatalog.DUAS.
+        :return:
+        """
+        return [self.absolute_path(entry) for entry in self.entries(category)]
+
+    def names(self, category):
+        """
+        Return the names of the entries of a category.
+
+        :param category: MediaCatalog.ATHANS or MediaCatalog.DUAS.
+        :return:
+        """
+        return [entry.name for entry in self.entries(category)]
+
+    def entry(self, path):
+        """
+        Return the indexed entry of a media file or None.
+
+        :param path: absolute path of the media.
+        :return:
+        """
+        by_path = self.by_path
+        if by_path is None:
+            for category in (self.ATHANS, self.DUAS):
+                self.entries(category)
+            by_path = {
+                self.absolute_path(entry): entry
+                for entries in self.categories.values()
+                for entry in entries
+            }
+            self.by_path = by_path
+        return by_path.get(path)
+
+    def absolute_path(self, entry):
+        return os.path.join(self.multimedia_dir, entry.path).replace("\\", "/")
+
+    def relative_path(self, path):
+        """
+        Return the path relative to the multimedia directory, None for a media outside of it.
+
+        :param path: absolute path of a media.
+        :return:
+        """
+        prefix = self.multimedia_dir.replace("\\", "/") + "/"
+        path = path.replace("\\", "/")
+        return path[len(prefix) :] if path.startswith(prefix) else None
+
+    def refresh_async(self):
+        """
+        Refresh the index in a background thread.
+
+        :return:
+        """
+        if self._refresh_thread is not None and self._refresh_thread.is_alive():
+            return
+        self._refresh_thread = threading.Thread(
+            target=self.refresh, name="MediaCatalogRefresh", daemon=True
+        )
+        self._refresh_thread.start()
+
+    def refresh(self):
+        """
+        Check the media folders: entries whose size or modification time changed are read
+        again, removed files are dropped and new files are added.
+
+        :return: True if the index changed.
+        """
+        self.entries(self.ATHANS)
+        with self._lock:
+            previous = {
+                category: [MediaEntry.from_dict(entry.to_dict()) for entry in entries]
+                for category, entries in self.categories.items()
+            }
+        categories = self._scan(previous, analyse=True)
+
+        with self._lock:
+            current = self.categories
+            changed = any(
+                [entry.to_dict() for entry in categories[category]]
+                != [entry.to_dict() for entry in current.get(category, [])]
+                for category in categories
+            )
+            if changed:
+                self.categories = categories
+                self.by_path = None
+                self._save(categories)
+        if changed:
+            log.debug("media catalog: index updated")
+            self.changed.emit()
+        self.refreshed.emit()
+        return changed
+
+    def update(self, path, values):
+        """
+        Update the indexed entry of a media and persist the index.
+        Can be called from any thread, the entry is not changed during a refresh.
+
+        :param path: path of the entry, relative to the multimedia directory.
+        :param values: {attribute: value} of the entry.
+        :return: False if the media is no longer indexed.
+        """
+        with self._lock:
+            entry = next(
+                (
+                    entry
+                    for entries in self.categories.values()
+                    for entry in entries
+                    if entry.path == path
+                ),
+                None,
+            )
+            if entry is None:
+                return False
+            for key, value in values.items():
+                setattr(entry, key, value)
+            self._save(self.categories)
+        return True
+
+    def _scan(self, previous, analyse):
+        """
+        List the media folders, or the media pack when it is installed.
+
+        :param previous: previous index {category: [MediaEntry]}.
+        :param analyse: read the new and modified files (digest and duration).
+        :return: the new index {category: [MediaEntry]}.
+        """
+        if MediaPack().available():
+            return self._scan_pack(previous)
+
+        categories = {}
+        for category in (self.ATHANS, self.DUAS):
+            known = {entry.path: entry for entry in previous.get(category, [])}
+            directory = os.path.join(self.multimedia_dir, category)
+            entries = []
+            try:
+                files = sorted(
+                    name
+                    for name in os.listdir(directory)
+                    if name.lower().endswith(".mp3")
+                )
+            except OSError:
+                log.exception("media catalog: cannot list %s", directory)
+                files = []
+
+            for name in files:
+                path = category + "/" + name
+                stat = os.stat(os.path.join(directory, name))
+                entry = known.get(path)
+                if (
+                    entry is None
+                    or entry.size != stat.st_size
+                    or entry.mtime != stat.st_mtime
+                ):
+                    entry = MediaEntry(path, stat.st_size, stat.st_mtime)
+                else:
+                    entry = MediaEntry.from_dict(entry.to_dict())
+                if analyse and entry.digest is None:
+                    self._analyse(entry)
+                entries.append(entry)
+            categories[category] = entries
+        return categories
+
+    def _scan_pack(self, previous):
+        """
+        List the entries of the media pack, digest and duration are stored in the pack.
+
+        :param previous: previous index {category: [MediaEntry]}.
+        :return: the new index {category: [MediaEntry]}.
+        """
+        categories = {}
+        pack_entries = MediaPack().entries()
+        for category in (self.ATHANS, self.DUAS):
+            known = {entry.path: entry for entry in previous.get(category, [])}
+            entries = []
+            for path in sorted(pack_entries):
+                if not path.startswith(category + "/"):
+                    continue
+                info = pack_entries[path]
+                entry = known.get(path)
+                if entry is None or entry.digest != info["digest"]:
+                    entry = MediaEntry(
+                        path,
+                        info["size"],
+                        info["mtime"],
+                        info["duration"],
+                        info["digest"],
+                    )
+                else:
+                    entry = MediaEntry.from_dict(entry.to_dict())
+                entries.append(entry)
+            categories[category] = entries
+        return categories
+
+    def _analyse(self, entry):
+        """
+        Read a media file to compute its digest and duration.
+
+        :param entry: MediaEntry.
+        :return:
+        """
+        with open(self.absolute_path(entry), "rb") as media:
+            data = media.read()
+        entry.digest = hashlib.sha1(data).hexdigest()
+        entry.duration = mp3_duration(data)
+
+    def _load(self):
+        """
+        Load the persisted index.
+
+        :return: {category: [MediaEntry]}.
+        """
+        try:
+            with open(self.index_file, "r") as index:
+                data = json.load(index)
+            return {
+                category: [MediaEntry.from_dict(entry) for entry in entries]
+                for category, entries in data.get("categories", {}).items()
+            }
+        except (OSError, ValueError, TypeError):
+            return {}
+
+    def _save(self, categories):
+        """
+        Persist the index (replaced atomically).
+
+        :param categories: {category: [MediaEntry]}.
+        :return:
+        """
+        data = {
+            "version": 1,
+            "categories": {
+                category: [entry.to_dict() for entry in entries]
+                for category, entries in categories.items()
+            },
+        }
+        try:
+            with open(self.index_file + ".tmp", "w") as index:
+                json.dump(data, index, indent=1)
+            os.replace(self.index_file + ".tmp", self.index_file)
+        except OSError:
+            log.exception("media catalog: cannot save %s", self.index_file)
+
+
+# Bitrates (kbps) by [mpeg1][layer], mpeg2 and 2.5 share the same tables
+_BITRATES = {
+    (True, 1): (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),
+    (True, 2): (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),
+    (True, 3): (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    (False, 1): (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+    (False, 2): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+    (False, 3): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+
+# Sample rates by version bits (0: mpeg2.5, 2: mpeg2, 3: mpeg1)
+_SAMPLE_RATES = {
+    0: (11025, 12000, 8000),
+    2: (22050, 24000, 16000),
+    3: (44100, 48000, 32000),
+}
+
+
+def mp3_duration(data):
+    """
+    Compute the duration of a mp3 by walking its frame headers (no decoding).
+
+    :param data: content of the mp3 file.
+    :return: duration in seconds or None if no frame is found.
+    """
+    pos = 0
+    # Skip ID3v2 tag
+    if data[:3] == b"ID3" and len(data) >= 10:
+        size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+        pos = 10 + size + (10 if data[5] & 0x10 else 0)
+
+    end = len(data) - 4
+    duration = 0.0
+    frames = 0
+    while pos <= end:
+        if data[pos] != 0xFF or (data[pos + 1] & 0xE0) != 0xE0:
+            pos += 1
+            continue
+        version = (data[pos + 1] >> 3) & 0x03
+        layer = 4 - ((data[pos + 1] >> 1) & 0x03)
+        bitrate_idx = data[pos + 2] >> 4
+        rate_idx = (data[pos + 2] >> 2) & 0x03
+        padding = (data[pos + 2] >> 1) & 0x01
+        if version == 1 or layer == 4 or bitrate_idx in (0, 15) or rate_idx == 3:
+            pos += 1
+            continue
+
+        mpeg1 = version == 3
+        bitrate = _BITRATES[(mpeg1, layer)][bitrate_idx] * 1000
+        sample_rate = _SAMPLE_RATES[version][rate_idx]
+        if layer == 1:
+            samples = 384
+            length = (12 * bitrate // sample_rate + padding) * 4
+        else:
+            samples = 1152 if mpeg1 or layer == 2 else 576
+            length = samples // 8 * bitrate // sample_rate + padding
+
+        duration += samples / sample_rate
+        frames += 1
+        pos += length
+
+    return round(duration, 3) if frames else None
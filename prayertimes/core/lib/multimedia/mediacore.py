@@ -18,10 +18,8 @@
 
 from enum import Enum
 
-from random import choice
-
-from PyQt6.QtCore import QUrl, QDir
-from PyQt6.QtMultimedia import QAudioOutput, QMediaPlayer
+from PyQt6.QtCore import QObject, QUrl, QTimer, pyqtSignal
+from PyQt6.QtMultimedia import QMediaPlayer
 
 
 from prayertimes.core.common.logapi import log
@@ -29,17 +27,23 @@ from prayertimes.core.common.registry import Registry
 from prayertimes.core.common.registryproperties import RegistryProperties
 from prayertimes.core.common.resourceslocation import ResourcesLocation
 from prayertimes.core.common.settings import Settings
+from prayertimes.core.common.tracing import AthanTracer
+from prayertimes.core.lib.multimedia.duaplaylist import DuaPlaylist
+from prayertimes.core.lib.multimedia.mediacatalog import MediaCatalog
+from prayertimes.core.lib.multimedia.mediaengine import MediaEngine
+from prayertimes.core.lib.multimedia.mediapack import MediaPack
+from prayertimes.core.lib.multimedia.playbackarbiter import PlaybackArbiter
+from prayertimes.core.lib.multimedia.residentmedia import ResidentMedia
 
 
 class PlayerPriority(Enum):
     """
     List each player priority.
 
-    Should not need Athan and Dua after athan priority because cannot run on the same time
-    due to implementation of AthanMediaPlayer. Dua after atahn is run just after athan
-    (if selected).
+    Dua after athan is run just after athan (if selected).
 
-    The higheset priority means the players will interrupt the player with lower priority.
+    The higheset priority means the players will interrupt the player with lower priority,
+    see PlaybackArbiter.
     """
 
     ATHAN = 4
@@ -48,122 +52,115 @@ class PlayerPriority(Enum):
     PREVIEW_ATHAN = 1
 
 
-class MediaPriorityHandler(object):
+class MediaCore(QObject):
     """
-    Handles priority of players during play function.
-
-    Before play function is executed, check if there is a current player running.
-
-    Algorithmic view:
+    This is the base class for media players.
 
-    FOREACH(player):
-        IF <player> is playing
-            IF new_player == player
-                NEXT(player)
-            IF priority(<new_player>) > priority(<player>)
-                stop(<player>)
-                play(<new_player>)
-            ELSE
-                nothing (leave current player active)
-        ELSE
-            NEXT(player)
+    A media player does not own a QMediaPlayer, it leases one from the MediaEngine pool
+    when its media is loaded and gives it back when it is stopped or finished.
 
+    Playing goes through the PlaybackArbiter, which starts the player when it gets the
+    audio output. A player with a higher priority pauses (resumable) or stops the current
+    one, a player with a lower priority waits (queueable) or is dropped.
     """
 
-    __instance__ = None
-    __priority__ = {}
+    resumable = False
+    queueable = False
+    # Prayer of the media playing, the mute is set by prayer
+    prayer = None
 
-    def __new__(cls):
-        """
-        Re-implement method __new__ to have a singleton.
-        """
-        if not cls.__instance__:
-            cls.__instance__ = object.__new__(cls)
-        return cls.__instance__
+    # Forwarded from the leased QMediaPlayer
+    mediaStatusChanged = pyqtSignal(object)
+    playbackStateChanged = pyqtSignal(object)
+
+    # All paths of medias are declared here, athans and duas are served by the media catalog
+    _dua_after_athan = ResourcesLocation().dua_dir + "/dua_after_athan.mp3"
 
     def __init__(self):
         """
-        Initialize all sub classes players and their priority.
+        Initialize a Base Player Music object.
+        Configured to play music files only.
         """
-        self.__priority__[vars()["self"]] = vars()["self"].priority
-        log.debug(
-            "media player available : {}".format(vars()["self"].__class__.__name__)
-        )
+        super(MediaCore, self).__init__()
+        # The media is only loaded when a player is leased (before playing)
+        self.engine = MediaEngine()
+        self.player = None
+        self.media = QUrl()
+        # Media loaded in the leased player and device it is read from (media pack)
+        self.loaded = QUrl()
+        self.device = None
+        self.mediaStatusChanged.connect(self.media_status_changed)
 
-    def prioritize(self, __player):
-        for player, priority in self.__priority__.items():
-            if player.playbackState() == QMediaPlayer.PlaybackState.PlayingState:
-                if __player == player:
-                    log.debug(
-                        "media priority: new player same as previous player <{}, {}>".format(
-                            player.type.name, player.priority
-                        )
-                    )
-                    continue
-                log.debug(
-                    "media priority: current player playing <{}, {}>".format(
-                        player.type.name, player.priority
-                    )
-                )
-                log.debug(
-                    "media priority: new player priority <{}, {}>".format(
-                        __player.type.name, __player.priority
-                    )
-                )
-                if __player.priority > priority:
-                    player.stop()
-                    return True
-                else:
-                    return False
-            else:
-                continue
+        self.arbiter = PlaybackArbiter()
+        self.arbiter.register(self)
+        log.debug("media player available : %s", self.__class__.__name__)
 
-        log.debug(
-            "media priority: new player <{}, {}>".format(
-                __player.type.name, __player.priority
-            )
-        )
-        return True
+    @property
+    def list_athans(self):
+        return MediaCatalog().paths(MediaCatalog.ATHANS)
 
+    @property
+    def list_douas(self):
+        return MediaCatalog().paths(MediaCatalog.DUAS)
 
-class MediaCore(QMediaPlayer, MediaPriorityHandler):
-    """
-    This is the base class for media players.
-    """
+    @property
+    def default_athan(self):
+        athans = self.list_athans
+        return athans[0] if athans else None
 
-    # All paths of medias are declared here
-    _dua_after_athan = ResourcesLocation().dua_dir + "/dua_after_athan.mp3"
+    def lease(self):
+        """
+        Lease a player from the media engine if not already done.
 
-    list_athans_files = QDir(ResourcesLocation().athan_dir).entryList(["*.mp3"])
-    list_athans = list(
-        map(QDir(ResourcesLocation().athan_dir).filePath, list_athans_files)
-    )
+        :return: the leased QMediaPlayer or None if no player is available.
+        """
+        if self.player is None:
+            self.player = self.engine.acquire(self)
+            if self.player is not None:
+                self.player.mediaStatusChanged.connect(self.player_status_changed)
+                self.player.playbackStateChanged.connect(self.playbackStateChanged)
+        return self.player
+
+    def detach(self):
+        """
+        Called by the media engine when the leased player goes back to the pool.
 
-    list_douas_files = QDir(ResourcesLocation().dua_dir).entryList(["*.mp3"])
-    list_douas = list(map(QDir(ResourcesLocation().dua_dir).filePath, list_douas_files))
+        :return:
+        """
+        self.player.mediaStatusChanged.disconnect(self.player_status_changed)
+        self.player.playbackStateChanged.disconnect(self.playbackStateChanged)
+        self.player = None
+        # The device is kept until the next load, the player may still read it
+        self.loaded = QUrl()
 
-    default_athan = list_athans[0]
+    def release_player(self):
+        """
+        Give the leased player back to the media engine.
 
-    def __init__(self):
+        :return:
         """
-        Initialize a Base Player Music object.
-        Configured to play music files only.
+        if self.player is not None:
+            self.engine.release(self.player)
+
+    def player_status_changed(self, status):
         """
-        super(MediaCore, self).__init__()
-        # Must initialize the MediaCore with a media, it is not important
-        # which one because it will be set before each play function.
-        self.setup_media(self.default_athan)
-        self.audio_output = QAudioOutput()
-        self.setAudioOutput(self.audio_output)
-        self.mediaStatusChanged.connect(self.media_status_changed)
+        Forward the media status of the leased player, the player is given back at the end
+        of the media.
+
+        :param status: new status of the leased player.
+        :return:
+        """
+        self.mediaStatusChanged.emit(status)
+        if status == QMediaPlayer.MediaStatus.EndOfMedia and not self.is_playing():
+            self.release_player()
 
     def setup_volume(self, volume):
         """
-        Setup the media that will be played.
-        :param media:
+        Setup the volume of the shared audio output.
+        :param volume:
         :return:
         """
-        self.audio_output.setVolume(float(volume / 100))
+        self.engine.setup_volume(volume)
 
     def setup_media(self, media=None):
         """
@@ -171,23 +168,157 @@ class MediaCore(QMediaPlayer, MediaPriorityHandler):
         :param media:
         :return:
         """
-        self.setSource(QUrl.fromLocalFile(media))
+        self.media = QUrl.fromLocalFile(media)
+        if self.player is not None and self.loaded != self.media:
+            self.load()
+
+    def load(self):
+        """
+        Load the media in the leased player, from memory when the media is resident, else
+        from the media pack when it is installed.
+
+        :return:
+        """
+        device, url = ResidentMedia().device(self.media.toLocalFile())
+        if device is None:
+            path = MediaCatalog().relative_path(self.media.toLocalFile())
+            device, url = MediaPack().device(path) if path else (None, None)
+        if device is not None:
+            self.player.setSourceDevice(device, url)
+        else:
+            self.player.setSource(self.media)
+        self.device = device
+        self.loaded = self.media
+
+    def prepare(self):
+        """
+        Load the media in a leased player without playing it.
+
+        :return: True if the media is loaded.
+        """
+        if self.lease() is None:
+            return False
+        if self.loaded != self.media:
+            self.load()
+        return True
 
     def play(self):
         """
         Common play method, all different players go throught this function before playing.
-        Handles prioirity between players.
+        Priority between players is handled by the playback arbiter.
 
         :return:
         """
-        if self.prioritize(self):
-            return super(MediaCore, self).play()
-        else:
-            pass
+        self.arbiter.request(self)
+
+    def start(self, position=None):
+        """
+        Called by the playback arbiter when the player gets the audio output.
+
+        :param position: position to resume from (ms), None to play from the current position.
+        :return: True if the player started.
+        """
+        if not self.prepare():
+            return False
+        entry = MediaCatalog().entry(self.media.toLocalFile())
+        if position is None and self.player.position() == 0:
+            position = self.start_offset(entry)
+        if position:
+            self.player.setPosition(position)
+        self.engine.attach(self.player, self.gain(entry))
+        self.player.play()
+        return True
+
+    @staticmethod
+    def start_offset(entry):
+        """
+        Position (ms) at which the media starts, after its leading silence.
+
+        :param entry: MediaEntry of the media or None if not indexed.
+        :return:
+        """
+        if entry is None or not entry.lead:
+            return 0
+        # Keep a few milliseconds so that the first sound is not cut
+        return max(int(entry.lead * 1000) - 50, 0)
+
+    @staticmethod
+    def gain(entry):
+        """
+        Gain to apply to the media so that all medias have the same loudness.
+        Medias are only attenuated, the volume of the audio output cannot exceed 1.0.
+
+        :param entry: MediaEntry of the media or None if not indexed.
+        :return:
+        """
+        if (
+            entry is None
+            or entry.loudness is None
+            or not Settings().general.loudness_normalization
+        ):
+            return 1.0
+        target = Settings().general.loudness_target
+        return min(1.0, 10 ** ((target - entry.loudness) / 20))
+
+    def pause(self):
+        """
+        Pause the player, it keeps its media loaded.
+
+        :return:
+        """
+        if self.player is not None:
+            self.player.pause()
+
+    def dropped(self):
+        """
+        Called by the playback arbiter when a request to play has been dropped.
+
+        :return:
+        """
+        log.debug("media player dropped : %s", self.__class__.__name__)
 
     def stop(self):
         """Override"""
-        return super(MediaCore, self).stop()
+        self.arbiter.cancel(self)
+        self.release_player()
+
+    def source(self):
+        """
+        Return the media of the player.
+
+        :return:
+        """
+        return self.media
+
+    def mediaStatus(self):
+        """
+        Return the media status of the leased player.
+
+        :return:
+        """
+        if self.player is None:
+            return QMediaPlayer.MediaStatus.NoMedia
+        return self.player.mediaStatus()
+
+    def playbackState(self):
+        """
+        Return the playback state of the leased player.
+
+        :return:
+        """
+        if self.player is None:
+            return QMediaPlayer.PlaybackState.StoppedState
+        return self.player.playbackState()
+
+    def position(self):
+        """
+        Return the position in the media (ms).
+
+        :return:
+        """
+        if self.player is None:
+            return 0
+        return self.player.position()
 
     def media_status_changed(self, status):
         """Override"""
@@ -221,10 +352,19 @@ class MediaCore(QMediaPlayer, MediaPriorityHandler):
 class RandomMediaPlayer(MediaCore):
     """
     This is a random media player used for duas scheduler.
+    The duas are taken from the shuffle bag of the DuaPlaylist, the next dua is read in
+    memory while the current one is playing.
     """
 
     type = PlayerPriority.DUA
     priority = PlayerPriority.DUA.value
+    # Continue the dua once the athan is finished
+    resumable = True
+    queueable = True
+
+    def __init__(self):
+        super(RandomMediaPlayer, self).__init__()
+        self.playlist = DuaPlaylist()
 
     def play(self):
         """
@@ -232,17 +372,29 @@ class RandomMediaPlayer(MediaCore):
 
         :return:
         """
-        super(RandomMediaPlayer, self).setup_media(choice(self.list_douas))
-
         if self.is_playing():
-            self.stop()
-        else:
-            log.debug(
-                "\tPlaying file {}".format(
-                    self.source().toLocalFile()
-                )
-            )
-            return super(RandomMediaPlayer, self).play()
+            return self.stop()
+
+        media = self.playlist.advance()
+        if media is None:
+            log.debug("\tNo dua to play")
+            return
+        super(RandomMediaPlayer, self).setup_media(media)
+        log.debug("\tPlaying file %s", self.source().toLocalFile())
+        super(RandomMediaPlayer, self).play()
+        self.preload_next()
+
+    def preload_next(self):
+        """
+        Keep the next dua of the playlist in memory, so that the next tick does not wait
+        for the disk.
+
+        :return:
+        """
+        if Settings().general.resident_media != 1:
+            return ResidentMedia().release("dua")
+        next_up = self.playlist.next_up()
+        ResidentMedia().hold([next_up] if next_up else [], group="dua")
 
 
 class DuaAfterAthanPlayer(MediaCore):
@@ -252,18 +404,24 @@ class DuaAfterAthanPlayer(MediaCore):
 
     type = PlayerPriority.DUA_AFTER_ATHAN
     priority = PlayerPriority.DUA_AFTER_ATHAN.value
+    queueable = True
 
     def __init__(self):
         super(DuaAfterAthanPlayer, self).__init__()
 
+    def preload(self):
+        """
+        Load the dua while the athan is playing, so that it starts just after the athan.
+
+        :return:
+        """
+        super(DuaAfterAthanPlayer, self).setup_media(self._dua_after_athan)
+        return self.prepare()
+
     def play(self):
         """Override"""
         super(DuaAfterAthanPlayer, self).setup_media(self._dua_after_athan)
-        log.debug(
-            "begin dua after athan with media {}".format(
-                self.source().toLocalFile()
-            )
-        )
+        log.debug("begin dua after athan with media %s", self.source().toLocalFile())
         return super(DuaAfterAthanPlayer, self).play()
 
     def stop(self):
@@ -289,16 +447,130 @@ class AthanMediaPlayer(RegistryProperties, MediaCore):
     catch the playing start event and execute some needed functions.
 
     It also handles the dua after athan player.
+
+    The athan media can be loaded some seconds before the athan (pre-roll) so that the
+    athan starts without opening and decoding the file at the scheduled time. In the same
+    way, the dua after athan is loaded while the athan is playing.
     """
 
     __caller__ = ""
     type = PlayerPriority.ATHAN
     priority = PlayerPriority.ATHAN.value
 
+    # Emitted from the scheduler thread, handled in the thread of the player
+    prewarm_requested = pyqtSignal(str)
+    release_requested = pyqtSignal(str)
+    play_requested = pyqtSignal(str)
+
     def __init__(self):
         super(AthanMediaPlayer, self).__init__()
         self.current_media = self.default_athan
         self.dua_after_athan_player = DuaAfterAthanPlayer()
+        self.playbackStateChanged.connect(self.playback_state_changed)
+
+        # Prayer for which the athan media has been pre-loaded
+        self.prewarmed = None
+        self.release_timer = QTimer(self)
+        self.release_timer.setSingleShot(True)
+        self.release_timer.timeout.connect(self.release)
+        self.prewarm_requested.connect(self._prewarm)
+        self.release_requested.connect(self.release)
+        self.play_requested.connect(self._play)
+
+    @property
+    def prayer(self):
+        return self.__caller__ or None
+
+    def prewarm(self, prayer):
+        """
+        Pre-load the athan media of prayer, can be called from any thread.
+
+        :param prayer: prayer name.
+        :return:
+        """
+        self.prewarm_requested.emit(prayer)
+
+    def cancel_prewarm(self, prayer):
+        """
+        Release the athan media pre-loaded for prayer, can be called from any thread.
+
+        :param prayer: prayer name.
+        :return:
+        """
+        self.release_requested.emit(prayer)
+
+    def trigger(self, prayer):
+        """
+        Start the athan of prayer, can be called from any thread.
+
+        :param prayer: prayer name.
+        :return:
+        """
+        self.play_requested.emit(prayer)
+
+    def _play(self, prayer):
+        """
+        Start the athan of prayer in the thread of the player.
+
+        :param prayer: prayer name.
+        :return:
+        """
+        self.play(prayer=prayer)
+
+    def _prewarm(self, prayer):
+        """
+        Load the athan media and refresh the audio device before the athan.
+        Only the athan player is touched, a dua or a preview playing is not disturbed: when
+        it holds the audio output the device is refreshed when the athan takes the output.
+
+        :param prayer: prayer name.
+        :return:
+        """
+        if self.is_playing():
+            return
+        log.debug("pre-loading athan of prayer: %s", prayer)
+        super(AthanMediaPlayer, self).setup_media(self.current_media)
+        if not self.prepare():
+            return
+        self.engine.refresh_device(self.player)
+        self.prewarmed = prayer
+
+        # Release the media if the athan does not start (paused, rescheduled...)
+        seconds = Settings().prayer.athan_prewarm
+        self.release_timer.start((seconds + 120) * 1000)
+
+    def release(self, prayer=None):
+        """
+        Release the pre-loaded athan media.
+
+        :param prayer: release only if the media has been pre-loaded for this prayer.
+        :return:
+        """
+        if not self.prewarmed or (prayer and prayer != self.prewarmed):
+            return
+        self.release_timer.stop()
+        self.prewarmed = None
+        if not self.is_playing():
+            log.debug("releasing pre-loaded athan")
+            self.release_player()
+
+    def is_prewarmed(self, prayer):
+        """
+        Check that the current athan media has been pre-loaded for prayer.
+
+        :param prayer: prayer name.
+        :return:
+        """
+        return (
+            self.prewarmed == prayer
+            and self.player is not None
+            and self.loaded == QUrl.fromLocalFile(self.current_media)
+            and self.mediaStatus()
+            in (
+                QMediaPlayer.MediaStatus.LoadedMedia,
+                QMediaPlayer.MediaStatus.BufferedMedia,
+            )
+        )
 
     def play(self, *args, **kwargs):
         """
@@ -313,7 +585,14 @@ class AthanMediaPlayer(RegistryProperties, MediaCore):
         :return:
         """
         self.__caller__ = kwargs.get("prayer")
-        super(AthanMediaPlayer, self).setup_media(self.current_media)
+        AthanTracer().mark(AthanTracer.PLAY, self.__caller__)
+
+        prewarmed = self.is_prewarmed(self.__caller__)
+        AthanTracer().annotate(self.__caller__, prewarmed=prewarmed)
+        self.release_timer.stop()
+        self.prewarmed = None
+        if not prewarmed:
+            super(AthanMediaPlayer, self).setup_media(self.current_media)
 
         if self.is_playing() or self.dua_after_athan_player.is_playing():
             # Need to call parent's stop function
@@ -321,9 +600,9 @@ class AthanMediaPlayer(RegistryProperties, MediaCore):
             self.dua_after_athan_player.stop()
 
         log.debug(
-            "begin athan of prayer: {} with media {}".format(
-                self.__caller__, self.source().toLocalFile()
-            )
+            "begin athan of prayer: %s with media %s",
+            self.__caller__,
+            self.source().toLocalFile(),
         )
 
         Registry().emit_signal(
@@ -335,6 +614,29 @@ class AthanMediaPlayer(RegistryProperties, MediaCore):
 
         return super(AthanMediaPlayer, self).play()
 
+    def start(self, position=None):
+        """
+        Start the athan and load the dua after athan while the athan is playing.
+
+        :param position: position to resume from (ms).
+        :return: True if the athan started.
+        """
+        AthanTracer().mark(AthanTracer.PRIORITIZE)
+        started = super(AthanMediaPlayer, self).start(position)
+        if started and Settings().prayer.dua_after_athan == 1:
+            self.dua_after_athan_player.preload()
+        return started
+
+    def dropped(self):
+        """
+        Record in the athan trace that the athan has not been played.
+
+        :return:
+        """
+        AthanTracer().mark(AthanTracer.DROPPED)
+        AthanTracer().close()
+        return super(AthanMediaPlayer, self).dropped()
+
     def stop(self):
         """
         Core function of athan, need to interact with other widgets when Athan is stopped (NOT finished):
@@ -347,6 +649,8 @@ class AthanMediaPlayer(RegistryProperties, MediaCore):
         if not self.is_playing():
             return
 
+        AthanTracer().close()
+
         self.prayer_frame.praytimes[self.__caller__].mute_cb.hide()
 
         # Reset volume to normal after athan finished
@@ -354,6 +658,9 @@ class AthanMediaPlayer(RegistryProperties, MediaCore):
 
         Registry().emit_signal("hide_systray_panel")
 
+        # Give back the player of the pre-loaded dua after athan
+        self.dua_after_athan_player.stop()
+
         return super(AthanMediaPlayer, self).stop()
 
     def media_status_changed(self, status):
@@ -366,8 +673,11 @@ class AthanMediaPlayer(RegistryProperties, MediaCore):
 
         :return:
         """
+        AthanTracer().mark_status(status)
+
         if status == QMediaPlayer.MediaStatus.EndOfMedia:
             log.debug("finished playing athan normally")
+            AthanTracer().close()
             self.prayer_frame.praytimes[self.__caller__].mute_cb.hide()
 
             # Reset volume to normal after athan finished
@@ -375,15 +685,29 @@ class AthanMediaPlayer(RegistryProperties, MediaCore):
 
             Registry().emit_signal("hide_systray_panel")
 
-            if Settings().value("prayer_settings/dua_after_athan") == 1:
-                # TODO - Remove the stop function as the state SHOULD already be stopped here.. Need Qt fix.
-                # Athan is not in stopped state here
-                # Need to stop before runnning dua after athan (can cause priority issue)
-                super(AthanMediaPlayer, self).stop()
+            # TODO - Remove the stop function as the state SHOULD already be stopped here.. Need Qt fix.
+            # Athan is not in stopped state here
+            # Need to stop before runnning dua after athan (can cause priority issue)
+            super(AthanMediaPlayer, self).stop()
+            if Settings().prayer.dua_after_athan == 1:
+                # Already loaded while the athan was playing
                 self.dua_after_athan_player.play()
+            else:
+                self.dua_after_athan_player.stop()
         # else:
         #     log.debug("athan media status: {}".format(status))
 
+    @staticmethod
+    def playback_state_changed(state):
+        """
+        Record in the athan trace the moment the athan is audible.
+
+        :param state: new playback state of the player.
+        :return:
+        """
+        if state == QMediaPlayer.PlaybackState.PlayingState:
+            AthanTracer().mark(AthanTracer.PLAYING)
+
 
 class AthanPreviewPlayer(MediaCore):
     """
@@ -0,0 +1,200 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# --------------------------------------------------------------------------- #
+# QuantumPT - Open Source Portable Islamic prayer times reminder              #
+# --------------------------------------------------------------------------- #
+# Copyright (c) 2016 QuantumPT Developer                                      #
+# --------------------------------------------------------------------------- #
+# This program is free software; you can redistribute it and/or modify it     #
+# under the terms of the GNU General Public License as published by the Free  #
+# Software Foundation; version 3 of the License.                              #
+#                                                                             #
+# This program is distributed in the hope that it will be useful, but WITHOUT #
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or       #
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for    #
+# more details.                                                               #
+# --------------------------------------------------------------------------- #
+
+from PyQt6.QtCore import QUrl
+from PyQt6.QtMultimedia import QMediaPlayer
+
+from prayertimes.core.common.logapi import log
+from prayertimes.core.common.settings import Settings
+from prayertimes.core.lib.multimedia.audiosink import create_sink
+from prayertimes.core.lib.multimedia.volumecontrol import VolumeControl
+
+
+class MediaEngine(object):
+    """
+    Small pool of QMediaPlayer sharing a single QAudioOutput.
+
+    The media players of the program (athan, dua after athan, duas, preview) do not own a
+    QMediaPlayer, they lease one from the pool while they have a media loaded and give it back
+    when they are stopped or finished. Only the player that is started holds the audio output.
+
+    Two players are enough: one playing and one pre-loading the next media (pre-roll of the athan,
+    dua after athan chained to the athan).
+
+    Players and output are provided by an AudioSink (general_settings/audio_sink): Qt, an
+    external program (pipe) or nothing (null, for tests and benchmarks). The volume and the
+    mute of the VolumeControl are applied to the sink for the player holding the output.
+    """
+
+    __instance__ = None
+
+    pool_size = 2
+
+    def __new__(cls):
+        """
+        Re-implement method __new__ to have a singleton.
+        The players are created by the first call, it must be done in the GUI thread.
+        """
+        if not cls.__instance__:
+            cls.__instance__ = object.__new__(cls)
+            cls.__instance__.leases = {}
+            cls.__instance__.owner = None
+            # Device refresh asked while another player held the output
+            cls.__instance__.stale_device = False
+            # Volume set by the user and gain of the media playing
+            cls.__instance__.control = VolumeControl()
+            cls.__instance__.control.changed.connect(cls.__instance__.apply)
+            cls.__instance__.gain = 1.0
+            cls.__instance__.set_sink(
+                create_sink(
+                    Settings().general.audio_sink,
+                    Settings().general.audio_sink_command,
+                )
+            )
+        return cls.__instance__
+
+    def set_sink(self, sink):
+        """
+        Replace the audio sink and the players of the pool, the medias playing are stopped.
+
+        :param sink: AudioSink.
+        :return:
+        """
+        for player in list(self.leases):
+            self.release(player)
+        self.sink = sink
+        self.stale_device = False
+        self.players = [sink.create_player() for _ in range(self.pool_size)]
+        self.apply()
+        log.debug("media engine: using %s audio sink", sink.name)
+
+    def acquire(self, role):
+        """
+        Lease a player of the pool to role.
+
+        When every player is leased, the player of the lowest priority role that is not playing
+        is taken back. Return None if all players are playing.
+
+        :param role: media player (MediaCore) requesting a QMediaPlayer.
+        :return: the leased QMediaPlayer or None.
+        """
+        for player, holder in self.leases.items():
+            if holder is role:
+                return player
+
+        free = [player for player in self.players if player not in self.leases]
+        if not free:
+            idle = sorted(
+                (
+                    player
+                    for player in self.leases
+                    if player.playbackState() != QMediaPlayer.PlaybackState.PlayingState
+                ),
+                key=lambda player: self.leases[player].priority,
+            )
+            if not idle or self.leases[idle[0]].priority > role.priority:
+                log.debug("media engine: no player available for %s", role.type.name)
+                return None
+            log.debug(
+                "media engine: player taken back from %s",
+                self.leases[idle[0]].type.name,
+            )
+            self.release(idle[0])
+            free = [idle[0]]
+
+        self.leases[free[0]] = role
+        return free[0]
+
+    def release(self, player):
+        """
+        Stop player, unload its media and give it back to the pool.
+
+        :param player: leased QMediaPlayer.
+        :return:
+        """
+        role = self.leases.get(player)
+        player.stop()
+        if role is not None:
+            role.detach()
+            del self.leases[player]
+        if self.owner is player:
+            self.sink.detach(player)
+            self.owner = None
+        # Unloading the media closes the file and frees the decoder
+        player.setSource(QUrl())
+
+    def attach(self, player, gain=1.0):
+        """
+        Give the audio output to player, the previous holder is silenced.
+
+        :param player: leased QMediaPlayer that is about to play.
+        :param gain: gain of the media (loudness normalisation), applied on top of the volume.
+        :return:
+        """
+        self.gain = gain
+        if self.owner is not player:
+            if self.owner is not None:
+                self.sink.detach(self.owner)
+            if self.stale_device:
+                self.stale_device = False
+                self.sink.refresh_device()
+            self.sink.attach(player)
+            self.owner = player
+        self.apply()
+
+    def refresh_device(self, player):
+        """
+        Follow the default output device of the system for player.
+        The audio output is shared, when another player holds it the refresh is done when
+        the output is given to the next player.
+
+        :param player: leased QMediaPlayer asking for the refresh.
+        :return:
+        """
+        if self.owner is not None and self.owner is not player:
+            self.stale_device = True
+            return
+        self.stale_device = False
+        self.sink.refresh_device()
+
+    def holder(self):
+        """
+        Return the media player (MediaCore) holding the audio output.
+
+        :return:
+        """
+        return self.leases.get(self.owner)
+
+    def apply(self):
+        """
+        Apply the volume and the mute of the VolumeControl to the audio sink.
+
+        :return:
+        """
+        holder = self.holder()
+        self.sink.set_volume(self.control.level() * self.gain)
+        self.sink.set_muted(holder is not None and self.control.is_muted(holder.prayer))
+
+    def setup_volume(self, volume):
+        """
+        Setup the volume of the audio output.
+
+        :param volume: volume between 0 and 100.
+        :return:
+        """
+        self.control.set_volume(volume)
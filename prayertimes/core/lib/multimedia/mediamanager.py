@@ -16,15 +16,26 @@
 # more details.                                                               #
 # --------------------------------------------------------------------------- #
 
-from prayertimes.core.common.registry import Registry
+from PyQt6.QtCore import QTimer
+
+from prayertimes.core.common import events
 from prayertimes.core.common.registryproperties import RegistryProperties
 from prayertimes.core.common.registrymixin import UniqueRegistryMixin
-
+from prayertimes.core.common.settings import Settings
+from prayertimes.core.common.settingsbus import SettingsBus
+from prayertimes.core.common.tracing import AthanTracer
+
+from prayertimes.core.lib.multimedia.audiosink import create_sink
+from prayertimes.core.lib.multimedia.locationathans import LocationAthans
+from prayertimes.core.lib.multimedia.mediaanalyzer import MediaAnalyzer
+from prayertimes.core.lib.multimedia.mediacatalog import MediaCatalog
 from prayertimes.core.lib.multimedia.mediacore import (
     AthanPreviewPlayer,
     AthanMediaPlayer,
     RandomMediaPlayer,
 )
+from prayertimes.core.lib.multimedia.mediaengine import MediaEngine
+from prayertimes.core.lib.multimedia.residentmedia import ResidentMedia
 
 
 class MediaManager(UniqueRegistryMixin, RegistryProperties):
@@ -33,33 +44,85 @@ class MediaManager(UniqueRegistryMixin, RegistryProperties):
         Athan player (which include dua after athan)
         Athan preview player
         Dua timer player
+        Athans of the additional locations (multi-location mode)
+
+    The players share the pool of QMediaPlayer and the audio output of the MediaEngine.
+    The selected athan, the dua after athan and the next dua are kept in memory
+    (ResidentMedia).
     """
 
     # Shourouq is not included because it is not an athan
     __prayers_list__ = ["Fajr", "Dhuhr", "Asr", "Maghrib", "Isha"]
 
+    # Milliseconds after startup before checking the media folders
+    catalog_refresh_delay = 10000
+
     def __init__(self):
         super(MediaManager, self).__init__(None)
 
+        self.engine = MediaEngine()
         self.athan_preview = AthanPreviewPlayer()
         self.athan_player = AthanMediaPlayer()
         self.dua_player = RandomMediaPlayer()
+        self.location_athans = LocationAthans()
 
-        self.list_athan = self.athan_player.list_athans[:]
+        self.catalog = MediaCatalog()
+        self.analyzer = None
+        self.resident = ResidentMedia()
+
+        # Athan selected by the user, the first athan by default
+        names = self.catalog.names(MediaCatalog.ATHANS)
+        if Settings().prayer.athan in names:
+            self.athan_player.current_media = self.list_athan[
+                names.index(Settings().prayer.athan)
+            ]
 
     def __application_init__(self):
-        Registry().register_function("stop_current_athan", self.stop_current_athan)
-        Registry().register_function("pause_all_athans", self.pause_all_athans)
-        Registry().register_function("resume_all_athans", self.resume_all_athans)
-        Registry().register_function("stop_preview_athan", self.stop_preview_athan)
-        Registry().register_function(
-            "control_preview_athan", self.control_preview_athan
+        events.stop_current_athan.connect(self.stop_current_athan)
+        events.pause_all_athans.connect(self.pause_all_athans)
+        events.resume_all_athans.connect(self.resume_all_athans)
+        events.stop_preview_athan.connect(self.stop_preview_athan)
+        events.control_preview_athan.connect(self.control_preview_athan)
+        events.change_current_athan.connect(self.change_athan)
+        events.log_athan_trace.connect(AthanTracer().log_summary)
+
+        AthanTracer().set_persistence(Settings().general.athan_trace == 1)
+
+        SettingsBus().subscribe("prayer_settings/dua_after_athan", self.media_changed)
+        SettingsBus().subscribe("general_settings/resident_media", self.media_changed)
+        SettingsBus().subscribe("general_settings/athan_trace", self.trace_changed)
+        SettingsBus().subscribe("general_settings/audio_sink", self.sink_changed)
+        SettingsBus().subscribe(
+            "general_settings/audio_sink_command", self.sink_changed
         )
-        Registry().register_function("change_current_athan", self.change_athan)
+        SettingsBus().subscribe("locations", self.location_athans.load)
+
+        self.location_athans.load()
+
+    def __application_post_init__(self):
+        # Check the media folders once the application is displayed, then analyse the
+        # new medias in the background
+        self.analyzer = MediaAnalyzer()
+        # Medias changed on disk are read again in the refresh thread
+        self.catalog.changed.connect(self.hold_media)
+        QTimer.singleShot(self.catalog_refresh_delay, self.catalog.refresh_async)
+        QTimer.singleShot(self.catalog_refresh_delay, self.hold_media)
 
     def __application_clean__(self):
         self.stop_current_athan()
         self.stop_preview_athan()
+        self.location_athans.stop()
+        self.engine.control.flush()
+        if self.analyzer is not None:
+            self.analyzer.stop()
+        AthanTracer().log_summary()
+
+    @property
+    def list_athan(self):
+        """
+        Paths of the athans, in the order of the athans combo box.
+        """
+        return self.catalog.paths(MediaCatalog.ATHANS)
 
     def stop_preview_athan(self):
         """
@@ -100,6 +163,7 @@ class MediaManager(UniqueRegistryMixin, RegistryProperties):
         :return:
         """
         self.scheduler_manager.pause_job(job_id=prayer)
+        self.athan_player.release(prayer)
 
     def resume_athan(self, prayer):
         """
@@ -137,7 +201,12 @@ class MediaManager(UniqueRegistryMixin, RegistryProperties):
         :param prayer_dict: a dictionary with {prayer_name : time (datetime object)}.
         :return:
         """
-        self.scheduler_manager.run_athan_scheduler(self.athan_player.play, prayer_dict)
+        self.scheduler_manager.run_athan_scheduler(
+            self.athan_player.trigger,
+            prayer_dict,
+            prewarm_func=self.athan_player.prewarm,
+            release_func=self.athan_player.cancel_prewarm,
+        )
 
     def change_athan(self, idx):
         """
@@ -149,33 +218,78 @@ class MediaManager(UniqueRegistryMixin, RegistryProperties):
         path = self.list_athan[idx]
         # Do not call setup_metia (will stop athan if already playing)
         self.athan_player.current_media = path
+        self.athan_player.release()
+        self.hold_media()
+
+    def hold_media(self):
+        """
+        Keep the medias of the athan player and the next dua in memory, so that they do not
+        wait for the disk. Medias are only read when the selection or the files change.
+
+        :return:
+        """
+        self.dua_player.preload_next()
+        if Settings().general.resident_media != 1:
+            self.resident.release("athan")
+            return
+        medias = [self.athan_player.current_media]
+        if Settings().prayer.dua_after_athan == 1:
+            medias.append(self.athan_player._dua_after_athan)
+        self.resident.hold(medias)
+
+    def media_changed(self, changes):
+        """
+        Keep in memory the medias of the new settings.
+
+        :param changes: {key: value} of the settings changed.
+        :return:
+        """
+        self.hold_media()
+
+    def trace_changed(self, changes):
+        """
+        :param changes: {key: value} of the setting.
+        :return:
+        """
+        AthanTracer().set_persistence(changes["general_settings/athan_trace"] == 1)
+
+    def sink_changed(self, changes):
+        """
+        Play the medias on the audio sink set, the locations get new sinks too.
+
+        :param changes: {key: value} of the settings changed.
+        :return:
+        """
+        self.engine.set_sink(
+            create_sink(
+                Settings().general.audio_sink, Settings().general.audio_sink_command
+            )
+        )
+        self.location_athans.load()
 
     def set_volume(self, vol):
         """
-        Set volume to athans player.
+        Set volume to all players, they share the same audio output.
 
         :param vol: new volume to set.
         :return:
         """
-        self.athan_player.setup_volume(vol)
-        # dua_after_athan player is inside athan_player object
-        self.athan_player.dua_after_athan_player.setup_volume(vol)
-
-        self.dua_player.setup_volume(vol)
-        self.athan_preview.setup_volume(vol)
+        self.engine.control.set_volume(vol)
 
-    def mute(self):
+    def mute(self, prayer):
         """
-        Set mute to current prayer athan playing.
+        Set mute to the athan of prayer, the other players are not muted.
 
+        :param prayer: prayer name.
         :return:
         """
-        self.athan_player.setMuted(True)
+        self.engine.control.set_muted(prayer, True)
 
-    def unmute(self):
+    def unmute(self, prayer):
         """
-        Disable mute for current prayer athan playing.
+        Disable mute for the athan of prayer.
 
+        :param prayer: prayer name.
         :return:
         """
-        self.athan_player.setMuted(False)
+        self.engine.control.set_muted(prayer, False)
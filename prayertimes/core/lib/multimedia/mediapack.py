@@ -0,0 +1,277 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# --------------------------------------------------------------------------- #
+# QuantumPT - Open Source Portable Islamic prayer times reminder              #
+# --------------------------------------------------------------------------- #
+# Copyright (c) 2016 QuantumPT Developer                                      #
+# --------------------------------------------------------------------------- #
+# This program is free software; you can redistribute it and/or modify it     #
+# under the terms of the GNU General Public License as published by the Free  #
+# Software Foundation; version 3 of the License.                              #
+#                                                                             #
+# This program is distributed in the hope that it will be useful, but WITHOUT #
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or       #
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for    #
+# more details.                                                               #
+# --------------------------------------------------------------------------- #
+
+"""
+Media pack: athans and duas transcoded to a compact profile and stored in a single file.
+
+Layout of the pack file:
+
+    magic       | 8 bytes, b"QPTPACK" + version
+    index size  | 4 bytes, little endian
+    index       | json, {"entries": {path: {...}}, "blobs": [[offset, length], ...]}
+    blobs       | media contents, identical contents are stored once
+
+The pack is built with:
+
+    python -m prayertimes.core.lib.multimedia.mediapack [--bitrate 32k] [--copy]
+
+which needs ffmpeg to transcode (--copy only deduplicates and packs the mp3 files).
+Once built, the pack is shipped by build.pdy instead of the athans and duas directories.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import struct
+import subprocess
+import sys
+import threading
+
+from PyQt6.QtCore import QBuffer, QByteArray, QIODevice, QUrl
+
+from prayertimes.core.common.logapi import log
+from prayertimes.core.common.resourceslocation import ResourcesLocation
+
+MAGIC = b"QPTPACK\x01"
+
+# Transcoding profile: athans and duas are voice, mono Opus keeps them intelligible at low bitrate
+PROFILE = {"codec": "libopus", "bitrate": "32k", "channels": 1, "ext": ".opus"}
+
+
+class MediaPack(object):
+    """
+    Reader of the media pack. Only the header is read when the pack is opened, an entry is
+    read from the pack file each time it is opened and served to QMediaPlayer from memory
+    (the transcoded athans and duas are a few hundred kilobytes).
+    """
+
+    __instance__ = None
+
+    file_name = "media.pack"
+
+    def __new__(cls):
+        """
+        Re-implement method __new__ to have a singleton.
+        """
+        if not cls.__instance__:
+            cls.__instance__ = object.__new__(cls)
+            cls.__instance__.file_path = os.path.join(
+                os.path.dirname(ResourcesLocation().athan_dir), cls.file_name
+            ).replace("\\", "/")
+            cls.__instance__.index = None
+            cls.__instance__.data_offset = 0
+            cls.__instance__._lock = threading.Lock()
+        return cls.__instance__
+
+    def available(self):
+        """
+        Return True if a media pack is installed.
+
+        :return:
+        """
+        return self._load() is not None
+
+    def entries(self):
+        """
+        Return the entries of the pack {relative path: dict}.
+
+        :return:
+        """
+        index = self._load()
+        return index["entries"] if index else {}
+
+    def read(self, path):
+        """
+        Read the content of an entry.
+
+        :param path: path relative to the multimedia directory (athans/athan_1.mp3).
+        :return: bytes or None if the entry is not in the pack.
+        """
+        index = self._load()
+        if not index or path not in index["entries"]:
+            return None
+        offset, length = index["blobs"][index["entries"][path]["blob"]]
+        with self._lock, open(self.file_path, "rb") as pack:
+            pack.seek(self.data_offset + offset)
+            return pack.read(length)
+
+    def device(self, path):
+        """
+        Read an entry in a read-only QBuffer, the whole content of the entry is copied.
+
+        :param path: path relative to the multimedia directory (athans/athan_1.mp3).
+        :return: (QBuffer, QUrl) or (None, None) if the entry is not in the pack. The url
+                 only gives the format of the content to the player.
+        """
+        data = self.read(path)
+        if data is None:
+            return None, None
+        device = QBuffer()
+        device.setData(QByteArray(data))
+        device.open(QIODevice.OpenModeFlag.ReadOnly)
+        ext = self.entries()[path].get("ext", os.path.splitext(path)[1])
+        return device, QUrl(os.path.splitext(path)[0] + ext)
+
+    def _load(self):
+        """
+        Load the index of the pack the first time.
+
+        :return: index dict or None if there is no (valid) pack.
+        """
+        if self.index is not None:
+            return self.index or None
+        self.index = {}
+        try:
+            with open(self.file_path, "rb") as pack:
+                if pack.read(len(MAGIC)) != MAGIC:
+                    log.error("media pack: invalid file %s", self.file_path)
+                    return None
+                (size,) = struct.unpack("<I", pack.read(4))
+                self.index = json.loads(pack.read(size).decode("utf-8"))
+                self.data_offset = len(MAGIC) + 4 + size
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, struct.error):
+            log.exception("media pack: cannot read %s", self.file_path)
+            return None
+        return self.index
+
+
+def transcode(path, profile):
+    """
+    Transcode a media with ffmpeg.
+
+    :param path: path of the media.
+    :param profile: transcoding profile (see PROFILE).
+    :return: transcoded content.
+    """
+    command = [
+        "ffmpeg",
+        "-v",
+        "error",
+        "-i",
+        path,
+        "-vn",
+        "-map_metadata",
+        "-1",
+        "-ac",
+        str(profile["channels"]),
+        "-c:a",
+        profile["codec"],
+        "-b:a",
+        profile["bitrate"],
+        "-f",
+        "ogg",
+        "-",
+    ]
+    return subprocess.run(command, check=True, stdout=subprocess.PIPE).stdout
+
+
+def build(multimedia_dir, output, profile=None):
+    """
+    Build the media pack of the athans and duas of multimedia_dir.
+
+    :param multimedia_dir: directory containing the athans and duas directories.
+    :param output: path of the pack file.
+    :param profile: transcoding profile, None to store the files as they are.
+    :return: (size of the sources, size of the pack).
+    """
+    # Imported here, the catalog uses the pack reader
+    from prayertimes.core.lib.multimedia.mediacatalog import mp3_duration
+
+    entries = {}
+    blobs = []
+    contents = []
+    by_digest = {}
+    source_size = 0
+
+    for category in ("athans", "duas"):
+        directory = os.path.join(multimedia_dir, category)
+        for name in sorted(os.listdir(directory)):
+            if not name.lower().endswith(".mp3"):
+                continue
+            path = os.path.join(directory, name)
+            with open(path, "rb") as media:
+                data = media.read()
+            source_size += len(data)
+            digest = hashlib.sha1(data).hexdigest()
+
+            if digest not in by_digest:
+                content = transcode(path, profile) if profile else data
+                by_digest[digest] = len(blobs)
+                offset = blobs[-1][0] + blobs[-1][1] if blobs else 0
+                blobs.append((offset, len(content)))
+                contents.append(content)
+
+            stat = os.stat(path)
+            entries[category + "/" + name] = {
+                "blob": by_digest[digest],
+                "size": stat.st_size,
+                "mtime": stat.st_mtime,
+                "digest": digest,
+                "duration": mp3_duration(data),
+                "ext": profile["ext"] if profile else ".mp3",
+            }
+
+    index = json.dumps(
+        {"version": 1, "profile": profile, "entries": entries, "blobs": blobs}
+    ).encode("utf-8")
+    with open(output + ".tmp", "wb") as pack:
+        pack.write(MAGIC)
+        pack.write(struct.pack("<I", len(index)))
+        pack.write(index)
+        for content in contents:
+            pack.write(content)
+    os.replace(output + ".tmp", output)
+
+    log.info(
+        "media pack: %s entries, %s contents, %s -> %s bytes",
+        len(entries),
+        len(blobs),
+        source_size,
+        os.path.getsize(output),
+    )
+    return source_size, os.path.getsize(output)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the QuantumPT media pack.")
+    parser.add_argument("output", nargs="?", default=MediaPack().file_path)
+    parser.add_argument(
+        "--source", default=os.path.dirname(ResourcesLocation().athan_dir)
+    )
+    parser.add_argument("--bitrate", default=PROFILE["bitrate"])
+    parser.add_argument(
+        "--copy", action="store_true", help="store the mp3 files without transcoding"
+    )
+    args = parser.parse_args(argv)
+
+    profile = None
+    if not args.copy:
+        if shutil.which("ffmpeg") is None:
+            parser.error("ffmpeg is needed to transcode, use --copy to only pack")
+        profile = dict(PROFILE, bitrate=args.bitrate)
+
+    source_size, pack_size = build(args.source, args.output, profile)
+    print("{} -> {} bytes".format(source_size, pack_size))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
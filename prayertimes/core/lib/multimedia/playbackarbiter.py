@@ -0,0 +1,220 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# --------------------------------------------------------------------------- #
+# QuantumPT - Open Source Portable Islamic prayer times reminder              #
+# --------------------------------------------------------------------------- #
+# Copyright (c) 2016 QuantumPT Developer                                      #
+# --------------------------------------------------------------------------- #
+# This program is free software; you can redistribute it and/or modify it     #
+# under the terms of the GNU General Public License as published by the Free  #
+# Software Foundation; version 3 of the License.                              #
+#                                                                             #
+# This program is distributed in the hope that it will be useful, but WITHOUT #
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or       #
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for    #
+# more details.                                                               #
+# --------------------------------------------------------------------------- #
+
+import heapq
+import itertools
+import weakref
+
+from PyQt6.QtCore import QObject, Qt, pyqtSignal
+from PyQt6.QtMultimedia import QMediaPlayer
+
+from prayertimes.core.common.logapi import log
+
+
+class PlaybackArbiter(QObject):
+    """
+    Decide which media player owns the audio output.
+
+    Playback requests are handled in the thread of the arbiter (GUI thread), they can be
+    sent from any thread (athans are played from the scheduler threads). For a request:
+
+        IF no owner or owner == player
+            play(<player>)
+        ELSE IF priority(<player>) > priority(<owner>)
+            pause(<owner>) and queue it if resumable, stop(<owner>) otherwise
+            play(<player>)
+        ELSE IF <player> is queueable
+            queue(<player>)
+        ELSE
+            drop(<player>)
+
+    When the owner is stopped or finished, the queued request with the highest priority
+    (the oldest first for equal priorities) is played. The queue only holds weak references.
+    """
+
+    __instance__ = None
+    __initialised__ = False
+
+    requested = pyqtSignal(object)
+    promote_requested = pyqtSignal()
+
+    def __new__(cls):
+        """
+        Re-implement method __new__ to have a singleton.
+        """
+        if not cls.__instance__:
+            cls.__instance__ = super(PlaybackArbiter, cls).__new__(cls)
+        return cls.__instance__
+
+    def __init__(self):
+        """
+        Must be created in the GUI thread.
+        """
+        if self.__initialised__:
+            return
+        super(PlaybackArbiter, self).__init__()
+        self.__initialised__ = True
+
+        self.owner = None
+        # Heap of [-priority, sequence, weakref(player), position]
+        self.queue = []
+        # Sequence of the valid request of each queued player (lazy deletion)
+        self.pending = weakref.WeakKeyDictionary()
+        self.counter = itertools.count()
+
+        self.requested.connect(self._request)
+        # Queued, so that a player chained in a finished handler (dua after athan) is
+        # requested before the queue is looked at
+        self.promote_requested.connect(
+            self._promote, Qt.ConnectionType.QueuedConnection
+        )
+
+    def register(self, player):
+        """
+        Follow the playback state of a media player.
+
+        :param player: media player (MediaCore).
+        :return:
+        """
+        player.playbackStateChanged.connect(self._state_changed)
+
+    def current(self):
+        """
+        Return the media player owning the audio output or None.
+
+        :return:
+        """
+        return self.owner
+
+    def request(self, player):
+        """
+        Request to play player, can be called from any thread.
+
+        :param player: media player (MediaCore).
+        :return:
+        """
+        self.requested.emit(player)
+
+    def cancel(self, player):
+        """
+        Remove the queued request of player.
+
+        :param player: media player (MediaCore).
+        :return:
+        """
+        self.pending.pop(player, None)
+
+    def _request(self, player):
+        """
+        Handle a playback request.
+
+        :param player: media player (MediaCore).
+        :return:
+        """
+        self.cancel(player)
+        owner = self.owner
+
+        if owner is None or owner is player:
+            self._grant(player)
+        elif player.priority > owner.priority:
+            log.debug(
+                "playback arbiter: <%s> preempts <%s>",
+                player.type.name,
+                owner.type.name,
+            )
+            # Change owner first, the state of the preempted player is not followed anymore
+            self.owner = player
+            if owner.resumable:
+                position = owner.position()
+                owner.pause()
+                self._enqueue(owner, position)
+            else:
+                owner.stop()
+            self._grant(player)
+        elif player.queueable:
+            log.debug(
+                "playback arbiter: <%s> queued behind <%s>",
+                player.type.name,
+                owner.type.name,
+            )
+            self._enqueue(player)
+        else:
+            log.debug(
+                "playback arbiter: <%s> dropped, <%s> is playing",
+                player.type.name,
+                owner.type.name,
+            )
+            player.dropped()
+
+    def _enqueue(self, player, position=None):
+        """
+        Queue a playback request.
+
+        :param player: media player (MediaCore).
+        :param position: position to resume from (ms), None to start from the beginning.
+        :return:
+        """
+        seq = next(self.counter)
+        self.pending[player] = seq
+        heapq.heappush(
+            self.queue, [-player.priority, seq, weakref.ref(player), position]
+        )
+
+    def _grant(self, player, position=None):
+        """
+        Give the audio output to player.
+
+        :param player: media player (MediaCore).
+        :param position: position to resume from (ms).
+        :return:
+        """
+        self.owner = player
+        if not player.start(position):
+            log.debug("playback arbiter: <%s> failed to start", player.type.name)
+            self.owner = None
+            player.dropped()
+            self.promote_requested.emit()
+
+    def _promote(self):
+        """
+        Play the next queued request if nothing is playing.
+
+        :return:
+        """
+        while self.owner is None and self.queue:
+            _, seq, ref, position = heapq.heappop(self.queue)
+            player = ref()
+            if player is None or self.pending.get(player) != seq:
+                continue
+            del self.pending[player]
+            log.debug("playback arbiter: <%s> dequeued", player.type.name)
+            self._grant(player, position)
+
+    def _state_changed(self, state):
+        """
+        Release the output when its owner is stopped or finished.
+
+        :param state: new playback state of the sender.
+        :return:
+        """
+        if (
+            state == QMediaPlayer.PlaybackState.StoppedState
+            and self.sender() is self.owner
+        ):
+            self.owner = None
+            self.promote_requested.emit()
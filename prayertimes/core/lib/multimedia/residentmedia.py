@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# --------------------------------------------------------------------------- #
+# QuantumPT - Open Source Portable Islamic prayer times reminder              #
+# --------------------------------------------------------------------------- #
+# Copyright (c) 2016 QuantumPT Developer                                      #
+# --------------------------------------------------------------------------- #
+# This program is free software; you can redistribute it and/or modify it     #
+# under the terms of the GNU General Public License as published by the Free  #
+# Software Foundation; version 3 of the License.                              #
+#                                                                             #
+# This program is distributed in the hope that it will be useful, but WITHOUT #
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or       #
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for    #
+# more details.                                                               #
+# --------------------------------------------------------------------------- #
+
+import os
+import threading
+
+from PyQt6.QtCore import QBuffer, QByteArray, QIODevice, QUrl
+
+from prayertimes.core.common.logapi import log
+from prayertimes.core.lib.multimedia.mediapack import MediaPack
+
+
+class ResidentMedia(object):
+    """
+    Keep a few medias (the selected athan and the dua after athan) in memory, so that playing
+    them does not read the disk. Each play gets its own QBuffer over the shared QByteArray.
+
+    Medias are held by group (the athan player, the dua playlist...), holding a group
+    replaces its medias only. A media is read again only when it is not held yet or when
+    its file changed.
+    """
+
+    __instance__ = None
+
+    def __new__(cls):
+        """
+        Re-implement method __new__ to have a singleton.
+        """
+        if not cls.__instance__:
+            cls.__instance__ = object.__new__(cls)
+            # {group: {absolute path: (QByteArray, url, signature)}}
+            cls.__instance__.groups = {}
+            cls.__instance__._lock = threading.Lock()
+        return cls.__instance__
+
+    def hold(self, paths, group="athan"):
+        """
+        Keep paths in memory and forget the other medias of the group.
+
+        :param paths: absolute paths of the medias.
+        :param group: name of the group of medias.
+        :return:
+        """
+        # Imported here, the catalog imports the media pack which is at the same level
+        from prayertimes.core.lib.multimedia.mediacatalog import MediaCatalog
+
+        held = {
+            path: media
+            for medias in self.groups.values()
+            for path, media in medias.items()
+        }
+        medias = {}
+        for path in paths:
+            if not path:
+                continue
+            relative = MediaCatalog().relative_path(path)
+            pack_entry = MediaPack().entries().get(relative)
+            try:
+                signature = (
+                    pack_entry["digest"]
+                    if pack_entry
+                    else (os.path.getsize(path), os.path.getmtime(path))
+                )
+
+                current = held.get(path)
+                if current is not None and current[2] == signature:
+                    medias[path] = current
+                    continue
+
+                if pack_entry:
+                    data = MediaPack().read(relative)
+                    ext = pack_entry.get("ext", os.path.splitext(relative)[1])
+                    url = QUrl(os.path.splitext(relative)[0] + ext)
+                else:
+                    with open(path, "rb") as media:
+                        data = media.read()
+                    url = QUrl.fromLocalFile(path)
+            except OSError:
+                log.exception("resident media: cannot access %s", path)
+                continue
+            log.debug("resident media: loaded %s (%s bytes)", path, len(data))
+            medias[path] = (QByteArray(data), url, signature)
+
+        with self._lock:
+            self.groups = dict(self.groups, **{group: medias})
+
+    def release(self, group=None):
+        """
+        Forget the medias of a group.
+
+        :param group: name of the group of medias, None for all groups.
+        :return:
+        """
+        with self._lock:
+            self.groups = (
+                {key: value for key, value in self.groups.items() if key != group}
+                if group is not None
+                else {}
+            )
+
+    def device(self, path):
+        """
+        Open a media held in memory.
+
+        :param path: absolute path of the media.
+        :return: (QBuffer, QUrl) or (None, None) if the media is not held.
+        """
+        with self._lock:
+            media = next(
+                (medias[path] for medias in self.groups.values() if path in medias),
+                None,
+            )
+        if media is None:
+            return None, None
+        device = QBuffer()
+        device.setData(media[0])
+        device.open(QIODevice.OpenModeFlag.ReadOnly)
+        return device, media[1]
@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# --------------------------------------------------------------------------- #
+# QuantumPT - Open Source Portable Islamic prayer times reminder              #
+# --------------------------------------------------------------------------- #
+# Copyright (c) 2016 QuantumPT Developer                                      #
+# --------------------------------------------------------------------------- #
+# This program is free software; you can redistribute it and/or modify it     #
+# under the terms of the GNU General Public License as published by the Free  #
+# Software Foundation; version 3 of the License.                              #
+#                                                                             #
+# This program is distributed in the hope that it will be useful, but WITHOUT #
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or       #
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for    #
+# more details.                                                               #
+# --------------------------------------------------------------------------- #
+
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+
+from prayertimes.core.common.logapi import log
+from prayertimes.core.common.settings import Settings
+from prayertimes.core.common.settingsbus import SettingsBus
+
+
+class VolumeControl(QObject):
+    """
+    Volume and mute state of the program. The MediaEngine observes it and applies it to
+    the audio sink for the player holding the output.
+
+    The volume is persisted once the user stops changing it (one write per slider drag),
+    the mute is set by prayer and only applies to the athan of that prayer.
+    """
+
+    __instance__ = None
+    __initialised__ = False
+
+    # Milliseconds without change before the volume is saved
+    persist_delay = 500
+
+    changed = pyqtSignal()
+
+    def __new__(cls):
+        """
+        Re-implement method __new__ to have a singleton.
+        """
+        if not cls.__instance__:
+            cls.__instance__ = super(VolumeControl, cls).__new__(cls)
+        return cls.__instance__
+
+    def __init__(self):
+        if self.__initialised__:
+            return
+        super(VolumeControl, self).__init__()
+        self.__initialised__ = True
+
+        self.volume = Settings().general.volume
+        self.muted_prayers = set()
+
+        self.persist_timer = QTimer(self)
+        self.persist_timer.setSingleShot(True)
+        self.persist_timer.setInterval(self.persist_delay)
+        self.persist_timer.timeout.connect(self.flush)
+
+        SettingsBus().subscribe("general_settings/volume", self.volume_changed)
+
+    def level(self):
+        """
+        Return the linear volume between 0.0 and 1.0.
+
+        :return:
+        """
+        return self.volume / 100
+
+    def volume_changed(self, changes):
+        """
+        Follow the volume set in the settings, unless a change of the user is not saved yet.
+
+        :param changes: {key: value} of the setting.
+        :return:
+        """
+        volume = changes["general_settings/volume"]
+        if not self.persist_timer.isActive() and volume != self.volume:
+            self.volume = volume
+            self.changed.emit()
+
+    def set_volume(self, volume):
+        """
+        Change the volume, it is saved after persist_delay without change.
+
+        :param volume: volume between 0 and 100.
+        :return:
+        """
+        if volume == self.volume:
+            return
+        self.volume = volume
+        self.changed.emit()
+        self.persist_timer.start()
+
+    def flush(self):
+        """
+        Save the volume now if it has not been saved yet.
+
+        :return:
+        """
+        if self.persist_timer.isActive():
+            self.persist_timer.stop()
+        if Settings().general.volume != self.volume:
+            log.debug("volume control: saving volume %s", self.volume)
+            Settings().setValue("general_settings/volume", self.volume)
+
+    def set_muted(self, prayer, muted):
+        """
+        Mute or unmute the athan of a prayer.
+
+        :param prayer: prayer name.
+        :param muted: mute or not.
+        :return:
+        """
+        if muted == (prayer in self.muted_prayers):
+            return
+        if muted:
+            self.muted_prayers.add(prayer)
+        else:
+            self.muted_prayers.discard(prayer)
+        self.changed.emit()
+
+    def is_muted(self, prayer):
+        """
+        :param prayer: prayer name or None for the players that are not athans.
+        :return: True if the prayer is muted.
+        """
+        return prayer in self.muted_prayers
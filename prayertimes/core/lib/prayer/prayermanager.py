@@ -19,20 +19,26 @@
 import datetime
 from functools import partial
 
+from prayertimes.core.common import events
+from prayertimes.core.common.clock import get_clock
 from prayertimes.core.common.logapi import log
-from prayertimes.core.common.registrymixin import UniqueRegistryMixin, Registry
+from prayertimes.core.common.registrymixin import UniqueRegistryMixin
 from prayertimes.core.common.registryproperties import RegistryProperties
 from prayertimes.core.common.settings import Settings
+from prayertimes.core.common.settingsbus import SettingsBus
 
-from prayertimes.core.lib.multimedia.mediamanager import MediaManager
 from prayertimes.core.lib.prayer.prayertimes import PrayTimes
+from prayertimes.core.lib.prayer.profilestore import (
+    ProfileStore,
+    compute_timetable,
+    timetable_inputs,
+)
 from prayertimes.core.lib.prayer.utils import (
     dt_from_string,
     from_12_to_24,
     from_24_to_12,
     get_hour_minute,
 )
-from prayertimes.core.lib.scheduler.schedulermanager import SchedulerManager
 
 from prayertimes.utils.city_infos import City
 from prayertimes.utils.date_timezone import get_utc_offset
@@ -49,17 +55,14 @@ class PrayerManager(UniqueRegistryMixin, RegistryProperties):
     def __init__(self):
         super(PrayerManager, self).__init__(None)
 
-        # Handle the audio part
-        MediaManager()
-
-        # Handle the scheduler part
-        SchedulerManager()
-
         self.city_object = City({})
 
+        # Saved configurations and cache of the timetables
+        self.profile_store = ProfileStore()
+
         # Default configuration is ISNA and 24h format
         self.praytimes = PrayTimes("ISNA", format_time="24h")
-        self.date = datetime.datetime.today()
+        self.date = get_clock().today()
 
         # Structures used for calculation of the prayertimes
         self.praytimes_datetime = {}
@@ -78,16 +81,17 @@ class PrayerManager(UniqueRegistryMixin, RegistryProperties):
             )
 
     def __application_init__(self):
-        Registry().register_function(
-            "update_prayer_scheduler", self.update_prayer_scheduler
-        )
-        Registry().register_function(
-            "update_calculation_method", self.update_calculation
-        )
-        Registry().register_function("update_asr_settings", self.update_asr_settings)
-        Registry().register_function("udpate_time_format", self.udpate_time_format)
-        Registry().register_function("validate_prayertimes", self.valid_prayertime)
-        Registry().register_function("load_city_configuration", self.load_city_settings)
+        events.update_prayer_scheduler.connect(self.update_prayer_scheduler)
+        events.update_calculation_method.connect(self.update_calculation)
+        events.update_asr_settings.connect(self.update_asr_settings)
+        events.update_time_format.connect(self.udpate_time_format)
+        events.validate_prayertimes.connect(self.valid_prayertime)
+        events.load_city_configuration.connect(self.load_city_settings)
+        events.save_profile.connect(self.profile_store.save)
+        events.switch_profile.connect(self.profile_store.switch)
+        events.delete_profile.connect(self.profile_store.delete)
+        SettingsBus().subscribe("calculation", self.calculation_settings_changed)
+        SettingsBus().subscribe("location", self.location_settings_changed)
         if not Settings().allKeys():
             Settings().set_up_default_values()
         self.load_prayer_settings()
@@ -117,13 +121,14 @@ class PrayerManager(UniqueRegistryMixin, RegistryProperties):
             return
 
         # Update calculation method
-        calc = Settings().value("prayer_settings/calculation")
+        calc = Settings().prayer.calculation
         if not calc:
             calc = "ISNA"
             log.error("Big error ! Should never fall here")
         self.praytimes.set_method(calc)
 
         # Adjust settings
+        self.praytimes_settings["asr"] = Settings().prayer.asr_method
         self.praytimes.adjust(self.praytimes_settings)
 
         # Tune offsets
@@ -135,31 +140,40 @@ class PrayerManager(UniqueRegistryMixin, RegistryProperties):
         self.praytimes.tune(self.praytimes_offset)
 
         # Update the date and according UTC offset.
-        self.date = datetime.datetime.today()
+        self.date = get_clock().today()
         self.city_object.utc = get_utc_offset(
             timezone=self.city_object.tz, date=self.date
         )
 
-        # Calculate prayertimes times
-        times = self.praytimes.get_times(
-            date=self.date,
-            coords=(self.city_object.lat, self.city_object.lng),
-            utc_offset=self.city_object.utc,
-        )
+        # Calculate prayertimes times (24h format), or read them from the cache
+        values = {
+            "prayer_settings/calculation": self.praytimes.calc_method,
+            "prayer_settings/asr_method": self.praytimes_settings["asr"],
+            "city/latitude": self.city_object.lat,
+            "city/longitude": self.city_object.lng,
+            "city/timezone": self.city_object.tz,
+        }
+        for p_name in self.prayer_list:
+            key = "prayer_offsets/{}".format(p_name.lower())
+            values[key] = self.praytimes_offset[p_name.lower()]
+        inputs = timetable_inputs(values)
+        times = self.profile_store.timetable(inputs, self.date)
+        if times is None:
+            times = compute_timetable(inputs, self.date)
+            self.profile_store.save_timetable(inputs, self.date, times)
 
         for prayer in self.prayer_list:
-            time_ = str(times[prayer.lower()]).strip()
-            log.debug("{0:<10} | {1:^12}".format(prayer, time_))
-            self.prayer_frame.praytimes[prayer].time = time_
-
             # Update praytimes_datetime dictionnary, always work with 24h format
+            self.praytimes_datetime[prayer] = dt_from_string(times[prayer])
+
+            time_ = times[prayer]
             if self.praytimes.time_format == "12h":
-                self.praytimes_datetime[prayer] = dt_from_string(from_12_to_24(time_))
-            else:
-                self.praytimes_datetime[prayer] = dt_from_string(time_)
+                time_ = from_24_to_12(time_)
+            log.debug("%-10s | %12s", prayer, time_)
+            self.prayer_frame.praytimes[prayer].time = time_
 
         log.debug("=====================")
-        log.debug("Method used : {}".format(self.praytimes.calc_method))
+        log.debug("Method used : %s", self.praytimes.calc_method)
         log.debug("=====================")
 
         self._get_current_prayer()
@@ -175,7 +189,7 @@ class PrayerManager(UniqueRegistryMixin, RegistryProperties):
             # Set default highlights to all prayertimes if error on prayertimes times
             return
 
-        current_time = datetime.datetime.now().time()
+        current_time = get_clock().now().time()
 
         if (
             self.praytimes_datetime["Fajr"]
@@ -222,7 +236,7 @@ class PrayerManager(UniqueRegistryMixin, RegistryProperties):
         :param prayer: prayer that needs its offset to be modifed.
         :return:
         """
-        log.debug("Adjusting offset for prayertimes {}".format(prayer))
+        log.debug("Adjusting offset for prayertimes %s", prayer)
 
         if self.city_object.city == "" or (
             self.city_object.lat == 0 and self.city_object.lng == 0
@@ -237,7 +251,7 @@ class PrayerManager(UniqueRegistryMixin, RegistryProperties):
         Settings().setValue("prayer_offsets/{}".format(prayer), value)
 
         if not isinstance(self.praytimes_datetime[prayer], datetime.time):
-            log.error("Error : {} is not a datetime object".format(prayer))
+            log.error("Error : %s is not a datetime object", prayer)
             return
 
         if value == 0:
@@ -285,12 +299,11 @@ class PrayerManager(UniqueRegistryMixin, RegistryProperties):
             self.prayer_frame.set_offset(p_name, int(value_offset))
 
         # Update settings display
-        calc = Settings().value("prayer_settings/calculation")
-        asr_method = Settings().value("prayer_settings/asr_method")
-        dua_after_athan = Settings().value("prayer_settings/dua_after_athan")
+        calc = Settings().prayer.calculation
+        asr_method = Settings().prayer.asr_method
+        dua_after_athan = Settings().prayer.dua_after_athan
 
-        Registry().execute(
-            "update_display_information",
+        events.update_display_information.emit(
             calc,
             asr_method,
             dua_after_athan,
@@ -308,7 +321,7 @@ class PrayerManager(UniqueRegistryMixin, RegistryProperties):
         :return:
         """
         self.city_object.city_info = Settings().load_city_config()
-        Registry().execute("update_city_information", self.city_object)
+        events.update_city_information.emit(self.city_object)
 
         self.update_prayer_scheduler()
 
@@ -336,7 +349,7 @@ class PrayerManager(UniqueRegistryMixin, RegistryProperties):
                     format_time = from_24_to_12(current_time)
                     self.prayer_frame.praytimes[prayer.title()].time = format_time
             except ValueError:
-                log.exception("Error changing time format for {}".format(prayer))
+                log.exception("Error changing time format for %s", prayer)
                 continue
 
     def reset_offsets(self):
@@ -367,7 +380,7 @@ class PrayerManager(UniqueRegistryMixin, RegistryProperties):
         """
         for prayer in self.prayer_list:
             if not isinstance(self.praytimes_datetime[prayer], datetime.time):
-                log.error("Error : {} is not a datetime object".format(prayer))
+                log.error("Error : %s is not a datetime object", prayer)
                 return False
         return True
 
@@ -401,6 +414,31 @@ class PrayerManager(UniqueRegistryMixin, RegistryProperties):
             prayer="Asr", time=self.praytimes_datetime["Asr"]
         )
 
+    def calculation_settings_changed(self, changes):
+        """
+        Calculate again the prayer times when the calculation method or the asr method
+        changed, only the asr athan is rescheduled for the asr method.
+
+        :param changes: {key: value} of the calculation settings changed.
+        :return:
+        """
+        calc = changes.get("prayer_settings/calculation")
+        asr_method = changes.get("prayer_settings/asr_method")
+        if calc is None:
+            return self.update_asr_settings(asr_method)
+        if asr_method is not None:
+            self.praytimes_settings["asr"] = asr_method
+        self.update_calculation(calc)
+
+    def location_settings_changed(self, changes):
+        """
+        Load the new city once all its settings have been changed.
+
+        :param changes: {key: value} of the city settings changed.
+        :return:
+        """
+        self.load_city_settings()
+
     def update_prayer_scheduler(self):
         """
         Function to be run each day at midnight:
@@ -426,10 +464,10 @@ class PrayerManager(UniqueRegistryMixin, RegistryProperties):
         :return:
         """
         if self.prayer_frame.praytimes[prayer].activated_cb.isChecked():
-            log.debug("Activate prayer: {}".format(prayer))
+            log.debug("Activate prayer: %s", prayer)
             self.media_manager.resume_athan(prayer)
         else:
-            log.debug("Desactivate prayer: {}".format(prayer))
+            log.debug("Desactivate prayer: %s", prayer)
             self.media_manager.pause_athan(prayer)
 
     def mute_control_athan(self, prayer):
@@ -439,8 +477,8 @@ class PrayerManager(UniqueRegistryMixin, RegistryProperties):
         :return:
         """
         if self.prayer_frame.praytimes[prayer].mute_cb.isChecked():
-            log.debug("Mute prayer: {}".format(prayer))
-            self.media_manager.mute()
+            log.debug("Mute prayer: %s", prayer)
+            self.media_manager.mute(prayer)
         else:
-            log.debug("Unmute prayer: {}".format(prayer))
-            self.media_manager.unmute()
+            log.debug("Unmute prayer: %s", prayer)
+            self.media_manager.unmute(prayer)
@@ -243,7 +243,10 @@ class PrayTimes(object):
                 if name_ not in config_["params"] or config_["params"][name_] is None:
                     config_["params"][name_] = value_
 
-        # Initialize settings.
+        # Initialize settings, copied so that several instances (one per location)
+        # do not share the same calculation settings and offsets.
+        self.settings = dict(PrayTimes.settings)
+        self.offset = dict(PrayTimes.offset)
         self.calc_method = method if method in self.methods else "MWL"
         params = self.methods[self.calc_method]["params"]
 
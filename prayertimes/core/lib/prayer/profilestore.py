@@ -0,0 +1,297 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# --------------------------------------------------------------------------- #
+# QuantumPT - Open Source Portable Islamic prayer times reminder              #
+# --------------------------------------------------------------------------- #
+# Copyright (c) 2016 QuantumPT Developer                                      #
+# --------------------------------------------------------------------------- #
+# This program is free software; you can redistribute it and/or modify it     #
+# under the terms of the GNU General Public License as published by the Free  #
+# Software Foundation; version 3 of the License.                              #
+#                                                                             #
+# This program is distributed in the hope that it will be useful, but WITHOUT #
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or       #
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for    #
+# more details.                                                               #
+# --------------------------------------------------------------------------- #
+
+
+import datetime
+import json
+import sqlite3
+import threading
+
+from prayertimes.core.common.clock import get_clock
+from prayertimes.core.common.logapi import log
+from prayertimes.core.common.resourceslocation import ResourcesLocation
+from prayertimes.core.common.settings import Settings
+
+from prayertimes.core.lib.prayer.prayertimes import PrayTimes
+
+from prayertimes.utils.date_timezone import get_utc_offset
+
+
+def timetable_inputs(values):
+    """
+    Everything the prayer times of a day depend on, from the values of the settings.
+
+    :param values: {key: value} of the settings (location, calculation and offsets).
+    :return: dictionary given to compute_timetable.
+    """
+    return dict(
+        method=values["prayer_settings/calculation"],
+        asr=values["prayer_settings/asr_method"],
+        lat=values["city/latitude"],
+        lng=values["city/longitude"],
+        tz=values["city/timezone"],
+        offsets={
+            prayer.lower(): values["prayer_offsets/{}".format(prayer.lower())]
+            for prayer in PrayTimes.prayer_list
+        },
+    )
+
+
+def compute_timetable(inputs, date):
+    """
+    Calculate the prayer times of a day.
+
+    :param inputs: dictionary returned by timetable_inputs.
+    :param date: datetime.date object.
+    :return: a dictionary with {prayer_name : time (hh:mm, 24h format)}.
+    """
+    praytimes = PrayTimes(inputs["method"], format_time="24h")
+    praytimes.adjust({"asr": inputs["asr"]})
+    praytimes.tune(inputs["offsets"])
+    times = praytimes.get_times(
+        date=date,
+        coords=(inputs["lat"], inputs["lng"]),
+        utc_offset=get_utc_offset(timezone=inputs["tz"], date=date),
+    )
+    return {
+        prayer: str(times[prayer.lower()]).strip() for prayer in PrayTimes.prayer_list
+    }
+
+
+class ProfileStore(object):
+    """
+    Saved configurations (city, calculation method, asr method, offsets and athan) of the
+    user, kept in a SQLite database next to the settings.
+
+    Switching to a profile writes its values to the Settings in memory, the SettingsBus then
+    updates the program once. Changes made after switching are kept in a profile only when
+    it is saved again.
+
+    The prayer times of the days are cached by the values they depend on, so that the
+    timetable of a profile is read instead of calculated when switching to it. The
+    timetables of the next precompute_days days of a profile are calculated in the
+    background when it is saved.
+    """
+
+    __instance__ = None
+
+    # Days of timetables calculated in advance for each profile
+    precompute_days = 7
+
+    # Groups of the settings saved in a profile
+    groups = ("location", "calculation", "offsets")
+
+    def __new__(cls):
+        """
+        Re-implement method __new__ to have a singleton.
+        """
+        if not cls.__instance__:
+            cls.__instance__ = object.__new__(cls)
+            cls.__instance__.database_file = (
+                ResourcesLocation().root_dir + "/profiles.db"
+            )
+            cls.__instance__.keys = [
+                key
+                for key, setting in Settings.schema.items()
+                if setting.group in cls.groups
+            ] + ["prayer_settings/athan"]
+            cls.__instance__._connection = None
+            cls.__instance__._lock = threading.RLock()
+        return cls.__instance__
+
+    @property
+    def connection(self):
+        """
+        Connection to the database, created on first use and shared by the threads.
+        """
+        if self._connection is None:
+            connection = sqlite3.connect(self.database_file, check_same_thread=False)
+            connection.executescript("""
+                CREATE TABLE IF NOT EXISTS profiles (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    name TEXT NOT NULL UNIQUE,
+                    config TEXT NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS timetables (
+                    inputs TEXT NOT NULL,
+                    day TEXT NOT NULL,
+                    times TEXT NOT NULL,
+                    PRIMARY KEY (inputs, day)
+                ) WITHOUT ROWID;
+                CREATE INDEX IF NOT EXISTS timetables_day ON timetables (day);
+                """)
+            self._connection = connection
+        return self._connection
+
+    def profiles(self):
+        """
+        :return: list of (profile id, name), sorted by name.
+        """
+        with self._lock:
+            return self.connection.execute(
+                "SELECT id, name FROM profiles ORDER BY name"
+            ).fetchall()
+
+    def save(self, name):
+        """
+        Save the current configuration as the profile name, replacing the profile of the
+        same name. The saved profile becomes the active profile.
+
+        :param name: name of the profile.
+        :return: id of the profile.
+        """
+        config = {key: Settings().value(key) for key in self.keys}
+        with self._lock, self.connection:
+            self.connection.execute(
+                "INSERT INTO profiles (name, config) VALUES (?, ?) "
+                "ON CONFLICT (name) DO UPDATE SET config = excluded.config",
+                (name, json.dumps(config)),
+            )
+            profile_id = self.connection.execute(
+                "SELECT id FROM profiles WHERE name = ?", (name,)
+            ).fetchone()[0]
+        log.debug("profile %s (%s) saved", name, profile_id)
+        Settings().setValue("general_settings/profile", profile_id)
+        self.precompute_async(config)
+        return profile_id
+
+    def delete(self, profile_id):
+        """
+        :param profile_id: id of the profile.
+        :return:
+        """
+        with self._lock, self.connection:
+            self.connection.execute("DELETE FROM profiles WHERE id = ?", (profile_id,))
+        if Settings().general.profile == profile_id:
+            Settings().setValue("general_settings/profile", 0)
+
+    def switch(self, profile_id):
+        """
+        Apply the configuration of a profile. The settings are changed in memory, the
+        program is updated once by the SettingsBus with the cached timetable of the profile.
+
+        :param profile_id: id of the profile.
+        :return: True if the profile exists.
+        """
+        config = self._config(profile_id)
+        if config is None:
+            log.error("Unknown profile %s", profile_id)
+            return False
+        log.debug("switching to profile %s", profile_id)
+        Settings().setValue("general_settings/profile", profile_id)
+        for key, value in config.items():
+            Settings().setValue(key, value)
+        return True
+
+    def profile(self, profile_id):
+        """
+        :param profile_id: id of the profile.
+        :return: (name, {key: value}) of the profile or None.
+        """
+        with self._lock:
+            row = self.connection.execute(
+                "SELECT name, config FROM profiles WHERE id = ?", (profile_id,)
+            ).fetchone()
+        return (row[0], json.loads(row[1])) if row else None
+
+    def timetable(self, inputs, date):
+        """
+        Read a cached timetable.
+
+        :param inputs: dictionary returned by timetable_inputs.
+        :param date: datetime.date or datetime.datetime object.
+        :return: a dictionary with {prayer_name : time (hh:mm)} or None if not cached.
+        """
+        with self._lock:
+            row = self.connection.execute(
+                "SELECT times FROM timetables WHERE inputs = ? AND day = ?",
+                (self._signature(inputs), self._day(date)),
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save_timetable(self, inputs, date, times):
+        """
+        Cache a timetable.
+
+        :param inputs: dictionary returned by timetable_inputs.
+        :param date: datetime.date or datetime.datetime object.
+        :param times: a dictionary with {prayer_name : time (hh:mm)}.
+        :return:
+        """
+        with self._lock, self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO timetables (inputs, day, times) VALUES (?, ?, ?)",
+                (self._signature(inputs), self._day(date), json.dumps(times)),
+            )
+
+    def precompute_async(self, config):
+        """
+        Calculate in the background the timetables of the next days for a configuration.
+
+        :param config: {key: value} of a profile.
+        :return:
+        """
+        threading.Thread(
+            target=self.precompute,
+            args=(config,),
+            name="ProfileTimetables",
+            daemon=True,
+        ).start()
+
+    def precompute(self, config):
+        """
+        Calculate the timetables of the next precompute_days days that are not cached, the
+        timetables of the past days are removed.
+
+        :param config: {key: value} of a profile.
+        :return:
+        """
+        inputs = timetable_inputs(config)
+        today = get_clock().today()
+        for day in range(self.precompute_days):
+            date = today + datetime.timedelta(days=day)
+            if self.timetable(inputs, date) is None:
+                self.save_timetable(inputs, date, compute_timetable(inputs, date))
+
+        with self._lock, self.connection:
+            self.connection.execute(
+                "DELETE FROM timetables WHERE day < ?", (self._day(today),)
+            )
+
+    def _config(self, profile_id):
+        """
+        :param profile_id: id of the profile.
+        :return: {key: value} of the profile or None.
+        """
+        with self._lock:
+            row = self.connection.execute(
+                "SELECT config FROM profiles WHERE id = ?", (profile_id,)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    @staticmethod
+    def _day(date):
+        """
+        :param date: datetime.date or datetime.datetime object.
+        :return: the day as stored in the database (yyyy-mm-dd).
+        """
+        return date.strftime("%Y-%m-%d")
+
+    @staticmethod
+    def _signature(inputs):
+        return json.dumps(inputs, sort_keys=True)
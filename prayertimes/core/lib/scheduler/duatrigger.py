@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# --------------------------------------------------------------------------- #
+# QuantumPT - Open Source Portable Islamic prayer times reminder              #
+# --------------------------------------------------------------------------- #
+# Copyright (c) 2016 QuantumPT Developer                                      #
+# --------------------------------------------------------------------------- #
+# This program is free software; you can redistribute it and/or modify it     #
+# under the terms of the GNU General Public License as published by the Free  #
+# Software Foundation; version 3 of the License.                              #
+#                                                                             #
+# This program is distributed in the hope that it will be useful, but WITHOUT #
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or       #
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for    #
+# more details.                                                               #
+# --------------------------------------------------------------------------- #
+
+import datetime
+
+from prayertimes.core.common.clock import get_clock
+
+from apscheduler.triggers.base import BaseTrigger
+from apscheduler.triggers.interval import IntervalTrigger
+
+
+class DuaIntervalTrigger(BaseTrigger):
+    """
+    Interval trigger for the duas that never fires inside a blackout window around an athan.
+
+    A blackout window starts <before> minutes before an athan and ends <after> minutes after
+    it (time of the athan and of the dua after athan). A firing falling in a window is either:
+        shift : moved to the end of the window, next firings follow the interval from there
+        skip  : dropped, the next firing is the next one of the interval after the window
+    """
+
+    __slots__ = ("interval_trigger", "athan_times", "before", "after", "policy")
+
+    SHIFT = "shift"
+    SKIP = "skip"
+
+    def __init__(self, minutes, athan_times, before=5, after=15, policy=SHIFT):
+        """
+        :param minutes: interval minutes between duas.
+        :param athan_times: callable(moment) returning the aware datetimes of the active athans
+        around the moment (previous, same and next day).
+        :param before: minutes of blackout before each athan.
+        :param after: minutes of blackout after each athan.
+        :param policy: DuaIntervalTrigger.SHIFT or DuaIntervalTrigger.SKIP.
+        """
+        interval = datetime.timedelta(minutes=minutes)
+        # Start from the clock of the program, not from the system time
+        now = get_clock().now(datetime.timezone.utc)
+        self.interval_trigger = IntervalTrigger(
+            minutes=minutes, start_date=now + interval
+        )
+        self.athan_times = athan_times
+        self.before = datetime.timedelta(minutes=before)
+        self.after = datetime.timedelta(minutes=after)
+        self.policy = policy
+
+    def blackout_window(self, moment):
+        """
+        Get the blackout window containing a moment.
+
+        :param moment: aware datetime.
+        :return: tuple (start, end) of the latest ending window or None.
+        """
+        window = None
+        for athan in self.athan_times(moment):
+            start, end = athan - self.before, athan + self.after
+            if start <= moment < end and (window is None or end > window[1]):
+                window = (start, end)
+        return window
+
+    def get_next_fire_time(self, previous_fire_time, now):
+        """Override"""
+        fire_time = self.interval_trigger.get_next_fire_time(previous_fire_time, now)
+
+        # Windows may overlap (e.g. Maghrib and Isha close to each other at high latitudes)
+        while fire_time is not None:
+            window = self.blackout_window(fire_time)
+            if window is None:
+                break
+            if self.policy == self.SKIP:
+                fire_time = self.interval_trigger.get_next_fire_time(None, window[1])
+            else:
+                fire_time = window[1]
+        return fire_time
+
+    def __str__(self):
+        return "dua {} [blackout -{}/+{}, {}]".format(
+            self.interval_trigger, self.before, self.after, self.policy
+        )
+
+    def __repr__(self):
+        return "<{} ({})>".format(self.__class__.__name__, self)
@@ -0,0 +1,326 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# --------------------------------------------------------------------------- #
+# QuantumPT - Open Source Portable Islamic prayer times reminder              #
+# --------------------------------------------------------------------------- #
+# Copyright (c) 2016 QuantumPT Developer                                      #
+# --------------------------------------------------------------------------- #
+# This program is free software; you can redistribute it and/or modify it     #
+# under the terms of the GNU General Public License as published by the Free  #
+# Software Foundation; version 3 of the License.                              #
+#                                                                             #
+# This program is distributed in the hope that it will be useful, but WITHOUT #
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or       #
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for    #
+# more details.                                                               #
+# --------------------------------------------------------------------------- #
+
+import datetime
+import heapq
+import itertools
+import threading
+
+import pytz
+
+from prayertimes.core.common.clock import get_clock
+from prayertimes.core.common.logapi import log
+
+from prayertimes.core.lib.prayer.prayertimes import PrayTimes
+from prayertimes.core.lib.prayer.utils import dt_from_string
+
+from prayertimes.utils.city_infos import City
+from prayertimes.utils.date_timezone import get_utc_offset
+
+from apscheduler.jobstores.base import JobLookupError
+from apscheduler.triggers.date import DateTrigger
+
+
+class Location(object):
+    """
+    Configuration and daily plan of one location (room, site...) driven by the LocationScheduler.
+
+    Each location has its own city, calculation method, asr method, offsets, athan and audio
+    sink (AudioSink) on which its athans are played.
+    """
+
+    # Shourouq is not included because it is not an athan
+    __prayers_list__ = ["Fajr", "Dhuhr", "Asr", "Maghrib", "Isha"]
+
+    def __init__(
+        self,
+        location_id,
+        city_dict,
+        sink,
+        athan=None,
+        method="ISNA",
+        asr_method="Standard",
+        offsets=None,
+    ):
+        """
+        :param location_id: unique identifier of the location.
+        :param city_dict: city dictionary as returned by Settings().load_city_config().
+        :param sink: AudioSink playing the athans of the location.
+        :param athan: path of the athan media of the location.
+        :param method: calculation method.
+        :param asr_method: asr settings method (Standard or Hanafi).
+        :param offsets: dictionary with {prayer_name (lower case) : offset in minutes}.
+        """
+        self.location_id = location_id
+        self.city_object = City(city_dict)
+        self.sink = sink
+        self.athan = athan
+
+        self.praytimes = PrayTimes(method, format_time="24h")
+        self.praytimes.adjust({"asr": asr_method})
+        self.praytimes.tune(offsets or {})
+
+        self.timezone = pytz.timezone(self.city_object.tz)
+
+        # Plan of the day: {prayer_name : aware datetime}
+        self.plan_date = None
+        self.plan = {}
+
+    def get_plan(self, date):
+        """
+        Calculate the athans of the location for a date, the last plan is cached.
+
+        :param date: datetime.date object.
+        :return: a dictionary with {prayer_name : aware datetime}.
+        """
+        if self.plan_date == date:
+            return self.plan
+
+        noon = datetime.datetime.combine(date, datetime.time(12))
+        times = self.praytimes.get_times(
+            date=date,
+            coords=(self.city_object.lat, self.city_object.lng),
+            utc_offset=get_utc_offset(timezone=self.city_object.tz, date=noon),
+        )
+
+        plan = {}
+        for prayer in self.__prayers_list__:
+            time_ = str(times[prayer.lower()]).strip()
+            try:
+                naive = datetime.datetime.combine(date, dt_from_string(time_))
+            except ValueError:
+                log.error(
+                    "location %s: invalid time %s for %s",
+                    self.location_id,
+                    time_,
+                    prayer,
+                )
+                continue
+            plan[prayer] = self.timezone.localize(naive)
+
+        self.plan_date = date
+        self.plan = plan
+        return plan
+
+    def next_athan(self, after):
+        """
+        Get the first athan of the location strictly after a moment.
+
+        :param after: aware datetime.
+        :return: tuple (aware datetime, prayer_name) or None.
+        """
+        local_date = after.astimezone(self.timezone).date()
+        for day in range(2):
+            plan = self.get_plan(local_date + datetime.timedelta(days=day))
+            upcoming = [(dt, prayer) for prayer, dt in plan.items() if dt > after]
+            if upcoming:
+                return min(upcoming)
+        return None
+
+
+class LocationScheduler(object):
+    """
+    Drive the athans of several locations in one process.
+
+    Only the next athan of each location is kept in a single heap shared by all locations,
+    so memory grows with the number of locations and not with their plans. One job of the
+    apscheduler is armed at the time of the earliest athan: athans of all locations falling
+    at the same time are handled by a single wake up, then athan_func is called with each
+    athan and its location, to play it on the sink of the location.
+    """
+
+    def __init__(self, scheduler, jobstore="locations"):
+        """
+        :param scheduler: apscheduler scheduler shared with the other jobs.
+        :param jobstore: jobstore alias of the wake up job.
+        """
+        self.scheduler = scheduler
+        self.jobstore = jobstore
+
+        # Called from the scheduler thread with (Location, prayer name)
+        self.athan_func = None
+
+        self.locations = {}
+        # Heap of (timestamp, sequence, location_id, generation, prayer, datetime)
+        self._heap = []
+        self._generations = {}
+        self._sequence = itertools.count()
+        # (timestamp, job) of the wake up job currently armed
+        self._armed = None
+        self._lock = threading.RLock()
+
+    def add_location(self, location):
+        """
+        Add (or replace) a location and schedule its next athan.
+
+        :param location: Location object.
+        :return:
+        """
+        with self._lock:
+            self.locations[location.location_id] = location
+            self._generations[location.location_id] = (
+                self._generations.get(location.location_id, 0) + 1
+            )
+            self._push_next(location, get_clock().now(pytz.utc))
+            self._arm()
+
+    def remove_location(self, location_id):
+        """
+        Remove a location, its pending athan is dropped when it reaches the top of the heap.
+
+        :param location_id: identifier of the location.
+        :return:
+        """
+        with self._lock:
+            if self.locations.pop(location_id, None):
+                self._generations[location_id] += 1
+                self._arm()
+
+    def set_locations(self, locations):
+        """
+        Replace the locations driven by the scheduler.
+
+        :param locations: list of Location objects.
+        :return:
+        """
+        with self._lock:
+            for location_id in set(self.locations) - {
+                location.location_id for location in locations
+            }:
+                self.remove_location(location_id)
+            for location in locations:
+                self.add_location(location)
+
+    def upcoming(self):
+        """
+        Get the next athan of each location.
+
+        :return: sorted list of tuples (aware datetime, location_id, prayer).
+        """
+        with self._lock:
+            return sorted(
+                (dt, location_id, prayer)
+                for _, _, location_id, generation, prayer, dt in self._heap
+                if self._generations.get(location_id) == generation
+                and location_id in self.locations
+            )
+
+    def _push_next(self, location, after):
+        """
+        Push the next athan of a location in the heap.
+
+        :param location: Location object.
+        :param after: aware datetime.
+        :return:
+        """
+        next_athan = location.next_athan(after)
+        if not next_athan:
+            log.error("location %s: no athan to schedule", location.location_id)
+            return
+        dt, prayer = next_athan
+        heapq.heappush(
+            self._heap,
+            (
+                dt.timestamp(),
+                next(self._sequence),
+                location.location_id,
+                self._generations[location.location_id],
+                prayer,
+                dt,
+            ),
+        )
+
+    def _drop_stale(self):
+        """
+        Remove the entries of removed or replaced locations from the top of the heap.
+
+        :return:
+        """
+        while self._heap:
+            location_id, generation = self._heap[0][2], self._heap[0][3]
+            if (
+                location_id in self.locations
+                and self._generations[location_id] == generation
+            ):
+                return
+            heapq.heappop(self._heap)
+
+    def _arm(self):
+        """
+        Arm the wake up job at the time of the earliest athan.
+
+        A new job id is used for each wake up, so the scheduler removing the job that just
+        ran can not remove the job armed by _fire.
+
+        :return:
+        """
+        self._drop_stale()
+        timestamp = self._heap[0][0] if self._heap else None
+        if self._armed and self._armed[0] == timestamp:
+            return
+
+        if self._armed:
+            try:
+                self._armed[1].remove()
+            except JobLookupError:
+                pass
+            self._armed = None
+
+        if timestamp is None:
+            return
+
+        job = self.scheduler.add_job(
+            self._fire,
+            trigger=DateTrigger(run_date=self._heap[0][5]),
+            jobstore=self.jobstore,
+            misfire_grace_time=None,
+        )
+        self._armed = (timestamp, job)
+
+        if not self.scheduler.running:
+            self.scheduler.start()
+
+    def _fire(self):
+        """
+        Pop every athan due, give each one to athan_func with its location and re-arm.
+
+        :return:
+        """
+        now = get_clock().now(pytz.utc)
+        due = []
+        with self._lock:
+            self._armed = None
+            self._drop_stale()
+            while self._heap and self._heap[0][0] <= now.timestamp():
+                _, _, location_id, _, prayer, dt = heapq.heappop(self._heap)
+                location = self.locations[location_id]
+                due.append((location, prayer))
+                self._push_next(location, dt)
+                self._drop_stale()
+            self._arm()
+
+        for location, prayer in due:
+            log.debug("location %s: athan %s", location.location_id, prayer)
+            if self.athan_func is None:
+                continue
+            try:
+                self.athan_func(location, prayer)
+            except Exception:
+                log.exception(
+                    "location %s: athan failed for %s", location.location_id, prayer
+                )
@@ -16,23 +16,39 @@
 # more details.                                                               #
 # --------------------------------------------------------------------------- #
 
+import datetime
+import threading
+
+from collections import OrderedDict
+
+from prayertimes.core.common import events
+from prayertimes.core.common.clock import get_clock
 from prayertimes.core.common.logapi import log
-from prayertimes.core.common.registry import Registry
 from prayertimes.core.common.registrymixin import UniqueRegistryMixin
 from prayertimes.core.common.registryproperties import RegistryProperties
+from prayertimes.core.common.settings import Settings
+from prayertimes.core.common.settingsbus import SettingsBus
+from prayertimes.core.common.tracing import AthanTracer
 
+from prayertimes.core.lib.scheduler.duatrigger import DuaIntervalTrigger
+from prayertimes.core.lib.scheduler.locationscheduler import LocationScheduler
+
+from apscheduler.events import EVENT_JOB_SUBMITTED
 from apscheduler.jobstores.memory import MemoryJobStore
 from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.schedulers.base import STATE_RUNNING
 from apscheduler.triggers.cron import CronTrigger
-from apscheduler.triggers.interval import IntervalTrigger
+from apscheduler.util import localize
 
 
 class SchedulerManager(UniqueRegistryMixin, RegistryProperties):
     """
     Class to handle all tasks that needs to be scheduled in one scheduler, it includes :
         Athan scheduler in <MemoryJobStore> 'athans'
+        Athan pre-roll in <MemoryJobStore> 'prewarm'
         Dua timer player in <MemoryJobStore> 'dua'
         Calculation prayer in <MemoryJobStore> 'calculation'
+        Multi-location athans in <MemoryJobStore> 'locations'
     """
 
     # Shourouq is not included because it is not an athan
@@ -43,70 +59,212 @@ class SchedulerManager(UniqueRegistryMixin, RegistryProperties):
 
         self.scheduler = BackgroundScheduler()
         self.scheduler.add_jobstore(MemoryJobStore(), alias="athans")
+        self.scheduler.add_jobstore(MemoryJobStore(), alias="prewarm")
         self.scheduler.add_jobstore(MemoryJobStore(), alias="dua")
         self.scheduler.add_jobstore(MemoryJobStore(), alias="calculation")
+        self.scheduler.add_jobstore(MemoryJobStore(), alias="locations")
+
+        # Last plan applied to the athans jobstore: {prayer_name : time (datetime.time)}
+        self.athan_plan = {}
+        self.athan_func = None
+        self.prewarm_func = None
+        self.release_func = None
+        self._plan_lock = threading.RLock()
+
+        self.scheduler.add_listener(self._job_submitted, EVENT_JOB_SUBMITTED)
+
+        # Athans of additional locations, all sharing the same scheduler
+        self.location_scheduler = LocationScheduler(
+            self.scheduler, jobstore="locations"
+        )
 
     def __application_init__(self):
-        Registry().register_function("shutdown_scheduler", self.shutdown)
+        events.shutdown_scheduler.connect(self.shutdown)
+        SettingsBus().subscribe("dua", self.dua_settings_changed)
+        SettingsBus().subscribe(
+            "prayer_settings/athan_prewarm", self.prewarm_settings_changed
+        )
 
     def __application_clean__(self):
         self.shutdown(wait=False)
 
-    def run_athan_scheduler(self, func, prayertimes_dict):
+    def run_athan_scheduler(
+        self, func, prayertimes_dict, prewarm_func=None, release_func=None
+    ):
         """
         Run the background scheduler for athan at a certain hour.
         Use datetime parameter.
 
         :param func: trigger functions.
         :param prayertimes_dict: a dictionary with {prayer_name : time (datetime object)}.
+        :param prewarm_func: function called 'prayer_settings/athan_prewarm' seconds before each athan.
+        :param release_func: function called when the pre-roll of an athan is moved or removed.
         :return:
         """
+        self.athan_func = func
+        self.prewarm_func = prewarm_func
+        self.release_func = release_func
+        self.apply_plan(prayertimes_dict)
 
-        for prayer, time in prayertimes_dict.items():
-            if prayer == "Shourouq":
-                continue
-            if not self.scheduler.get_job(prayer):
-                log.debug(
-                    "Adding job ID : {} in scheduler at time {}".format(prayer, time)
-                )
-                kwargs = dict(prayer=prayer)
-                trigger = CronTrigger(hour=time.hour, minute=time.minute)
-                self.scheduler.add_job(
-                    func, kwargs=kwargs, jobstore="athans", trigger=trigger, id=prayer
-                )
+    def apply_plan(self, plan):
+        """
+        Replace every athan trigger of the plan in one critical section.
+
+        The paused/active state of each athan is kept, prayers whose time did not change
+        are left untouched and the scheduler thread is woken up only once for the whole plan.
+
+        :param plan: a dictionary with {prayer_name : time (datetime object)}.
+        :return: a dictionary with {prayer_name : (old time, new time)} for changed athans only,
+        old time is None for athans added to the scheduler.
+        """
+        diff = OrderedDict()
+
+        with self._plan_lock:
+            changes = []
+            for prayer, time in plan.items():
+                if prayer not in self.__prayers_list__:
+                    continue
+                try:
+                    new_time = datetime.time(int(time.hour), int(time.minute))
+                except AttributeError:
+                    log.error("Could not reschedule athan alarm for %s", prayer)
+                    continue
+                old_time = self.athan_plan.get(prayer)
+                if old_time != new_time or not self.scheduler.get_job(prayer, "athans"):
+                    changes.append((prayer, old_time, new_time))
+
+            if changes:
+                # Pausing the scheduler defers the wake up of each modification to resume()
+                pause_scheduler = self.scheduler.state == STATE_RUNNING
+                if pause_scheduler:
+                    self.scheduler.pause()
+                try:
+                    for prayer, old_time, new_time in changes:
+                        if self._apply_athan(prayer, new_time):
+                            self.athan_plan[prayer] = new_time
+                            diff[prayer] = (old_time, new_time)
+                    self._update_dua()
+                finally:
+                    if pause_scheduler:
+                        self.scheduler.resume()
 
         if not self.scheduler.running:
             self.scheduler.start()
 
-    def reschedule_athan(self, prayer, time):
+        for prayer, (old_time, new_time) in diff.items():
+            log.debug("Athan plan for %s : %s -> %s", prayer, old_time, new_time)
+
+        return diff
+
+    def _apply_athan(self, prayer, time):
         """
-        Reschedule prayer time athan according to new prayer times.
+        Add or modify the athan job of prayer, keeping the state (paused or active) of the job.
+        Must be called from apply_plan.
 
         :param prayer: prayer name.
         :param time: a datetime.time object corresponding to new scheduled time for prayer.
+        :return: True if the job has been added or modified.
+        """
+        trigger = CronTrigger(hour=time.hour, minute=time.minute)
+        job = self.scheduler.get_job(prayer, "athans")
+
+        if not job:
+            if not self.athan_func:
+                log.error("Could not add athan alarm for %s, no function", prayer)
+                return False
+            log.debug("Adding job ID : %s in scheduler at time %s", prayer, time)
+            self.scheduler.add_job(
+                self.athan_func,
+                kwargs=dict(prayer=prayer),
+                jobstore="athans",
+                trigger=trigger,
+                id=prayer,
+            )
+            self._apply_prewarm(prayer, time, active=True)
+            return True
+
+        # Keep state of the job after rescheduling it, a paused job has no next run time
+        if job.next_run_time:
+            now = get_clock().now(trigger.timezone)
+            next_run_time = trigger.get_next_fire_time(None, now)
+        else:
+            next_run_time = None
+
+        self.scheduler.modify_job(
+            prayer, "athans", trigger=trigger, next_run_time=next_run_time
+        )
+        self._apply_prewarm(prayer, time, active=next_run_time is not None)
+        return True
+
+    def _apply_prewarm(self, prayer, time, active):
+        """
+        Add or replace the pre-roll job of an athan, run some seconds before the athan to load
+        the athan media in advance. The media already loaded for the previous pre-roll is
+        released. Must be called from apply_plan.
+
+        :param prayer: prayer name.
+        :param time: a datetime.time object corresponding to the scheduled time of the athan.
+        :param active: False if the athan is paused, the pre-roll job is then paused too.
         :return:
         """
-        if prayer == "Shourouq":
+        job_id = "{}_prewarm".format(prayer)
+        seconds = Settings().prayer.athan_prewarm
+
+        if self.scheduler.get_job(job_id, "prewarm") and self.release_func:
+            self.release_func(prayer)
+
+        if not self.prewarm_func or seconds <= 0:
+            if self.scheduler.get_job(job_id, "prewarm"):
+                self.scheduler.remove_job(job_id, "prewarm")
             return
-        try:
-            h = int(time.hour)
-            m = int(time.minute)
-            trigger = CronTrigger(hour=h, minute=m)
-            # Keep state of the scheduler after rescheduling a job
-            if self.scheduler.get_job(prayer).next_run_time:
-                self.scheduler.reschedule_job(
-                    job_id=prayer, trigger=trigger, jobstore="athans"
-                )
-            else:
-                self.scheduler.reschedule_job(
-                    job_id=prayer, trigger=trigger, jobstore="athans"
-                )
-                self.scheduler.pause_job(prayer)
-        except AttributeError:
-            log.error("Could not rescheduler athan alarm for {}".format(prayer))
 
-        if not self.scheduler.running:
-            self.scheduler.start()
+        prewarm_time = (
+            datetime.datetime.combine(get_clock().now().date(), time)
+            - datetime.timedelta(seconds=seconds)
+        ).time()
+        trigger = CronTrigger(
+            hour=prewarm_time.hour,
+            minute=prewarm_time.minute,
+            second=prewarm_time.second,
+        )
+        if active:
+            now = get_clock().now(trigger.timezone)
+            next_run_time = trigger.get_next_fire_time(None, now)
+        else:
+            next_run_time = None
+
+        self.scheduler.add_job(
+            self.prewarm_func,
+            kwargs=dict(prayer=prayer),
+            jobstore="prewarm",
+            trigger=trigger,
+            id=job_id,
+            next_run_time=next_run_time,
+            replace_existing=True,
+        )
+
+    def _update_dua(self):
+        """
+        Move the next dua out of the blackout windows of the new athan times.
+        Must be called from apply_plan.
+
+        :return:
+        """
+        job = self.scheduler.get_job("Dua", "dua")
+        if job and job.next_run_time:
+            self.scheduler.modify_job(
+                "Dua", "dua", next_run_time=self._next_dua_time(job.trigger)
+            )
+
+    def reschedule_athan(self, prayer, time):
+        """
+        Reschedule prayer time athan according to new prayer times.
+
+        :param prayer: prayer name.
+        :param time: a datetime.time object corresponding to new scheduled time for prayer.
+        :return:
+        """
+        return self.apply_plan({prayer: time})
 
     def reschedule_all_athans(self, prayer_dict):
         """
@@ -115,13 +273,36 @@ class SchedulerManager(UniqueRegistryMixin, RegistryProperties):
         :param prayer_dict: a dictionary with {prayer_name : time (datetime object)}.
         :return:
         """
-        for p_name, p_time in prayer_dict.items():
-            if p_name in self.__prayers_list__:
-                self.reschedule_athan(p_name, p_time)
+        return self.apply_plan(prayer_dict)
+
+    @staticmethod
+    def _job_submitted(event):
+        """
+        Start the timing trace of an athan when its job is submitted by the scheduler.
+
+        :param event: apscheduler JobSubmissionEvent.
+        :return:
+        """
+        if event.jobstore == "athans":
+            AthanTracer().begin(event.job_id, event.scheduled_run_times[-1])
+
+    def run_location_scheduler(self, func, locations):
+        """
+        Drive the athans of the additional locations (multi-location mode), the locations
+        driven before are replaced.
+
+        :param func: function called with (Location, prayer name) when an athan is due.
+        :param locations: list of Location objects, with their own configuration and audio sink.
+        :return:
+        """
+        self.location_scheduler.athan_func = func
+        self.location_scheduler.set_locations(locations)
 
     def run_dua_scheduler(self, func, minutes):
         """
         Run the background scheduler for duas every <minutes> minutes.
+        Duas never fire inside the blackout windows around active athans, and firings
+        missed while the computer was suspended are coalesced in one.
 
         :param func: trigger functions.
         :param minutes: interval minutes between duas.
@@ -129,8 +310,17 @@ class SchedulerManager(UniqueRegistryMixin, RegistryProperties):
         """
 
         if not self.scheduler.get_job("Dua"):
-            trigger = IntervalTrigger(minutes=minutes)
-            self.scheduler.add_job(func, trigger=trigger, id="Dua", jobstore="dua")
+            trigger = self._dua_trigger(minutes)
+            self.scheduler.add_job(
+                self._run_dua,
+                args=(func, trigger),
+                trigger=trigger,
+                id="Dua",
+                jobstore="dua",
+                next_run_time=self._next_dua_time(trigger),
+                coalesce=True,
+                misfire_grace_time=minutes * 60,
+            )
 
         if not self.scheduler.running:
             self.scheduler.start()
@@ -142,15 +332,123 @@ class SchedulerManager(UniqueRegistryMixin, RegistryProperties):
         :param minutes: interval minutes between duas.
         :return:
         """
-        try:
-            trigger = IntervalTrigger(minutes=minutes)
-            self.scheduler.reschedule_job(job_id="Dua", trigger=trigger, jobstore="dua")
-        except AttributeError:
+        job = self.scheduler.get_job("Dua", "dua")
+        if not job:
             log.error("Could not rescheduler dua")
+            return
+
+        trigger = self._dua_trigger(minutes)
+        self.scheduler.modify_job(
+            "Dua",
+            "dua",
+            args=(job.args[0], trigger),
+            trigger=trigger,
+            next_run_time=self._next_dua_time(trigger),
+            misfire_grace_time=minutes * 60,
+        )
 
         if not self.scheduler.running:
             self.scheduler.start()
 
+    def dua_settings_changed(self, changes):
+        """
+        Apply the blackout settings to the dua job.
+
+        :param changes: {key: value} of the dua settings changed.
+        :return:
+        """
+        job = self.scheduler.get_job("Dua", "dua")
+        if not job:
+            return
+        minutes = int(job.trigger.interval_trigger.interval.total_seconds() // 60)
+        if job.next_run_time:
+            self.reschedule_dua(minutes)
+        else:
+            # Paused dua job, keep it paused
+            trigger = self._dua_trigger(minutes)
+            self.scheduler.modify_job(
+                "Dua", "dua", args=(job.args[0], trigger), trigger=trigger
+            )
+
+    def prewarm_settings_changed(self, changes):
+        """
+        Move the pre-roll jobs of the athans according to the new pre-roll delay.
+
+        :param changes: {key: value} of the setting.
+        :return:
+        """
+        with self._plan_lock:
+            for prayer, time in self.athan_plan.items():
+                job = self.scheduler.get_job(prayer, "athans")
+                self._apply_prewarm(
+                    prayer,
+                    time,
+                    active=job is not None and job.next_run_time is not None,
+                )
+
+    def _dua_trigger(self, minutes):
+        """
+        Create the dua trigger according to the blackout settings.
+
+        :param minutes: interval minutes between duas.
+        :return: DuaIntervalTrigger
+        """
+        return DuaIntervalTrigger(
+            minutes,
+            athan_times=self.athan_times,
+            before=Settings().prayer.dua_blackout_before,
+            after=Settings().prayer.dua_blackout_after,
+            policy=Settings().prayer.dua_blackout_policy,
+        )
+
+    def _next_dua_time(self, trigger):
+        """
+        Next firing of the dua trigger from now.
+
+        :param trigger: DuaIntervalTrigger
+        :return:
+        """
+        return trigger.get_next_fire_time(
+            None, get_clock().now(self.scheduler.timezone)
+        )
+
+    @staticmethod
+    def _run_dua(func, trigger):
+        """
+        Run the dua unless a late run (e.g. after a suspend) falls inside a blackout window.
+
+        :param func: trigger functions.
+        :param trigger: DuaIntervalTrigger of the dua job.
+        :return:
+        """
+        now = get_clock().now(datetime.timezone.utc)
+        if trigger.blackout_window(now):
+            log.debug("Dua skipped, too close to an athan")
+            return
+        return func()
+
+    def athan_times(self, moment):
+        """
+        Get the athans scheduled the day before, the day and the day after a moment.
+        Paused athans are not included.
+
+        :param moment: aware datetime.
+        :return: list of aware datetimes.
+        """
+        timezone = self.scheduler.timezone
+        day = moment.astimezone(timezone).date()
+        athan_times = []
+        for prayer, time in list(self.athan_plan.items()):
+            job = self.scheduler.get_job(prayer, "athans")
+            if not job or not job.next_run_time:
+                continue
+            for delta in (-1, 0, 1):
+                athan = datetime.datetime.combine(
+                    day + datetime.timedelta(days=delta), time
+                )
+                athan_times.append(localize(athan, timezone))
+        return athan_times
+
     def stop_dua_scheduler(self):
         """
         Stop the current dua playing and shutdown scheduler.
@@ -168,7 +466,7 @@ class SchedulerManager(UniqueRegistryMixin, RegistryProperties):
         """
 
         if not self.scheduler.get_job("Calculation"):
-            log.debug("Adding job ID : {} in scheduler".format("Calculation"))
+            log.debug("Adding job ID : %s in scheduler", "Calculation")
             trigger = CronTrigger(hour="00", minute="00", second="01")
             self.scheduler.add_job(
                 func, trigger=trigger, id="Calculation", jobstore="calculation"
@@ -203,6 +501,7 @@ class SchedulerManager(UniqueRegistryMixin, RegistryProperties):
         :return:
         """
         self.scheduler.resume_job(job_id, jobstore=jobstore)
+        self._toggle_prewarm(job_id, jobstore, resume=True)
 
     def pause_job(self, job_id, jobstore=None):
         """
@@ -213,3 +512,23 @@ class SchedulerManager(UniqueRegistryMixin, RegistryProperties):
         :return:
         """
         self.scheduler.pause_job(job_id, jobstore=jobstore)
+        self._toggle_prewarm(job_id, jobstore, resume=False)
+
+    def _toggle_prewarm(self, job_id, jobstore, resume):
+        """
+        Keep the pre-roll job of an athan in the same state as the athan job.
+
+        :param job_id: id of the job paused or resumed.
+        :param jobstore: jobstore where job id is.
+        :param resume: True to resume the pre-roll, False to pause it.
+        :return:
+        """
+        if jobstore not in (None, "athans") or job_id not in self.__prayers_list__:
+            return
+        prewarm_id = "{}_prewarm".format(job_id)
+        if not self.scheduler.get_job(prewarm_id, "prewarm"):
+            return
+        if resume:
+            self.scheduler.resume_job(prewarm_id, jobstore="prewarm")
+        else:
+            self.scheduler.pause_job(prewarm_id, jobstore="prewarm")
@@ -0,0 +1,152 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# --------------------------------------------------------------------------- #
+# QuantumPT - Open Source Portable Islamic prayer times reminder              #
+# --------------------------------------------------------------------------- #
+# Copyright (c) 2016 QuantumPT Developer                                      #
+# --------------------------------------------------------------------------- #
+# This program is free software; you can redistribute it and/or modify it     #
+# under the terms of the GNU General Public License as published by the Free  #
+# Software Foundation; version 3 of the License.                              #
+#                                                                             #
+# This program is distributed in the hope that it will be useful, but WITHOUT #
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or       #
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for    #
+# more details.                                                               #
+# --------------------------------------------------------------------------- #
+
+import datetime
+
+from prayertimes.core.common.clock import SimulatedClock, get_clock, set_clock
+from prayertimes.core.common.logapi import log
+
+from apscheduler.schedulers.base import STATE_RUNNING, STATE_STOPPED
+
+
+class VirtualTimeDriver(object):
+    """
+    Run the jobs of an apscheduler scheduler in virtual time.
+
+    The scheduler is kept paused so its thread never runs a job; the driver moves a
+    SimulatedClock from one fire time to the next and runs each job synchronously.
+    A full year of athans, daily calculations and dua intervals runs in seconds:
+
+        driver = VirtualTimeDriver(scheduler_manager.scheduler)
+        driver.run_until(driver.clock.now() + datetime.timedelta(days=365))
+        driver.stop()
+
+    All the code relying on get_clock() (prayer manager, scheduler manager, timezones...)
+    sees the virtual time while the driver is installed.
+    """
+
+    def __init__(self, scheduler, clock=None):
+        """
+        :param scheduler: apscheduler scheduler to be driven.
+        :param clock: SimulatedClock to use, a new one starting at the current time if None.
+        """
+        self.scheduler = scheduler
+        self.clock = clock or SimulatedClock()
+        self.runs = 0
+
+        # {job_id : (trigger, next fire time)} computed in virtual time
+        self._next_run_times = {}
+
+        self._previous_clock = get_clock()
+        set_clock(self.clock)
+
+        if self.scheduler.state == STATE_STOPPED:
+            self.scheduler.start(paused=True)
+        elif self.scheduler.state == STATE_RUNNING:
+            self.scheduler.pause()
+
+    def stop(self):
+        """
+        Restore the previous clock.
+
+        :return:
+        """
+        set_clock(self._previous_clock)
+
+    def _next_run_time(self, job, now):
+        """
+        Get the next virtual fire time of a job.
+
+        :param job: apscheduler job.
+        :param now: current virtual time (aware datetime).
+        :return: aware datetime or None if the job is paused or finished.
+        """
+        # A paused job has no next run time
+        if job.next_run_time is None:
+            self._next_run_times.pop(job.id, None)
+            return None
+        cached = self._next_run_times.get(job.id)
+        if cached is None or cached[0] is not job.trigger:
+            # New job or new trigger (rescheduled job)
+            cached = (job.trigger, job.trigger.get_next_fire_time(None, now))
+            self._next_run_times[job.id] = cached
+        return cached[1]
+
+    def step(self, until):
+        """
+        Run the earliest job due before a moment.
+
+        :param until: aware datetime.
+        :return: True if a job has been run.
+        """
+        now = self.clock.now(self.scheduler.timezone)
+        due = None
+        for job in self.scheduler.get_jobs():
+            run_time = self._next_run_time(job, now)
+            if run_time is not None and (due is None or run_time < due[0]):
+                due = (run_time, job)
+
+        if due is None or due[0] > until:
+            return False
+
+        run_time, job = due
+        if run_time > now:
+            self.clock.set(run_time)
+
+        try:
+            job.func(*job.args, **job.kwargs)
+        except Exception:
+            log.exception("virtual time: job %s failed", job.id)
+        self.runs += 1
+
+        # The job may have been rescheduled or removed while running
+        cached = self._next_run_times.get(job.id)
+        if cached and cached[0] is job.trigger:
+            next_run_time = job.trigger.get_next_fire_time(run_time, run_time)
+            if next_run_time is None:
+                self._next_run_times.pop(job.id)
+                if self.scheduler.get_job(job.id):
+                    self.scheduler.remove_job(job.id)
+            else:
+                self._next_run_times[job.id] = (job.trigger, next_run_time)
+        return True
+
+    def run_until(self, until):
+        """
+        Run all jobs due before a moment, then move the clock to this moment.
+
+        :param until: datetime, naive datetimes are local times.
+        :return: number of jobs run.
+        """
+        if until.tzinfo is None:
+            until = until.astimezone()
+        runs = self.runs
+        while self.step(until):
+            pass
+        if until > self.clock.now(self.scheduler.timezone):
+            self.clock.set(until)
+        return self.runs - runs
+
+    def advance(self, delta):
+        """
+        Run all jobs due in the next delta.
+
+        :param delta: datetime.timedelta.
+        :return: number of jobs run.
+        """
+        return self.run_until(self.clock.now(datetime.timezone.utc) + delta)
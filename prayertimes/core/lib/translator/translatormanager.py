@@ -46,12 +46,10 @@ class LanguageManager(object):
         for _language in languages:
             self.translator = QTranslator()
             if self.translator.load(":/i18n/{}.qm".format(_language)):
-                log.debug(
-                    "Translation {} has been correclty initialized".format(_language)
-                )
+                log.debug("Translation %s has been correclty initialized", _language)
             if _language == self.current_language:
                 QtWidgets.QApplication.instance().installTranslator(self.translator)
-                log.info("Translation {} has been correclty loaded".format(_language))
+                log.info("Translation %s has been correclty loaded", _language)
 
             self.translators[_language] = self.translator
 
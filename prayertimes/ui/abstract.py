@@ -20,9 +20,8 @@ from PyQt6 import QtWidgets
 from PyQt6.QtCore import Qt, QEvent, pyqtSignal, QThread
 from PyQt6.QtGui import QPixmap, QColor, QFont
 
-from prayertimes.core.common import translate
+from prayertimes.core.common import events, translate
 from prayertimes.core.common.logapi import log
-from prayertimes.core.common.registry import Registry
 from prayertimes.core.common.registrymixin import RegistryMixin, UniqueRegistryMixin
 from prayertimes.core.common.registryproperties import RegistryProperties
 from prayertimes.core.common.settings import Settings
@@ -103,19 +102,19 @@ class AbstractDialog(RegistryProperties, RegistryMixin, QtWidgets.QDialog):
         self.left_click = False
 
     def reject(self):
-        Registry().execute("desactivate_overlay")
-        Registry().execute("desactivate_global_blur")
+        events.desactivate_overlay.emit()
+        events.desactivate_global_blur.emit()
         return super(AbstractDialog, self).reject()
 
     def accept(self):
-        Registry().execute("desactivate_overlay")
-        Registry().execute("desactivate_global_blur")
+        events.desactivate_overlay.emit()
+        events.desactivate_global_blur.emit()
         return super(AbstractDialog, self).accept()
 
     def showEvent(self, event):
         # current_widget = QtWidgets.QApplication.instance().activeWindow()
-        Registry().execute("activate_overlay")
-        Registry().execute("activate_global_blur")
+        events.activate_overlay.emit()
+        events.activate_global_blur.emit()
         # Center the dialog regarding its parent
         self.move(
             self.global_frame.frameGeometry().topLeft()
@@ -207,8 +206,8 @@ class Dialog(AbstractDialog):
         self.titlebar = AbstractTitleBar(self, title=titlebar_name, icon=titlebar_icon)
         self.dialog_frame = QtWidgets.QFrame(self)
 
-        Registry().register_function("activate_dialog_blur", self.activate_blur)
-        Registry().register_function("desactivate_dialog_blur", self.desactivate_blur)
+        events.activate_dialog_blur.connect(self.activate_blur)
+        events.desactivate_dialog_blur.connect(self.desactivate_blur)
 
         self.setup_ui()
 
@@ -318,9 +317,9 @@ class GlobalTitlebar(AbstractTitleBar):
         :return:
         """
         if self.a:
-            Registry().execute("expand_main_frame_selector")
+            events.expand_main_frame_selector.emit()
         else:
-            Registry().execute("hide_main_frame_selector")
+            events.hide_main_frame_selector.emit()
         self.a = not self.a
 
     @staticmethod
@@ -330,13 +329,13 @@ class GlobalTitlebar(AbstractTitleBar):
 
         :return:
         """
-        if Settings().value("general_settings/close") == 0:
-            Registry().execute("hide_app_in_systray")
-        elif Settings().value("general_settings/close") == 1:
-            Registry().execute("close_application")
+        if Settings().general.close == 0:
+            events.hide_app_in_systray.emit()
+        elif Settings().general.close == 1:
+            events.close_application.emit()
         else:
             log.warning("Not defined, by default, use hide in system tray")
-            Registry().execute("hide_app_in_systray")
+            events.hide_app_in_systray.emit()
 
 
 class ControlOption(UniqueRegistryMixin, RegistryProperties, QtWidgets.QFrame):
@@ -797,12 +796,12 @@ class NotificationFrame(RegistryProperties, OpacityAnimation, QtWidgets.QDialog)
     def showEvent(self, event):
         # active_widget = QtWidgets.QApplication.instance().activeWindow()
         # if active_widget.metaObject().className() == 'GlobalFrame':
-        #     Registry().execute("activate_overlay")
-        #     Registry().execute("activate_global_blur")
+        #     events.activate_overlay.emit()
+        #     events.activate_global_blur.emit()
         # else:
-        #     Registry().execute("activate_dialog_blur")
-        # Registry().execute("activate_overlay")
-        # Registry().execute("activate_global_blur")
+        #     events.activate_dialog_blur.emit()
+        # events.activate_overlay.emit()
+        # events.activate_global_blur.emit()
 
         # Raise window if minimized or in SysTray
         if self.global_frame.isHidden():
@@ -845,12 +844,12 @@ class NotificationFrame(RegistryProperties, OpacityAnimation, QtWidgets.QDialog)
         """
         # active_widget = QtWidgets.QApplication.instance().activeWindow()
         # if active_widget.metaObject().className() == 'GlobalFrame':
-        #     Registry().execute("desactivate_overlay")
-        #     Registry().execute("desactivate_global_blur")
+        #     events.desactivate_overlay.emit()
+        #     events.desactivate_global_blur.emit()
         # else:
-        #     Registry().execute("desactivate_dialog_blur")
-        # Registry().execute("desactivate_overlay")
-        # Registry().execute("desactivate_global_blur")
+        #     events.desactivate_dialog_blur.emit()
+        # events.desactivate_overlay.emit()
+        # events.desactivate_global_blur.emit()
         pass
 
 
@@ -861,11 +860,11 @@ class WelcomeNotification(NotificationFrame):
         self.setObjectName(self.__class__.__bases__[0].__name__)
 
     def showEvent(self, event):
-        Registry().execute("activate_overlay")
-        Registry().execute("activate_global_blur")
+        events.activate_overlay.emit()
+        events.activate_global_blur.emit()
         return super(WelcomeNotification, self).showEvent(event)
 
     def fade_out_over(self):
-        Registry().execute("desactivate_overlay")
-        Registry().execute("desactivate_global_blur")
+        events.desactivate_overlay.emit()
+        events.desactivate_global_blur.emit()
         return super(WelcomeNotification, self).fade_out_over()
@@ -23,6 +23,9 @@ from PyQt6.QtGui import QPixmap
 from prayertimes.core.common import translate
 from prayertimes.core.common.logapi import log
 from prayertimes.core.common.settings import Settings
+from prayertimes.core.common.settingsbus import SettingsBus
+from prayertimes.core.lib.multimedia.duaplaylist import DuaPlaylist
+from prayertimes.core.lib.multimedia.mediacatalog import MediaCatalog
 
 from prayertimes.ui.abstract import ControlOption
 
@@ -35,14 +38,18 @@ class ControlVolume(ControlOption):
             parent=parent,
         )
 
-        self.vol_info = QtWidgets.QLabel("{} %".format(self.sld.value()))
+        self.vol_info = QtWidgets.QLabel()
         self.vol_info.setAlignment(
             Qt.AlignmentFlag.AlignVCenter | Qt.AlignmentFlag.AlignCenter
         )
         self.vol_info.setFixedWidth(40)
 
+        # The players read the saved volume themselves, the media manager is only
+        # needed when the volume changes
+        self.sld.setValue(Settings().general.volume)
+        self._show_volume()
         self.sld.valueChanged.connect(self._vol_control)
-        self.sld.setValue(Settings().value("general_settings/volume"))
+        SettingsBus().subscribe("general_settings/volume", self.volume_changed)
 
         self.layout.addWidget(self.vol_info)
 
@@ -54,6 +61,17 @@ class ControlVolume(ControlOption):
         """
         Control volume of every player using MediaManager.
 
+        :return:
+        """
+        self._show_volume()
+        # Control athan, dua, player test and dua controller sound, the volume is saved
+        # once the slider stops moving
+        self.media_manager.set_volume(self.sld.value())
+
+    def _show_volume(self):
+        """
+        Show the volume of the slider.
+
         :return:
         """
         if self.sld.value() == 0:
@@ -61,9 +79,16 @@ class ControlVolume(ControlOption):
         else:
             self.ctrl_icon.setPixmap(QPixmap(":/icons/controloption_volume.png"))
         self.vol_info.setText("{} %".format(self.sld.value()))
-        # Control athan, dua, player test and dua controller sound
-        self.media_manager.set_volume(self.sld.value())
-        Settings().setValue("general_settings/volume", self.sld.value())
+
+    def volume_changed(self, changes):
+        """
+        Show the volume set.
+
+        :param changes: {key: value} of the setting.
+        :return:
+        """
+        if not self.sld.isSliderDown():
+            self.sld.setValue(changes["general_settings/volume"])
 
 
 class ControlOpacity(ControlOption):
@@ -121,10 +146,27 @@ class ControlDua(ControlOption):
         self.layout.addWidget(self.spinbox_dua_timing)
         self.layout.addWidget(QtWidgets.QLabel("min.", self))
 
+        DuaPlaylist().next_changed.connect(self._update_next_dua)
+
     def showEvent(self, *args, **kwargs):
         self.move(self.parent().dua_tb.x(), self.parent().dua_tb.y() - 60)
+        self._update_next_dua(DuaPlaylist().next_up() or "")
         super(ControlDua, self).showEvent(*args)
 
+    def _update_next_dua(self, path):
+        """
+        Show the next dua of the playlist.
+
+        :param path: absolute path of the next dua.
+        :return:
+        """
+        entry = MediaCatalog().entry(path) if path else None
+        self.dua_label.setToolTip(
+            "{} {}".format(translate("Application", "Next dua:"), entry.name)
+            if entry
+            else ""
+        )
+
     def _control_dua(self):
         """
         Control the state of dua by running/stopping scheduler.
@@ -18,6 +18,7 @@
 
 from PyQt6 import QtWidgets
 
+from prayertimes.core.common import events
 from prayertimes.core.common.logapi import log
 from prayertimes.core.common.registry import Registry
 from prayertimes.core.common.settings import Settings
@@ -63,10 +64,10 @@ class GlobalFrame(AbstractGlobalFrame):
         FloatingNotificationArea(self)
         SysTrayPanel()
 
-        Registry().register_function("close_application", self.close_application)
-        Registry().register_function("hide_app_in_systray", self.hide_in_systray)
-        Registry().register_function("activate_global_blur", self.activate_blur)
-        Registry().register_function("desactivate_global_blur", self.desactivate_blur)
+        events.close_application.connect(self.close_application)
+        events.hide_app_in_systray.connect(self.hide_in_systray)
+        events.activate_global_blur.connect(self.activate_blur)
+        events.desactivate_global_blur.connect(self.desactivate_blur)
 
     def __application_init__(self):
         pass
@@ -82,7 +83,7 @@ class GlobalFrame(AbstractGlobalFrame):
 
         :return:
         """
-        Registry().execute("__application_clean__")
+        events.application_clean.emit()
         QtWidgets.QApplication.instance().quit()
 
     def hide_in_systray(self):
@@ -94,8 +95,7 @@ class GlobalFrame(AbstractGlobalFrame):
         # self.fade_out()
         self.hide()  # hide() function calls close() funtion
         log.debug("Running in background...")
-        Registry().execute(
-            "show_floating_notification",
+        events.show_floating_notification.emit(
             "QuantumPrayerTimes program is still running in background",
             3000,
         )
@@ -119,11 +119,11 @@ class GlobalFrame(AbstractGlobalFrame):
         :param event:
         :return:
         """
-        if Settings().value("general_settings/close") == 1:
+        if Settings().general.close == 1:
             self.close_application()
-        elif Settings().value("general_settings/close") == 0:
+        elif Settings().general.close == 0:
             self.hide_in_systray()
         else:
             log.warning("Not defined, by default, use hide in system tray")
-            Registry().execute("hide_app_in_systray")
+            events.hide_app_in_systray.emit()
         event.ignore()
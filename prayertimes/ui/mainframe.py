@@ -16,16 +16,23 @@
 # more details.                                                               #
 # --------------------------------------------------------------------------- #
 
+from functools import partial
+
 from PyQt6 import QtWidgets
 from PyQt6.QtCore import Qt
 from PyQt6.QtGui import QPixmap
 
-from prayertimes.core.common import translate
+from prayertimes.core.common import events, translate
 from prayertimes.core.common.registrymixin import UniqueRegistryMixin, Registry
 from prayertimes.core.common.registryproperties import RegistryProperties
 from prayertimes.core.common.settings import Settings
+from prayertimes.core.common.settingsbus import SettingsBus
 
+from prayertimes.core.lib.multimedia.mediacatalog import MediaCatalog
+from prayertimes.core.lib.multimedia.mediamanager import MediaManager
 from prayertimes.core.lib.prayer.prayermanager import PrayerManager
+from prayertimes.core.lib.prayer.prayertimes import PrayTimes
+from prayertimes.core.lib.scheduler.schedulermanager import SchedulerManager
 
 from prayertimes.ui.controlframes import ControlOpacity, ControlVolume, ControlDua
 from prayertimes.ui.prayerframe import PrayersContainerFrame
@@ -100,8 +107,23 @@ class MainFrame(UniqueRegistryMixin, RegistryProperties, QtWidgets.QFrame):
     def __init__(self, parent=None):
         super(MainFrame, self).__init__(parent)
 
-        PrayersContainerFrame(self)
-        PrayerManager()
+        # Services of the prayer times, built with their dependencies on first use: the
+        # prayers frame is painted with the main frame, the managers are built after the
+        # first paint to compute the first timetable
+        Registry().register_lazy(
+            "prayers_container_frame", partial(PrayersContainerFrame, self)
+        )
+        Registry().register_lazy("scheduler_manager", SchedulerManager)
+        Registry().register_lazy(
+            "media_manager",
+            MediaManager,
+            depends=("scheduler_manager", "prayers_container_frame"),
+        )
+        Registry().register_lazy(
+            "prayer_manager",
+            PrayerManager,
+            depends=("prayers_container_frame", "media_manager", "scheduler_manager"),
+        )
 
         self.setObjectName(self.__class__.__name__)
 
@@ -116,9 +138,7 @@ class MainFrame(UniqueRegistryMixin, RegistryProperties, QtWidgets.QFrame):
             ],
             parent=self,
         )
-        self.calc_method_list = ComboBox(
-            list_items=self.prayer_manager.method_list, parent=self
-        )
+        self.calc_method_list = ComboBox(list_items=PrayTimes.method_list, parent=self)
 
         # Set default calculation method to ISNA
         index = self.calc_method_list.findText("ISNA", Qt.MatchFlag.MatchFixedString)
@@ -165,18 +185,13 @@ class MainFrame(UniqueRegistryMixin, RegistryProperties, QtWidgets.QFrame):
         self.style_tb.setEnabled(False)
 
         self.athan_list = ComboBox(
-            list_items=[
-                "Athan 1",
-                "Athan 2",
-                "Athan 3",
-                "Athan 4",
-                "Athan 5",
-                "Athan 6",
-                "Athan 7",
-            ],
-            parent=self,
+            list_items=MediaCatalog().names(MediaCatalog.ATHANS), parent=self
         )
         self.athan_list.setFixedWidth(120)
+        self.athan_list.setCurrentIndex(
+            max(self.athan_list.findText(Settings().prayer.athan), 0)
+        )
+        MediaCatalog().changed.connect(self.update_athan_list)
 
         # TODO - Change button text when appropriate.
         self.preview_athan_button = QtWidgets.QPushButton(
@@ -227,12 +242,13 @@ class MainFrame(UniqueRegistryMixin, RegistryProperties, QtWidgets.QFrame):
         self.setLayout(self.layout)
 
     def __application_init__(self):
-        Registry().register_function(
-            "update_display_information", self.update_display_information
-        )
-        Registry().register_function(
-            "update_city_information", self.update_city_information
+        events.update_display_information.connect(self.update_display_information)
+        events.update_city_information.connect(self.update_city_information)
+        SettingsBus().subscribe("calculation", self.calculation_settings_changed)
+        SettingsBus().subscribe(
+            "prayer_settings/dua_after_athan", self.dua_after_athan_changed
         )
+        SettingsBus().subscribe("prayer_settings/athan", self.athan_changed)
 
     def __application_post_init__(self):
         pass
@@ -247,7 +263,7 @@ class MainFrame(UniqueRegistryMixin, RegistryProperties, QtWidgets.QFrame):
         :return:
         """
         self.media_manager.stop_current_athan()
-        # Registry().execute("stop_current_athan")
+        # events.stop_current_athan.emit()
 
     def reset_offset(self):
         """
@@ -265,7 +281,7 @@ class MainFrame(UniqueRegistryMixin, RegistryProperties, QtWidgets.QFrame):
         :return:
         """
         self.prayer_manager.udpate_time_format()
-        # Registry().execute("udpate_time_format")
+        # events.update_time_format.emit()
 
     def _set_dua_after_athan(self):
         """
@@ -374,35 +390,59 @@ class MainFrame(UniqueRegistryMixin, RegistryProperties, QtWidgets.QFrame):
         """
         idx = self.athan_list.currentIndex()
         self.media_manager.control_preview_athan(idx)
-        # Registry().execute("control_preview_athan", idx)
+        # events.control_preview_athan.emit(idx)
 
     def update_calculation_method(self):
         """
         Update the calculation method.
         Called whether user change to a new calculation method.
-        Saves value to settings and update prayer informations.
+        Saves value to settings, the prayer informations are updated by the PrayerManager
+        which follows the setting.
 
         :return:
         """
         Settings().setValue(
             "prayer_settings/calculation", self.calc_method_list.currentText()
         )
-        Registry().execute(
-            "update_calculation_method", self.calc_method_list.currentText()
-        )
 
     def update_asr_settings_method(self):
         """
         Update the settings adjustment method.
         Called whether user change to a asr setting method.
-        Saves value to settings and update prayer informations.
+        Saves value to settings, the prayer informations are updated by the PrayerManager
+        which follows the setting.
 
         :return:
         """
         Settings().setValue(
             "prayer_settings/asr_method", self.asr_settings_list.currentText()
         )
-        Registry().execute("update_asr_settings", self.asr_settings_list.currentText())
+
+    def calculation_settings_changed(self, changes):
+        """
+        Show the calculation and asr methods set.
+
+        :param changes: {key: value} of the calculation settings changed.
+        :return:
+        """
+        for key, combo_box in (
+            ("prayer_settings/calculation", self.calc_method_list),
+            ("prayer_settings/asr_method", self.asr_settings_list),
+        ):
+            if key in changes:
+                index = combo_box.findText(changes[key], Qt.MatchFlag.MatchFixedString)
+                combo_box.setCurrentIndex(index)
+
+    def dua_after_athan_changed(self, changes):
+        """
+        Show the dua after athan setting.
+
+        :param changes: {key: value} of the setting.
+        :return:
+        """
+        self.dua_after_athan_cb.setChecked(
+            changes["prayer_settings/dua_after_athan"] == 1
+        )
 
     def change_athan(self, idx):
         """
@@ -410,4 +450,36 @@ class MainFrame(UniqueRegistryMixin, RegistryProperties, QtWidgets.QFrame):
 
         :return:
         """
+        Settings().setValue("prayer_settings/athan", self.athan_list.itemText(idx))
         self.media_manager.change_athan(idx)
+
+    def athan_changed(self, changes):
+        """
+        Show the athan set.
+
+        :param changes: {key: value} of the setting.
+        :return:
+        """
+        index = self.athan_list.findText(changes["prayer_settings/athan"])
+        if index >= 0:
+            self.athan_list.setCurrentIndex(index)
+
+    def update_athan_list(self):
+        """
+        Update the athans combo box when the media catalog changed, keeping the selected athan.
+
+        :return:
+        """
+        current = self.athan_list.currentText()
+        names = MediaCatalog().names(MediaCatalog.ATHANS)
+        if names == [
+            self.athan_list.itemText(i) for i in range(self.athan_list.count())
+        ]:
+            return
+
+        self.athan_list.blockSignals(True)
+        self.athan_list.clear()
+        self.athan_list.addItems(names)
+        self.athan_list.setCurrentIndex(max(self.athan_list.findText(current), 0))
+        self.athan_list.blockSignals(False)
+        self.media_manager.change_athan(self.athan_list.currentIndex())
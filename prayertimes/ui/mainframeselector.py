@@ -16,11 +16,13 @@
 # more details.                                                               #
 # --------------------------------------------------------------------------- #
 
+from functools import partial
+
 from PyQt6 import QtWidgets
 from PyQt6.QtCore import Qt, QPoint
 from PyQt6.QtGui import QColor
 
-from prayertimes.core.common import translate
+from prayertimes.core.common import events, translate
 from prayertimes.core.common.registry import Registry
 from prayertimes.core.common.registrymixin import UniqueRegistryMixin
 
@@ -62,9 +64,10 @@ class MainFrameSelector(
 
         self.set_animation_values(start=QPoint(end_pos, 0), end=QPoint(beg_pos, 0))
 
-        self.settings_dialog = SettingsDialog(self)
-        self.info_dialog = InfoDialog(self)
-        self.about_dialog = AboutDialog(self)
+        # Dialogs built the first time they are opened
+        Registry().register_lazy("settings_dialog", partial(SettingsDialog, self))
+        Registry().register_lazy("info_dialog", partial(InfoDialog, self))
+        Registry().register_lazy("about_dialog", partial(AboutDialog, self))
 
         self.layout = QtWidgets.QVBoxLayout(self)
         self.h_layout = QtWidgets.QHBoxLayout()
@@ -108,12 +111,8 @@ class MainFrameSelector(
         self.setup_ui()
 
     def __application_init__(self):
-        Registry().register_function(
-            "expand_main_frame_selector", self.set_expand_animation
-        )
-        Registry().register_function(
-            "hide_main_frame_selector", self.set_hide_animation
-        )
+        events.expand_main_frame_selector.connect(self.set_expand_animation)
+        events.hide_main_frame_selector.connect(self.set_hide_animation)
 
     def __application_post_init__(self):
         pass
@@ -177,7 +176,7 @@ class MainFrameSelector(
         :param idx: index of the new item.
         :return:
         """
-        Registry().execute("set_main_stack", idx)
+        events.set_main_stack.emit(idx)
 
         for idx_item in range(self.listwidget_frame.count()):
             item = self.listwidget_frame.item(idx_item)
@@ -195,8 +194,8 @@ class MainFrameSelector(
         :return:
         """
         if self.sender().objectName() == "settings_button":
-            self.settings_dialog.exec()
+            Registry().get("settings_dialog").exec()
         elif self.sender().objectName() == "info_button":
-            self.info_dialog.exec()
+            Registry().get("info_dialog").exec()
         elif self.sender().objectName() == "about_button":
-            self.about_dialog.exec()
+            Registry().get("about_dialog").exec()
@@ -16,7 +16,6 @@
 # more details.                                                               #
 # --------------------------------------------------------------------------- #
 
-import datetime
 from collections import OrderedDict
 
 from PyQt6 import QtWidgets
@@ -24,9 +23,11 @@ from PyQt6.QtCore import Qt, pyqtSignal
 from PyQt6.QtGui import QPixmap
 
 # from prayertimes.core.common import translate
+from prayertimes.core.common.clock import get_clock
 from prayertimes.core.common.logapi import log
 from prayertimes.core.common.registrymixin import UniqueRegistryMixin, RegistryMixin
 from prayertimes.core.common.settings import Settings
+from prayertimes.core.common.settingsbus import SettingsBus
 
 
 class AbstractSpinBox(QtWidgets.QSpinBox):
@@ -172,7 +173,7 @@ class PrayerTimeFrame(RegistryMixin, QtWidgets.QFrame):
         :return:
         """
         if self.label in ("الظهر", "Dhuhr", "الجمعة") and (
-            "Friday" in datetime.datetime.now().strftime("%A")
+            "Friday" in get_clock().now().strftime("%A")
         ):
             if current:
                 self.setProperty("current", 3)
@@ -246,7 +247,7 @@ class PrayersContainerFrame(UniqueRegistryMixin, QtWidgets.QFrame):
             # p_name[0] : English
             # p_name[1] : Arabic
             if Settings().contains("general_settings/arabic_names"):
-                if Settings().value("general_settings/arabic_names") == 1:
+                if Settings().general.arabic_names == 1:
                     self.praytimes[p_name[0]] = PrayerTimeFrame(prayer_name=p_name[1])
                 else:
                     self.praytimes[p_name[0]] = PrayerTimeFrame(prayer_name=p_name[0])
@@ -268,6 +269,31 @@ class PrayersContainerFrame(UniqueRegistryMixin, QtWidgets.QFrame):
 
     def __application_init__(self):
         self.set_icons(self.icon_set)
+        SettingsBus().subscribe("offsets", self.offsets_changed)
+        SettingsBus().subscribe(
+            "general_settings/arabic_names", self.arabic_names_changed
+        )
+
+    def offsets_changed(self, changes):
+        """
+        Show the offsets set, the spin boxes update the prayer times of their prayer.
+
+        :param changes: {key: value} of the offsets changed.
+        :return:
+        """
+        for key, value in changes.items():
+            prayer = key.split("/")[1].title()
+            if prayer in self.praytimes and self.praytimes[prayer].offset != value:
+                self.praytimes[prayer].offset = value
+
+    def arabic_names_changed(self, changes):
+        """
+        Show the prayer names in the language set.
+
+        :param changes: {key: value} of the setting.
+        :return:
+        """
+        self.update_prayer_name()
 
     def _update_prayer_name(self, arabic=False):
         """
@@ -278,10 +304,7 @@ class PrayersContainerFrame(UniqueRegistryMixin, QtWidgets.QFrame):
         for p_name in reversed(self.prayer_list):
             # p_name[0] : English prayer name
             # p_name[1] : Arabic prayer name
-            if (
-                "Friday" in datetime.datetime.now().strftime("%A")
-                and p_name[0] == "Dhuhr"
-            ):
+            if "Friday" in get_clock().now().strftime("%A") and p_name[0] == "Dhuhr":
                 if arabic:
                     self.praytimes[p_name[0]].label = "الجمعة"
                 else:
@@ -299,16 +322,14 @@ class PrayersContainerFrame(UniqueRegistryMixin, QtWidgets.QFrame):
         :return:
         """
         if Settings().contains("general_settings/arabic_names"):
-            if Settings().value("general_settings/arabic_names") == 0:
+            if Settings().general.arabic_names == 0:
                 self._update_prayer_name(arabic=False)
-            elif Settings().value("general_settings/arabic_names") == 1:
+            elif Settings().general.arabic_names == 1:
                 self._update_prayer_name(arabic=True)
             else:
                 log.debug(
-                    "value for arabic_names in "
-                    "settings.ini: {}".format(
-                        Settings().value("general_settings/arabic_names")
-                    )
+                    "value for arabic_names in settings.ini: %s",
+                    Settings().general.arabic_names,
                 )
         else:
             self._update_prayer_name(arabic=True)
@@ -19,7 +19,7 @@
 from PyQt6 import QtWidgets
 from PyQt6.QtCore import Qt
 
-from prayertimes.core.common.registry import Registry
+from prayertimes.core.common import events
 from prayertimes.core.common.registrymixin import UniqueRegistryMixin
 
 from prayertimes.ui.mainframe import MainFrame
@@ -57,7 +57,7 @@ class PrincipalFrame(UniqueRegistryMixin, QtWidgets.QFrame):
         self.layout.addWidget(self.container_stack)
         self.layout.addWidget(self.main_frame_selector)
 
-        Registry().register_function("set_main_stack", self.set_stack)
+        events.set_main_stack.connect(self.set_stack)
 
     def __application_init__(self):
         # Set first time to main frame
@@ -25,7 +25,6 @@ from PyQt6.QtSql import QSqlDatabase, QSqlQuery
 
 from prayertimes.core.common import translate
 from prayertimes.core.common.logapi import log
-from prayertimes.core.common.registry import Registry
 from prayertimes.core.common.registryproperties import RegistryProperties
 from prayertimes.core.common.registrymixin import RegistryMixin
 from prayertimes.core.common.resourceslocation import ResourcesLocation
@@ -390,11 +389,9 @@ class MainSettingsFrame(RegistryMixin, QtWidgets.QFrame):
         if self.city_object:
             Settings().save_city_config(self.city_object.city_info)
             log.debug(
-                "saved city configuration from settings with : {}".format(
-                    self.city_object.city_info
-                )
+                "saved city configuration from settings with : %s",
+                self.city_object.city_info,
             )
-            Registry().execute("load_city_configuration")
         else:
             return
 
@@ -464,10 +461,8 @@ class GeneralSettingsFrame(RegistryProperties, QtWidgets.QFrame):
 
         if self.arabic_names_cb.isChecked():
             Settings().setValue("general_settings/arabic_names", 1)
-            self.prayer_frame.update_prayer_name()
         else:
             Settings().setValue("general_settings/arabic_names", 0)
-            self.prayer_frame.update_prayer_name()
 
     def load_settings(self):
         """
@@ -476,47 +471,41 @@ class GeneralSettingsFrame(RegistryProperties, QtWidgets.QFrame):
         :return:
         """
         if Settings().contains("general_settings/splashscreen"):
-            if Settings().value("general_settings/splashscreen") == 0:
+            if Settings().general.splashscreen == 0:
                 self.splashscreen_cb.setChecked(False)
-            elif Settings().value("general_settings/splashscreen") == 1:
+            elif Settings().general.splashscreen == 1:
                 self.splashscreen_cb.setChecked(True)
             else:
                 log.debug(
-                    "value for splashscreen in "
-                    "settings.ini: {}".format(
-                        Settings().value("general_settings/splashscreen")
-                    )
+                    "value for splashscreen in settings.ini: %s",
+                    Settings().general.splashscreen,
                 )
         else:
             self.splashscreen_cb.setChecked(True)
             Settings().setValue("general_settings/splashscreen", 1)
 
         if Settings().contains("general_settings/arabic_names"):
-            if Settings().value("general_settings/arabic_names") == 0:
+            if Settings().general.arabic_names == 0:
                 self.arabic_names_cb.setChecked(False)
-            elif Settings().value("general_settings/arabic_names") == 1:
+            elif Settings().general.arabic_names == 1:
                 self.arabic_names_cb.setChecked(True)
             else:
                 log.debug(
-                    "value for arabic_names in "
-                    "settings.ini: {}".format(
-                        Settings().value("general_settings/arabic_names")
-                    )
+                    "value for arabic_names in settings.ini: %s",
+                    Settings().general.arabic_names,
                 )
         else:
             self.arabic_names_cb.setChecked(True)
             Settings().setValue("general_settings/arabic_names", 1)
 
         if Settings().contains("general_settings/close"):
-            if Settings().value("general_settings/close") == 0:
+            if Settings().general.close == 0:
                 self.close_prog_cb.setChecked(True)
-            elif Settings().value("general_settings/close") == 1:
+            elif Settings().general.close == 1:
                 self.close_prog_cb.setChecked(False)
             else:
                 log.debug(
-                    "value for close in settings.ini: {}".format(
-                        Settings().value("general_settings/close")
-                    )
+                    "value for close in settings.ini: %s", Settings().general.close
                 )
         else:
             self.close_prog_cb.setChecked(True)
@@ -20,6 +20,7 @@ from PyQt6 import QtWidgets
 from PyQt6.QtCore import Qt, pyqtSignal
 from PyQt6.QtGui import QAction, QIcon
 
+from prayertimes.core.common import events
 from prayertimes.core.common.logapi import log
 from prayertimes.core.common.registry import Registry
 from prayertimes.core.common.registrymixin import UniqueRegistryMixin
@@ -51,7 +52,7 @@ class SysTrayMenu(UniqueRegistryMixin, QtWidgets.QMenu):
 
         :return:
         """
-        Registry().execute("close_application")
+        events.close_application.emit()
 
 
 class SystemTrayIcon(
@@ -89,9 +90,7 @@ class FloatingNotificationArea(QtWidgets.QFrame, PMXMessageOverlay):
 
         self.setAttribute(Qt.WidgetAttribute.WA_TranslucentBackground)
 
-        Registry().register_function(
-            "show_floating_notification", self.show_message_sys
-        )
+        events.show_floating_notification.connect(self.show_message_sys)
 
     def show_message_sys(self, _str, _time):
         """
@@ -205,7 +204,7 @@ class SysTrayPanel(UniqueRegistryMixin, QtWidgets.QFrame):
         :return:
         """
         log.debug("athan is stopped from system tray panel")
-        Registry().execute("stop_current_athan")
+        events.stop_current_athan.emit()
         # Force hiding the system tray panel even if it is done in stop athan function (activated if needed)
         # self.hide_systray_panel()
 
@@ -16,8 +16,6 @@
 # more details.                                                               #
 # --------------------------------------------------------------------------- #
 
-import os
-
 from PyQt6 import QtWidgets
 from PyQt6.QtCore import Qt
 
@@ -149,11 +147,10 @@ class QuantumPTWizard(QtWidgets.QWizard):
         """
         log.debug("Wizard cancelled by user.")
         self.was_cancelled = True
-        if os.path.exists(Settings().fileName()):
-            try:
-                os.remove(Settings().fileName())
-            except (OSError, FileNotFoundError):
-                log.error("File {} not found...".format(Settings().fileName()))
+        try:
+            Settings().clear()
+        except OSError:
+            log.error("File %s not found...", Settings().fileName())
         return super(QuantumPTWizard, self).reject()
 
     def accept(self):
@@ -185,7 +182,7 @@ class QuantumPTWizard(QtWidgets.QWizard):
         elif page_id == -1:
             log.debug("Canceled by user ...")
         else:
-            log.error("{} Should never fall here".format("on_current_id_changed"))
+            log.error("%s Should never fall here", "on_current_id_changed")
 
     def on_default_button_clicked(self):
         """
@@ -204,4 +201,4 @@ class QuantumPTWizard(QtWidgets.QWizard):
         elif self.currentId() == self.last_page_id:
             pass
         else:
-            log.error("{} Should never fall here".format("on_default_button_clicked"))
+            log.error("%s Should never fall here", "on_default_button_clicked")
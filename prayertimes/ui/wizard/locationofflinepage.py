@@ -90,9 +90,18 @@ class OfflineFrameWizard(QtWidgets.QFrame):
         self.line_edit.textChanged.connect(self.on_city_changed)
         self.line_edit.city_completer.activated.connect(self.on_selected_city)
 
+        # The database is opened when the page is shown the first time
         self.load_cities = TaskThread(_function=self.__set_database)
         self.load_cities.finished.connect(self.finished_loading)
-        self.load_cities.start()
+
+    def load_database(self):
+        """
+        Open the database of the cities in the background, once.
+
+        :return:
+        """
+        if not self.load_cities.isRunning() and not self.load_cities.isFinished():
+            self.load_cities.start()
 
     def cleanup(self):
         """
@@ -252,7 +261,7 @@ class LocationOfflinePage(QtWidgets.QWizardPage):
         self.setLayout(self.layout)
 
     def initializePage(self):
-        # self.offline_frame.load_database()
+        self.offline_frame.load_database()
         return super(LocationOfflinePage, self).initializePage()
 
     def isComplete(self):
@@ -98,7 +98,7 @@ class OnlineFrameWizard(QtWidgets.QFrame):
                 if not self.verify_dict(_dict):
                     return None
             except Exception as e:
-                log.exception("Could not get location using public ip. {}".format(e))
+                log.exception("Could not get location using public ip. %s", e)
 
         return _dict
 
@@ -20,35 +20,37 @@ import pytz
 import datetime
 import time
 
-today = datetime.datetime.today()
+from prayertimes.core.common.clock import get_clock
 
 
-def is_dst(timezone, date=today):
+def is_dst(timezone, date=None):
     """
     Determine if it's Daylight Saving Time from a date and a Timezone.
 
     :param timezone:
-    :param date:
+    :param date: naive datetime, current date of the clock if None.
     :return:
     """
     pst_ = pytz.timezone(timezone)
     if date:
         return bool(pst_.localize(date).dst())
     else:
-        return bool(datetime.datetime.now(pst_).dst())
+        return bool(get_clock().now(pst_).dst())
 
 
-def get_utc_offset(timezone, date=today):
+def get_utc_offset(timezone, date=None):
     """
     Get the UTC offset (including DST if available) from a date and a Timezone.
 
     :param timezone:
-    :param date:
+    :param date: naive datetime, current date of the clock if None.
     :return:
     """
     if not isinstance(timezone, str):
         raise Exception("Please prodive a valid TimeZone")
     pst_ = pytz.timezone(timezone)
+    if date is None:
+        date = get_clock().now(pst_).replace(tzinfo=None)
     utc_offset = pst_.utcoffset(date).total_seconds() / 3600
     return utc_offset
 
@@ -65,7 +67,7 @@ def get_utc_offset_str():
     """
 
     # Calculate the UTC time difference in seconds.
-    timestamp = time.time()
+    timestamp = get_clock().time()
     time_now = datetime.datetime.fromtimestamp(timestamp)
     time_utc = datetime.datetime.utcfromtimestamp(timestamp)
     utc_offset_secs = (time_now - time_utc).total_seconds()
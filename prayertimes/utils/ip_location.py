@@ -104,7 +104,7 @@ class IPgetter(object):
             myip = m.group(0)
             return myip if len(myip) > 0 else ""
         except (requests.ConnectionError, requests.ConnectTimeout):
-            log.error("Error on server {}".format(server))
+            log.error("Error on server %s", server)
             return ""
         finally:
             if request:
@@ -124,15 +124,14 @@ class IPgetter(object):
 
         ips = sorted(resultdict.values())
         ips_set = set(ips)
-        log.debug("\nNumber of servers: {}".format(len(self.server_list)))
+        log.debug("\nNumber of servers: %s", len(self.server_list))
         log.debug("IP's :")
         for ip, ocorrencia in zip(ips_set, map(lambda x: ips.count(x), ips_set)):
             log.debug(
-                "{0} = {1} ocurrenc{2}".format(
-                    ip if len(ip) > 0 else "broken server",
-                    ocorrencia,
-                    "y" if ocorrencia == 1 else "ies",
-                )
+                "%s = %s ocurrenc%s",
+                ip if len(ip) > 0 else "broken server",
+                ocorrencia,
+                "y" if ocorrencia == 1 else "ies",
             )
         log.debug("\n")
         log.debug(resultdict)
@@ -162,7 +161,7 @@ def get_public_ip():
     """
     public_ip = IPgetter().get_externalip()
 
-    log.debug("public IP address is: {}".format(str(public_ip)))
+    log.debug("public IP address is: %s", str(public_ip))
     return public_ip
 
 
@@ -176,7 +175,7 @@ def get_location_from_ip(ip, database):
     """
     reader = None
     try:
-        log.debug("database path: {}".format(database))
+        log.debug("database path: %s", database)
 
         reader = geoip2.database.Reader(database)
         response = reader.city(ip)
@@ -20,8 +20,8 @@ from PyQt6 import QtWidgets
 from PyQt6.QtCore import Qt
 from PyQt6.QtGui import QPainter, QBrush, QColor
 
+from prayertimes.core.common import events
 from prayertimes.core.common.registrymixin import RegistryMixin
-from prayertimes.core.common.registry import Registry
 
 
 class PrincipalOverlay(RegistryMixin, QtWidgets.QFrame):
@@ -45,8 +45,8 @@ class PrincipalOverlay(RegistryMixin, QtWidgets.QFrame):
 
     def __application_init__(self):
         self.hide()
-        Registry().register_function("activate_overlay", self.show)
-        Registry().register_function("desactivate_overlay", self.hide)
+        events.activate_overlay.connect(self.show)
+        events.desactivate_overlay.connect(self.hide)
 
     def paintEvent(self, event):
         painter = QPainter()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# --------------------------------------------------------------------------- #
+# QuantumPT - Open Source Portable Islamic prayer times reminder              #
+# --------------------------------------------------------------------------- #
+# Copyright (c) 2016 QuantumPT Developer                                      #
+# --------------------------------------------------------------------------- #
+# This program is free software; you can redistribute it and/or modify it     #
+# under the terms of the GNU General Public License as published by the Free  #
+# Software Foundation; version 3 of the License.                              #
+#                                                                             #
+# This program is distributed in the hope that it will be useful, but WITHOUT #
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or       #
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for    #
+# more details.                                                               #
+# --------------------------------------------------------------------------- #
+
+"""
+Compare the dispatch of a declared Event with Registry().execute of an event that is not
+declared (looked up by name at each call).
+
+python -m scripts.eventbenchmark [handlers] [calls]
+"""
+
+import sys
+import time
+
+from prayertimes.core.common.eventbus import Event
+from prayertimes.core.common.logapi import log
+from prayertimes.core.common.registry import Registry
+
+
+def benchmark(handlers=3, calls=200000):
+    """
+    Measure the dispatch of an event with both mechanisms.
+
+    :param handlers: number of handlers of the event.
+    :param calls: number of dispatches measured.
+    :return: {name: microseconds per dispatch}.
+    """
+
+    class Handler(object):
+        def handle(self, value):
+            return value
+
+    objects = [Handler() for _ in range(handlers)]
+    event = Event("__benchmark_event__", ("value",))
+    Registry.create()
+    try:
+        for obj in objects:
+            event.connect(obj.handle)
+            Registry().register_function("__benchmark_registry__", obj.handle)
+
+        timings = {}
+        for name, dispatch in (
+            (
+                "Registry().execute",
+                lambda: Registry().execute("__benchmark_registry__", 1),
+            ),
+            ("Event.emit", lambda: event.emit(1)),
+        ):
+            start = time.perf_counter()
+            for _ in range(calls):
+                dispatch()
+            timings[name] = (time.perf_counter() - start) / calls * 1e6
+            log.info(
+                "benchmark %s: %.3f us per dispatch to %s handlers",
+                name,
+                timings[name],
+                handlers,
+            )
+        return timings
+    finally:
+        del Event.declared[event.name]
+
+
+if __name__ == "__main__":
+    timings = benchmark(*[int(arg) for arg in sys.argv[1:3]])
+    for name, microseconds in timings.items():
+        print("{}: {:.3f} us".format(name, microseconds))